@@ -6,19 +6,23 @@ Provides REST API and WebSocket for real-time progress
 import asyncio
 import json
 import os
+import shutil
+import threading
+import uuid
+import time
 from pathlib import Path
-from typing import List, Set
+from typing import Any, List, Optional, Set
+from collections import OrderedDict
 from datetime import datetime
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File, Response
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File, Response, Query, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 import hashlib
-import subprocess
 import io
-from concurrent.futures import ThreadPoolExecutor
 
 from backend import config
 from backend.schemas import (
@@ -27,6 +31,9 @@ from backend.schemas import (
     ModelStatus, ErrorResponse, ProcessingStage, GPUInfoResponse,
     SavedPrompt, PromptLibrary, CreatePromptRequest, UpdatePromptRequest,
     DirectoryRequest, DirectoryResponse, DirectoryBrowseResponse, MediaType,
+    MediaSortField, SortOrder, VideoPageResponse, ListingEncoding,
+    ThumbnailSpriteRequest, ThumbnailSpriteResponse,
+    UploadResponse, UploadedFile, UploadFailure, UploadSessionRequest, UploadSessionResponse,
     # Analytics schemas
     StopwordPreset, WordFrequencyRequest, WordFrequencyResponse, WordFrequencyItem,
     NgramRequest, NgramResponse, NgramItem,
@@ -35,7 +42,28 @@ from backend.schemas import (
 )
 from backend.gpu_utils import get_system_info
 from backend.processing import ProcessingManager
-from backend.video_processor import find_videos, find_images, find_all_media, get_video_info
+from backend.video_processor import get_video_info
+from backend.media_index import (
+    find_videos, find_images, find_all_media, get_media_index, MediaIndex,
+    library_version, bump_library_generation,
+)
+from backend.metadata_store import get_metadata_store, close_metadata_store
+from backend.library_watcher import LibraryWatcher
+from backend.thumbnailer import (
+    generate_any_thumbnail, thumbnail_stats, ThumbnailResult,
+    negotiate_format, preferred_format, snap_size, encode_thumbnail, FORMAT_MEDIA_TYPES,
+)
+from backend.thumbnail_sprites import SpriteSheet, compose_sheet, get_sprite_sheets, make_sprite_id
+from backend.thumbnail_store import get_thumbnail_store
+from backend.thumbnail_scheduler import ThumbnailScheduler, FOREGROUND, BACKGROUND
+from backend.preview_proxy import get_preview_proxies
+from backend.uploads import UploadSession, get_upload_sessions, save_upload
+from backend.listing_codec import encode_columns, dumps_json, dumps_msgpack, has_msgpack
+from backend.media_listing import (
+    get_media_listing, CursorError, DirectoryScanner, caption_path_for,
+    caption_preview as caption_preview_for,
+    get_stream_snapshots, StreamSnapshot, format_event_id, parse_event_id,
+)
 
 
 # Settings file path
@@ -47,6 +75,11 @@ _settings: Settings = None
 _prompt_library: PromptLibrary = None
 _processing_manager: ProcessingManager = None
 _connected_websockets: Set[WebSocket] = set()
+_library_websockets: Set[WebSocket] = set()
+_library_updates: asyncio.Queue = None
+_library_task: asyncio.Task = None
+_library_watcher: LibraryWatcher = None
+_library_watch_task: asyncio.Task = None
 _processing_task: asyncio.Task = None
 
 
@@ -112,6 +145,148 @@ async def broadcast_progress(update: ProgressUpdate):
     _connected_websockets.difference_update(disconnected)
 
 
+async def broadcast_library(message: dict):
+    """Send a library update message to all /ws/library clients"""
+    if not _library_websockets:
+        return
+
+    text = json.dumps(message)
+    disconnected = set()
+
+    for ws in _library_websockets:
+        try:
+            await ws.send_text(text)
+        except Exception:
+            disconnected.add(ws)
+
+    _library_websockets.difference_update(disconnected)
+
+
+async def _push_enriched_metadata():
+    """Batch background metadata probes and push them to clients as full VideoInfo records"""
+    loop = asyncio.get_running_loop()
+    while True:
+        paths = {await _library_updates.get()}
+        await asyncio.sleep(config.METADATA_PUSH_INTERVAL)
+        while not _library_updates.empty():
+            paths.add(_library_updates.get_nowait())
+
+        if not _library_websockets:
+            continue
+
+        working_dir = config.get_working_directory()
+
+        def build_infos():
+            infos = []
+            scanner = DirectoryScanner()
+            for media_path in sorted(paths):
+                try:
+                    media_path.relative_to(working_dir)
+                    infos.append(get_media_info_fast(
+                        media_path, working_dir, _media_type_for(media_path),
+                        enqueue_missing=False, scanner=scanner,
+                    ).model_dump())
+                except (ValueError, OSError):
+                    pass  # Outside the current working directory, or deleted
+            return infos
+
+        infos = await loop.run_in_executor(None, build_infos)
+        if infos:
+            await broadcast_library({"type": "enriched", "videos": infos})
+
+
+def _media_name(media_path: Path, working_dir: Path) -> str:
+    """Client-facing name: path relative to the working directory with forward slashes"""
+    try:
+        return str(media_path.relative_to(working_dir)).replace('\\', '/')
+    except ValueError:
+        return media_path.name
+
+
+async def _push_library_delta(added: List[Path], removed: List[Path], caption_changed: List[Path]):
+    """Send a watcher delta to /ws/library clients, with full VideoInfo for new and changed media"""
+    if not _library_websockets:
+        return
+
+    working_dir = config.get_working_directory()
+
+    def build_infos(paths: List[Path]) -> List[dict]:
+        infos = []
+        scanner = DirectoryScanner()
+        for media_path in paths:
+            try:
+                infos.append(get_media_info_fast(
+                    media_path, working_dir, _media_type_for(media_path), scanner=scanner
+                ).model_dump())
+            except OSError:
+                pass  # Gone again before we got to it
+        return infos
+
+    loop = asyncio.get_running_loop()
+    added_infos = await loop.run_in_executor(None, build_infos, added)
+    changed_infos = await loop.run_in_executor(None, build_infos, caption_changed)
+
+    await broadcast_library({
+        "type": "delta",
+        "added": added_infos,
+        "removed": [_media_name(p, working_dir) for p in removed],
+        "caption_changed": changed_infos,
+    })
+
+
+def _watch_library(path: Path, recursive: bool) -> None:
+    """
+    Point the watcher at path in a background task. Scheduling the watches of
+    a large recursive tree can take seconds, so nothing waits for it; calls
+    are applied in order.
+    """
+    global _library_watch_task
+
+    previous = _library_watch_task
+
+    async def watch():
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await asyncio.to_thread(_library_watcher.watch, path, recursive)
+        except Exception as e:
+            print(f"[API] Cannot watch {path}: {e}")
+
+    _library_watch_task = asyncio.create_task(watch())
+
+
+def _start_library_watcher() -> None:
+    """Watch the working directory and forward deltas to the event loop"""
+    global _library_watcher
+
+    if not config.WATCH_ENABLED:
+        return
+
+    loop = asyncio.get_running_loop()
+
+    def on_delta(added, removed, caption_changed):
+        asyncio.run_coroutine_threadsafe(_push_library_delta(added, removed, caption_changed), loop)
+
+    _library_watcher = LibraryWatcher(on_delta)
+    _watch_library(config.get_working_directory(), config.get_traverse_subfolders())
+
+
+def _start_metadata_push() -> None:
+    """Forward background metadata probes from the probe threads to the push task"""
+    global _library_updates, _library_task
+
+    store = get_metadata_store()
+    if store is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    _library_updates = asyncio.Queue()
+    store.add_listener(
+        lambda media_path, _record: loop.call_soon_threadsafe(_library_updates.put_nowait, media_path)
+    )
+    _library_task = asyncio.create_task(_push_enriched_metadata())
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
@@ -119,6 +294,8 @@ async def lifespan(app: FastAPI):
 
     # Startup
     _settings = load_settings()
+    _start_metadata_push()
+    _start_library_watcher()
     _prompt_library = load_prompt_library()
     _processing_manager = ProcessingManager(progress_callback=broadcast_progress)
     print("[API] Video Caption Suite backend started")
@@ -144,6 +321,16 @@ async def lifespan(app: FastAPI):
     # Shutdown
     if _processing_manager:
         _processing_manager.stop()
+        _processing_manager.shutdown_decode_pool()
+    if _library_task:
+        _library_task.cancel()
+    if _library_watch_task:
+        _library_watch_task.cancel()  # A watch already running finishes before stop()
+    if _library_watcher:
+        await asyncio.to_thread(_library_watcher.stop)
+    _thumbnail_scheduler.stop()
+    get_preview_proxies().shutdown()
+    close_metadata_store()
     print("[API] Backend shutdown complete")
 
 
@@ -209,13 +396,66 @@ async def get_gpu_info():
     return GPUInfoResponse(**info)
 
 
+# ============================================================================
+# Conditional Requests
+# ============================================================================
+
+def _library_etag(*parts, include_metadata: bool = False) -> Optional[str]:
+    """
+    Weak ETag for a response derived from the library: changes with the media
+    index generation, caption writes and the listing settings (plus
+    completed metadata probes when include_metadata). None if the library
+    cannot be versioned.
+    """
+    working_dir = config.get_working_directory()
+    traverse = config.get_traverse_subfolders()
+    version = library_version(working_dir, traverse)
+    if version is None:
+        return None
+
+    key = [version, working_dir, traverse, config.get_include_videos(), config.get_include_images(), *parts]
+    if include_metadata:
+        store = get_metadata_store()
+        key.append(store.probes if store is not None else None)
+    digest = hashlib.sha1("|".join(map(str, key)).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of If-None-Match against etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _check_not_modified(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Tag response with etag and return a 304 response if the client already
+    has this version (None means build the full response).
+    """
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # Cache, but revalidate every time
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 # ============================================================================
 # Directory Endpoints
 # ============================================================================
 
 @app.get("/api/directory", response_model=DirectoryResponse)
-async def get_directory():
+async def get_directory(request: Request, response: Response):
     """Get current working directory and media settings"""
+    not_modified = _check_not_modified(request, response, _library_etag("directory"))
+    if not_modified is not None:
+        return not_modified
+
     working_dir = config.get_working_directory()
     traverse = config.get_traverse_subfolders()
     include_videos = config.get_include_videos()
@@ -254,6 +494,10 @@ async def set_directory(request: DirectoryRequest):
     config.set_include_images(request.include_images)
     print(f"[API] Working directory set to: {path} (traverse={request.traverse_subfolders}, videos={request.include_videos}, images={request.include_images})")
 
+    if _library_watcher:
+        _watch_library(path, request.traverse_subfolders)
+    _thumbnail_scheduler.cancel_background()
+
     # Count media in new directory (single-pass scan)
     videos, images = find_all_media(
         path, request.traverse_subfolders, request.include_videos, request.include_images
@@ -388,22 +632,43 @@ async def delete_prompt(prompt_id: str):
 # Video Endpoints
 # ============================================================================
 
-def get_media_info_fast(media_path: Path, working_dir: Path = None, media_type: MediaType = MediaType.VIDEO) -> VideoInfo:
-    """Get media info without calling ffprobe - much faster for large libraries"""
+def _media_type_for(media_path: Path) -> MediaType:
+    """Media type from the file extension"""
+    if media_path.suffix.lower() in config.IMAGE_EXTENSIONS:
+        return MediaType.IMAGE
+    return MediaType.VIDEO
+
+
+def get_media_info_fast(
+    media_path: Path,
+    working_dir: Path = None,
+    media_type: MediaType = MediaType.VIDEO,
+    enqueue_missing: bool = True,
+    scanner: DirectoryScanner = None,
+) -> VideoInfo:
+    """
+    Get media info without opening the media file.
+    Probed metadata comes from the metadata store; files it does not know yet
+    are queued for a background probe (pushed to /ws/library when done).
+    Listings pass a shared DirectoryScanner so stats and caption presence come
+    from one scandir per directory instead of per-file syscalls.
+    """
     # Captions are saved in the same directory as the media file
-    caption_path = media_path.parent / (media_path.stem + config.OUTPUT_EXTENSION)
-    has_caption = caption_path.exists()
-    caption_preview = None
-
-    if has_caption:
+    caption_path = caption_path_for(media_path)
+    if scanner is not None:
+        stat = scanner.stat(media_path)
+        if stat is None:
+            raise FileNotFoundError(f"Media not found: {media_path}")
+        caption_stat = scanner.stat(caption_path)
+    else:
+        stat = media_path.stat()
         try:
-            with open(caption_path, "r", encoding="utf-8") as f:
-                text = f.read(200)  # Only read first 200 chars for preview
-                caption_preview = text[:150] + "..." if len(text) > 150 else text
-        except Exception:
-            pass
+            caption_stat = caption_path.stat()
+        except OSError:
+            caption_stat = None
 
-    stat = media_path.stat()
+    has_caption = caption_stat is not None
+    caption_preview = caption_preview_for(caption_path, caption_stat) if has_caption else None
 
     # Use relative path from working directory if provided, otherwise just the filename
     # Always use forward slashes for consistency with frontend URLs
@@ -416,12 +681,12 @@ def get_media_info_fast(media_path: Path, working_dir: Path = None, media_type:
     else:
         name = media_path.name
 
-    return VideoInfo(
+    info = VideoInfo(
         name=name,
         path=str(media_path),
         size_mb=stat.st_size / (1024 * 1024),
         media_type=media_type,
-        duration_sec=None,  # Skip ffprobe for speed
+        duration_sec=None,
         width=None,
         height=None,
         frame_count=1 if media_type == MediaType.IMAGE else None,
@@ -430,6 +695,26 @@ def get_media_info_fast(media_path: Path, working_dir: Path = None, media_type:
         caption_preview=caption_preview,
     )
 
+    store = get_metadata_store()
+    if store is not None:
+        record = store.get(media_path, stat)
+        if record is not None:
+            _apply_metadata(info, record)
+        elif enqueue_missing:
+            store.enqueue(media_path)
+
+    return info
+
+
+def _apply_metadata(info: VideoInfo, record: dict) -> None:
+    """Copy probed fields from a metadata store record onto a VideoInfo"""
+    info.duration_sec = record["duration"]
+    info.width = record["width"]
+    info.height = record["height"]
+    info.fps = record["fps"]
+    if record["frame_count"] is not None:
+        info.frame_count = record["frame_count"]
+
 
 # Backward compatibility alias
 def get_video_info_fast(video_path: Path, working_dir: Path = None) -> VideoInfo:
@@ -438,51 +723,219 @@ def get_video_info_fast(video_path: Path, working_dir: Path = None) -> VideoInfo
 
 
 @app.get("/api/videos/stream")
-async def stream_videos():
-    """Stream media files as Server-Sent Events for progressive loading"""
+async def stream_videos(
+    progressive: bool = False,
+    encoding: ListingEncoding = ListingEncoding.JSON,
+    last_event_id: Optional[str] = Header(default=None),
+):
+    """
+    Stream media files as Server-Sent Events for progressive loading.
+    progressive=True sends batches while the directory walk is still running
+    (in walk order, sorted within each batch) with an estimated total that is
+    finalized at the end; otherwise media is discovered and sorted first.
+    Every batch carries an event id; reconnecting with Last-Event-ID resumes
+    after that batch while the stream's snapshot is still cached.
+    encoding=compact sends each batch as columns instead of VideoInfo objects.
+    """
+    if encoding == ListingEncoding.MSGPACK:
+        raise HTTPException(status_code=400, detail="msgpack encoding is not available for SSE streams")
+
     # Shared list so we can pre-generate thumbnails after streaming
     captured_media_items = []
+    snapshots = get_stream_snapshots()
+    batch_size = 100
+    compact = encoding == ListingEncoding.COMPACT
+    stream_stats = {"bytes": 0, "encode_ms": 0.0}
+
+    def sse(message: dict, event_id: str = None) -> str:
+        """Format one SSE message, counting its size and encode time"""
+        start = time.perf_counter()
+        data = dumps_json(message).decode("utf-8") if compact else json.dumps(message)
+        chunk = f"id: {event_id}\ndata: {data}\n\n" if event_id else f"data: {data}\n\n"
+        stream_stats["encode_ms"] += (time.perf_counter() - start) * 1000
+        stream_stats["bytes"] += len(chunk.encode("utf-8"))
+        return chunk
+
+    def batch_message(infos: List[dict], loaded: int) -> dict:
+        if compact:
+            start = time.perf_counter()
+            columns = encode_columns(infos, config.get_working_directory())
+            stream_stats["encode_ms"] += (time.perf_counter() - start) * 1000
+            return {"type": "batch", "columns": columns, "loaded": loaded}
+        return {"type": "batch", "videos": infos, "loaded": loaded}
+
+    def done_message() -> dict:
+        """Final message, reporting what this response sent"""
+        return {
+            "type": "done",
+            "bytes": stream_stats["bytes"],
+            "encode_ms": round(stream_stats["encode_ms"], 2),
+            "encoding": encoding.value,
+        }
 
-    async def generate():
-        working_dir = config.get_working_directory()
-        traverse = config.get_traverse_subfolders()
-        include_videos = config.get_include_videos()
-        include_images = config.get_include_images()
+    resume_snapshot = None
+    resume_offset = 0
+    parsed_id = parse_event_id(last_event_id)
+    if parsed_id is not None:
+        resume_snapshot = snapshots.get(parsed_id[0])
+        resume_offset = parsed_id[1]
+        if resume_snapshot is None or resume_offset > len(resume_snapshot.items):
+            resume_snapshot = None  # Expired or unknown: start over
+        else:
+            print(f"[API] Resuming media stream {resume_snapshot.id} at {resume_offset}")
+
+    async def generate(snapshot: StreamSnapshot = None, start: int = 0):
+        if snapshot is None:
+            working_dir = config.get_working_directory()
+            traverse = config.get_traverse_subfolders()
+            include_videos = config.get_include_videos()
+            include_images = config.get_include_images()
+
+            # Single-pass file discovery (much faster than per-extension glob)
+            videos_list, images_list = find_all_media(
+                working_dir, traverse, include_videos, include_images
+            )
+            media_items = [(v, MediaType.VIDEO) for v in videos_list] + \
+                          [(img, MediaType.IMAGE) for img in images_list]
+            media_items.sort(key=lambda x: str(x[0]).lower())
+            snapshot = snapshots.create(media_items, complete=True)
 
-        # Single-pass file discovery (much faster than per-extension glob)
-        videos_list, images_list = find_all_media(
-            working_dir, traverse, include_videos, include_images
-        )
-        media_items = [(v, MediaType.VIDEO) for v in videos_list] + \
-                      [(img, MediaType.IMAGE) for img in images_list]
-        media_items.sort(key=lambda x: str(x[0]).lower())
-        captured_media_items.extend(media_items)
+        working_dir = config.get_working_directory()
+        media_items = snapshot.items
+        captured_media_items.extend(media_items[start:])
         total = len(media_items)
-        batch_size = 100
 
         # Send total count first
-        yield f"data: {json.dumps({'type': 'total', 'count': total})}\n\n"
+        yield sse({'type': 'total', 'count': total})
 
         # Send media in batches
         batch = []
-        for i, (media_path, media_type) in enumerate(media_items):
+        scanner = DirectoryScanner()
+        for i in range(start, total):
+            media_path, media_type = media_items[i]
             try:
-                media_info = get_media_info_fast(media_path, working_dir, media_type)
+                media_info = get_media_info_fast(media_path, working_dir, media_type, scanner=scanner)
                 batch.append(media_info.model_dump())
-
-                # Send batch when full or at end
-                if len(batch) >= batch_size or i == total - 1:
-                    yield f"data: {json.dumps({'type': 'batch', 'videos': batch, 'loaded': i + 1})}\n\n"
-                    batch = []
-                    await asyncio.sleep(0)  # Allow other tasks to run
             except Exception as e:
                 print(f"[API] Error getting info for {media_path}: {e}")
 
+            # Send batch when full or at end
+            if len(batch) >= batch_size or (i == total - 1 and batch):
+                yield sse(batch_message(batch, i + 1), format_event_id(snapshot, i + 1))
+                batch = []
+                await asyncio.sleep(0)  # Allow other tasks to run
+
         # Send done signal
-        yield f"data: {json.dumps({'type': 'done'})}\n\n"
+        yield sse(done_message())
+
+    async def generate_progressive(resume_from: StreamSnapshot = None, start: int = 0):
+        working_dir = config.get_working_directory()
+        traverse = config.get_traverse_subfolders()
+        include_videos = config.get_include_videos()
+        include_images = config.get_include_images()
+        flush_interval = 0.25  # Seconds; small directories are coalesced until then
+
+        # Items the client already has when resuming an interrupted walk
+        sent_items = resume_from.items[:start] if resume_from is not None else []
+        already_sent = {str(media_path) for media_path, _ in sent_items}
+        snapshot = snapshots.create(list(sent_items), complete=False)
+
+        if config.MEDIA_INDEX_ENABLED:
+            index = get_media_index(working_dir)
+        else:
+            index = MediaIndex(working_dir, None)  # Throwaway, just for the walk
+        # Estimate from what the index knew before this walk (0 on a cold start)
+        known_videos, known_images = index.media(traverse, include_videos, include_images)
+        estimate = max(len(known_videos) + len(known_images), start)
+        yield sse({'type': 'total', 'count': estimate, 'estimated': True})
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        # Messages handed to the loop but not yet taken by the stream; bounds the queue
+        slots = threading.Semaphore(8)
+        cancelled = threading.Event()
+
+        def put(message):
+            """Hand a message to the event loop, waiting while the client is behind"""
+            while not slots.acquire(timeout=1.0):
+                if cancelled.is_set():
+                    return
+            if not cancelled.is_set():
+                # Enqueued exactly once: there is no cancellable hand-off to race with
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+
+        def discover():
+            batch = []
+            last_flush = 0.0
+            walk = index.walk(traverse, include_videos, include_images)
+            try:
+                if not working_dir.exists():
+                    return
+                for videos, images in walk:
+                    if cancelled.is_set():
+                        break
+                    items = [(v, MediaType.VIDEO) for v in videos] + [(img, MediaType.IMAGE) for img in images]
+                    items.sort(key=lambda x: x[0].name.lower())
+                    scanner = DirectoryScanner()  # One directory per step
+                    for media_path, media_type in items:
+                        if str(media_path) in already_sent:
+                            continue
+                        try:
+                            batch.append((media_path, media_type, get_media_info_fast(
+                                media_path, working_dir, media_type, scanner=scanner
+                            ).model_dump()))
+                        except Exception as e:
+                            print(f"[API] Error getting info for {media_path}: {e}")
+                    if len(batch) >= batch_size or time.monotonic() - last_flush >= flush_interval:
+                        put(batch)
+                        batch = []
+                        last_flush = time.monotonic()
+                if batch:
+                    put(batch)
+            except Exception as e:
+                print(f"[API] Media discovery failed: {e}")
+            finally:
+                walk.close()
+                put(None)
+
+        discovery = loop.run_in_executor(None, discover)
+        loaded = start
+        try:
+            while True:
+                batch = await queue.get()
+                slots.release()
+                if batch is None:
+                    break
+                loaded += len(batch)
+                items = [(media_path, media_type) for media_path, media_type, _ in batch]
+                snapshot.items.extend(items)
+                captured_media_items.extend(items)
+                if loaded > estimate:
+                    estimate = loaded
+                    yield sse({'type': 'total', 'count': estimate, 'estimated': True})
+                infos = [info for _, _, info in batch]
+                yield sse(batch_message(infos, loaded), format_event_id(snapshot, loaded))
+
+            snapshot.complete = not cancelled.is_set()
+            yield sse({'type': 'total', 'count': loaded, 'estimated': False})
+            yield sse(done_message())
+        finally:
+            # Client went away (or we finished): stop the walk and let the worker exit
+            cancelled.set()
+            while not queue.empty():
+                queue.get_nowait()
+            await discovery
+
+    def select_stream():
+        if resume_snapshot is not None:
+            if resume_snapshot.complete:
+                # Whole list is known: no walk, only the remaining items are serialized
+                return generate(resume_snapshot, resume_offset)
+            return generate_progressive(resume_snapshot, resume_offset)
+        return generate_progressive() if progressive else generate()
 
     async def stream_and_pregenerate():
-        async for chunk in generate():
+        async for chunk in select_stream():
             yield chunk
         # After stream completes, kick off background thumbnail pre-generation
         if captured_media_items:
@@ -498,83 +951,336 @@ async def stream_videos():
     )
 
 
+def _check_listing_encoding(encoding: ListingEncoding) -> None:
+    if encoding == ListingEncoding.MSGPACK and not has_msgpack():
+        raise HTTPException(status_code=400, detail="msgpack encoding needs the msgpack package (pip install msgpack)")
+
+
+def _encoded_listing(
+    body: dict,
+    video_infos: List[VideoInfo],
+    encoding: ListingEncoding,
+    etag: Optional[str] = None,
+) -> Response:
+    """
+    Listing response in a compact encoding: videos become columns. Reports
+    the payload size and encode time in X-Payload-Bytes and Server-Timing.
+    """
+    start = time.perf_counter()
+    body["videos"] = encode_columns(
+        [info.model_dump() for info in video_infos], config.get_working_directory()
+    )
+    if encoding == ListingEncoding.MSGPACK:
+        content, media_type = dumps_msgpack(body), "application/x-msgpack"
+    else:
+        content, media_type = dumps_json(body), "application/json"
+    encode_ms = (time.perf_counter() - start) * 1000
+    headers = {
+        "Server-Timing": f"encode;dur={encode_ms:.2f}",
+        "X-Payload-Bytes": str(len(content)),
+    }
+    if etag is not None:
+        headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
 @app.get("/api/videos", response_model=VideoListResponse)
-async def list_videos(fast: bool = True):
-    """List all videos in working directory"""
+async def list_videos(
+    request: Request,
+    response: Response,
+    fast: bool = True,
+    encoding: ListingEncoding = ListingEncoding.JSON,
+):
+    """
+    List all videos in working directory.
+    Metadata comes from the metadata store; fast=False also probes files the
+    store does not know yet (in parallel) before responding.
+    encoding=compact or msgpack returns videos as columns (listing_codec).
+    Supports If-None-Match against the library ETag.
+    """
+    _check_listing_encoding(encoding)
+    etag = _library_etag("videos", encoding.value, include_metadata=True)
+    not_modified = _check_not_modified(request, response, etag)
+    if not_modified is not None:
+        return not_modified
     working_dir = config.get_working_directory()
     traverse = config.get_traverse_subfolders()
     videos = find_videos(working_dir, traverse_subfolders=traverse)
     video_infos = []
+    scanner = DirectoryScanner()
 
     for video_path in videos:
         try:
-            if fast:
-                # Fast mode: skip ffprobe
-                video_infos.append(get_video_info_fast(video_path, working_dir))
-            else:
-                # Slow mode: get full video metadata
-                info = get_video_info(video_path)
-                # Captions are saved in the same directory as the video
-                caption_path = video_path.parent / (video_path.stem + config.OUTPUT_EXTENSION)
-                has_caption = caption_path.exists()
-                caption_preview = None
-
-                if has_caption:
-                    try:
-                        with open(caption_path, "r", encoding="utf-8") as f:
-                            text = f.read()
-                            caption_preview = text[:150] + "..." if len(text) > 150 else text
-                    except Exception:
-                        pass
-
-                # Use relative path from working directory
-                # Always use forward slashes for consistency with frontend URLs
-                try:
-                    relative_path = video_path.relative_to(working_dir)
-                    name = str(relative_path).replace('\\', '/')
-                except ValueError:
-                    name = video_path.name
-
-                video_infos.append(VideoInfo(
-                    name=name,
-                    path=str(video_path),
-                    size_mb=video_path.stat().st_size / (1024 * 1024),
-                    duration_sec=info.get("duration"),
-                    width=info.get("width"),
-                    height=info.get("height"),
-                    frame_count=info.get("frame_count"),
-                    fps=info.get("fps"),
-                    has_caption=has_caption,
-                    caption_preview=caption_preview,
-                ))
+            video_infos.append(get_media_info_fast(
+                video_path, working_dir, enqueue_missing=fast, scanner=scanner
+            ))
         except Exception as e:
             print(f"[API] Error getting info for {video_path}: {e}")
 
+    store = get_metadata_store()
+    if not fast and store is not None:
+        missing = [Path(info.path) for info in video_infos if info.width is None]
+        if missing:
+            loop = asyncio.get_running_loop()
+            records = await loop.run_in_executor(None, store.probe_many, missing)
+            for info in video_infos:
+                record = records.get(info.path)
+                if record is not None:
+                    _apply_metadata(info, record)
+
+    if encoding != ListingEncoding.JSON:
+        return _encoded_listing({"total_count": len(video_infos)}, video_infos, encoding, etag)
     return VideoListResponse(videos=video_infos, total_count=len(video_infos))
 
 
-@app.post("/api/videos/upload")
-async def upload_video(file: UploadFile = File(...)):
-    """Upload a video file to working directory"""
-    # Validate extension
-    ext = Path(file.filename).suffix.lower()
-    if ext not in config.VIDEO_EXTENSIONS:
+@app.get("/api/videos/page", response_model=VideoPageResponse)
+async def list_videos_page(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    sort: MediaSortField = MediaSortField.NAME,
+    order: SortOrder = SortOrder.ASC,
+    media_type: Optional[MediaType] = None,
+    has_caption: Optional[bool] = None,
+    subfolder: Optional[str] = None,
+    q: Optional[str] = None,
+    encoding: ListingEncoding = ListingEncoding.JSON,
+):
+    """
+    One page of the media library, sorted and filtered server-side.
+    Pass the returned next_cursor back (with the same sort, order and
+    filters) to get the following page.
+    """
+    _check_listing_encoding(encoding)
+    etag = _library_etag(
+        "page", cursor, limit, sort.value, order.value, media_type, has_caption, subfolder, q, encoding.value,
+        include_metadata=True,
+    )
+    not_modified = _check_not_modified(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    working_dir = config.get_working_directory()
+    listing = get_media_listing()
+    try:
+        rows, total, next_cursor = await asyncio.to_thread(
+            listing.query,
+            sort=sort,
+            order=order,
+            media_type=media_type,
+            has_caption=has_caption,
+            subfolder=subfolder,
+            name_contains=q,
+            cursor=cursor,
+            limit=limit,
+        )
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    video_infos = []
+    scanner = DirectoryScanner()
+    for row in rows:
+        try:
+            video_infos.append(get_media_info_fast(row.path, working_dir, row.media_type, scanner=scanner))
+        except Exception as e:
+            print(f"[API] Error getting info for {row.path}: {e}")
+
+    if encoding != ListingEncoding.JSON:
+        return _encoded_listing(
+            {"total_count": total, "next_cursor": next_cursor}, video_infos, encoding, etag
+        )
+    return VideoPageResponse(videos=video_infos, total_count=total, next_cursor=next_cursor)
+
+
+_UPLOAD_EXTENSIONS = config.VIDEO_EXTENSIONS | config.IMAGE_EXTENSIONS
+
+
+def _upload_target(working_dir: Path, filename: str) -> Path:
+    """Destination for an uploaded media file, rejecting traversal and other file types"""
+    relative = Path(filename)
+    if relative.is_absolute() or relative.drive or ".." in relative.parts or not relative.name:
+        raise HTTPException(status_code=400, detail="Path traversal not allowed")
+    if relative.suffix.lower() not in _UPLOAD_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Supported: {', '.join(config.VIDEO_EXTENSIONS)}"
+            detail=f"Invalid file type for {filename}. Supported: {', '.join(sorted(_UPLOAD_EXTENSIONS))}"
         )
+    target = working_dir / relative
+    # Drive-relative names (C:clip.mp4 on Windows) and symlinked subfolders pass the checks above
+    if not target.resolve().is_relative_to(working_dir.resolve()):
+        raise HTTPException(status_code=400, detail="Path traversal not allowed")
+    return target
+
+
+def _invalidate_upload(target: Path) -> None:
+    """Make a finished upload visible in listings of the current working directory"""
+    working_dir = config.get_working_directory()
+    if target.is_relative_to(working_dir):
+        get_media_index(working_dir).invalidate(target.parent)
+
+
+@app.post("/api/videos/upload", response_model=UploadResponse)
+async def upload_video(
+    files: Optional[List[UploadFile]] = File(default=None),
+    file: Optional[UploadFile] = File(default=None),
+):
+    """
+    Upload one or more video or image files to the working directory.
+    Files are written concurrently, in chunks, and renamed into place once
+    complete. For large files use the resumable /api/uploads sessions.
+    """
+    uploads = list(files or []) + ([file] if file is not None else [])
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+
+    working_dir = config.get_working_directory()
+    targets = [_upload_target(working_dir, upload.filename or "") for upload in uploads]
+
+    async def save(upload: UploadFile, target: Path) -> Any:
+        try:
+            size = await asyncio.to_thread(save_upload, upload.file, target)
+            return UploadedFile(filename=upload.filename, path=str(target), size_bytes=size)
+        except Exception as e:
+            print(f"[API] Upload of {upload.filename} failed: {e}")
+            return UploadFailure(filename=upload.filename, error=str(e))
+        finally:
+            await upload.close()
+
+    results = await asyncio.gather(*(save(upload, target) for upload, target in zip(uploads, targets)))
+    uploaded = [r for r in results if isinstance(r, UploadedFile)]
+    failed = [r for r in results if isinstance(r, UploadFailure)]
+    for folder in {Path(r.path).parent for r in uploaded}:
+        get_media_index(working_dir).invalidate(folder)
+    return UploadResponse(success=not failed, uploaded=uploaded, failed=failed)
+
+
+def _upload_session_response(session: UploadSession, offset: int) -> UploadSessionResponse:
+    complete = offset >= session.size_bytes
+    return UploadSessionResponse(
+        upload_id=session.upload_id,
+        filename=session.filename,
+        size_bytes=session.size_bytes,
+        offset=offset,
+        complete=complete,
+        path=session.target if complete else None,
+    )
+
+
+def _get_upload_session(upload_id: str) -> UploadSession:
+    session = get_upload_sessions().get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
 
-    # Save file to working directory
+@app.post("/api/uploads", response_model=UploadSessionResponse)
+async def create_upload_session(request: UploadSessionRequest):
+    """Start a resumable upload; send the bytes with PATCH /api/uploads/{upload_id}"""
     working_dir = config.get_working_directory()
-    file_path = working_dir / file.filename
+    target = _upload_target(working_dir, request.filename)
+
+    free_bytes = (await asyncio.to_thread(shutil.disk_usage, working_dir)).free
+    if request.size_bytes > free_bytes:
+        raise HTTPException(status_code=507, detail="Not enough disk space for this upload")
+
+    sessions = get_upload_sessions()
+    try:
+        session = await asyncio.to_thread(sessions.create, request.filename, target, request.size_bytes)
+        if request.size_bytes == 0:
+            await asyncio.to_thread(sessions.complete, session)
+            _invalidate_upload(target)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _upload_session_response(session, 0)
+
+
+@app.get("/api/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str):
+    """Offset to resume an interrupted upload from"""
+    session = _get_upload_session(upload_id)
+    offset = await asyncio.to_thread(session.offset)
+    return _upload_session_response(session, offset)
+
+
+@app.patch("/api/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., ge=0),
+):
+    """
+    Append the raw request body at Upload-Offset, which must equal the bytes
+    the server has. The body is streamed to disk in chunks; if the client
+    disconnects, the bytes received so far are kept and the upload resumes
+    from the new offset. The file is moved into place once complete.
+    """
+    sessions = get_upload_sessions()
+    session = _get_upload_session(upload_id)
+    if not sessions.acquire(upload_id):
+        raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+
     try:
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        offset = await asyncio.to_thread(session.offset)
+        if upload_offset != offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload-Offset {upload_offset} does not match the {offset} bytes received",
+                headers={"Upload-Offset": str(offset)},
+            )
 
-        return {"success": True, "filename": file.filename, "path": str(file_path)}
-    except Exception as e:
+        remaining = session.size_bytes - offset
+        too_large = False
+        buffer = bytearray()
+        handle = await asyncio.to_thread(open, session.part_path, "ab")
+        try:
+            try:
+                async for chunk in request.stream():
+                    if len(buffer) + len(chunk) > remaining:
+                        too_large = True
+                        break
+                    buffer += chunk
+                    if len(buffer) >= config.UPLOAD_CHUNK_BYTES:
+                        await asyncio.to_thread(handle.write, buffer)
+                        remaining -= len(buffer)
+                        buffer.clear()
+            except ClientDisconnect:
+                pass  # Keep what arrived; the client resumes from the new offset
+            if buffer:
+                await asyncio.to_thread(handle.write, buffer)
+                remaining -= len(buffer)
+        finally:
+            await asyncio.to_thread(handle.close)
+        offset = session.size_bytes - remaining
+        await asyncio.to_thread(sessions.touch, session)
+
+        if too_large:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Body exceeds the declared size of {session.size_bytes} bytes",
+                headers={"Upload-Offset": str(offset)},
+            )
+        if remaining == 0:
+            await asyncio.to_thread(sessions.complete, session)
+            _invalidate_upload(session.target_path)
+            print(f"[API] Upload of {session.filename} complete ({session.size_bytes / 1024 / 1024:.1f} MB)")
+        return _upload_session_response(session, offset)
+    except OSError as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        sessions.release(upload_id)
+
+
+@app.delete("/api/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    """Cancel a resumable upload and delete the bytes received"""
+    session = _get_upload_session(upload_id)
+    if not get_upload_sessions().acquire(upload_id):
+        raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+    try:
+        await asyncio.to_thread(get_upload_sessions().abort, session)
+    finally:
+        get_upload_sessions().release(upload_id)
+    return {"success": True, "aborted": upload_id}
 
 
 @app.delete("/api/videos/{video_name:path}")
@@ -587,6 +1293,7 @@ async def delete_video(video_name: str):
 
     try:
         file_path.unlink()
+        get_media_index(working_dir).invalidate(file_path.parent)
         return {"success": True, "deleted": video_name}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -596,162 +1303,255 @@ async def delete_video(video_name: str):
 # Thumbnail Endpoints
 # ============================================================================
 
-# Thumbnail cache directory
-THUMBNAIL_CACHE_DIR = config.PROJECT_ROOT / ".thumbnail_cache"
-THUMBNAIL_CACHE_DIR.mkdir(exist_ok=True)
-
-# Thread pool for parallel thumbnail generation
-_thumbnail_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="thumb")
-
+def _generate_and_store(media_path: Path, key: str, size: int, fmt: str) -> ThumbnailResult:
+    """Generate a thumbnail and add it to the store"""
+    store = get_thumbnail_store()
+    if store.contains(key):
+        # Finished by an earlier job after this one was queued
+        return ThumbnailResult(True, "store", 0.0, store.get(key))
+    result = generate_any_thumbnail(media_path, size, fmt)
+    if result.ok:
+        store.put(key, result.data)
+    return result
 
-def get_thumbnail_cache_path(video_path: Path, size: int) -> Path:
-    """Generate cache path for thumbnail based on video path and modification time"""
-    stat = video_path.stat()
-    cache_key = f"{video_path.name}_{stat.st_mtime}_{stat.st_size}_{size}"
-    hash_name = hashlib.md5(cache_key.encode()).hexdigest()
-    return THUMBNAIL_CACHE_DIR / f"{hash_name}.jpg"
 
-
-def generate_thumbnail(video_path: Path, output_path: Path, size: int = 160) -> bool:
-    """Generate thumbnail for a video file using ffmpeg"""
-    try:
-        cmd = [
-            "ffmpeg", "-y", "-i", str(video_path),
-            "-ss", "00:00:01",  # Seek to 1 second
-            "-vframes", "1",    # Extract 1 frame
-            "-vf", f"scale={size}:{size}:force_original_aspect_ratio=increase,crop={size}:{size}",
-            "-q:v", "3",        # Quality (2-5 is good)
-            str(output_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, timeout=10)
-        return output_path.exists()
-    except Exception as e:
-        print(f"[API] Thumbnail generation failed for {video_path}: {e}")
-        return False
+def _background_thumbnails_allowed() -> bool:
+    """Background pre-generation yields the CPU while captioning is running"""
+    return not (_processing_manager and _processing_manager.is_processing)
 
 
-def generate_image_thumbnail(image_path: Path, output_path: Path, size: int = 160) -> bool:
-    """Generate thumbnail for an image file using PIL (much faster than ffmpeg)"""
-    from PIL import Image as PILImage
-    try:
-        with PILImage.open(image_path) as img:
-            if img.mode not in ('RGB', 'L'):
-                img = img.convert('RGB')
-            # Resize maintaining aspect ratio then center-crop to square
-            img.thumbnail((size * 2, size * 2), PILImage.Resampling.LANCZOS)
-            width, height = img.size
-            left = (width - min(width, size)) // 2
-            top = (height - min(height, size)) // 2
-            right = left + min(width, size)
-            bottom = top + min(height, size)
-            img = img.crop((left, top, right, bottom))
-            img.save(output_path, "JPEG", quality=85)
-        return output_path.exists()
-    except Exception as e:
-        print(f"[API] Image thumbnail generation failed for {image_path}: {e}")
-        return False
-
+# On-demand requests preempt background pre-generation; one job per thumbnail
+_thumbnail_scheduler = ThumbnailScheduler(
+    _generate_and_store, config.THUMBNAIL_WORKERS, _background_thumbnails_allowed
+)
 
-def _generate_any_thumbnail(media_path: Path, cache_path: Path, size: int) -> bool:
-    """Route to the correct thumbnail generator based on file extension"""
-    ext = media_path.suffix.lower()
-    if ext in config.IMAGE_EXTENSIONS:
-        return generate_image_thumbnail(media_path, cache_path, size)
-    else:
-        return generate_thumbnail(media_path, cache_path, size)
 
+def _queue_background_thumbnails(media_items: list) -> int:
+    """Replace queued background work with jobs for every media file not in the store"""
+    default_size = config.THUMBNAIL_DEFAULT_SIZE
+    fmt = preferred_format()
+    store = get_thumbnail_store()
+    _thumbnail_scheduler.cancel_background()
 
-async def _pregenerate_thumbnails(media_items: list):
-    """Background task: pre-generate thumbnails for all uncached media files."""
-    default_size = 200  # Match VideoTile.vue thumbnailSize default
-
-    uncached = []
+    queued = 0
     for media_path, media_type in media_items:
         try:
-            cache_path = get_thumbnail_cache_path(media_path, default_size)
-            if not cache_path.exists():
-                uncached.append((media_path, cache_path, default_size))
-        except Exception:
+            key = store.make_key(media_path, media_path.stat(), default_size, fmt)
+        except OSError:
             continue
+        if not store.contains(key):
+            _thumbnail_scheduler.submit(key, media_path, default_size, fmt, BACKGROUND)
+            queued += 1
+    return queued
 
-    if not uncached:
-        return
 
-    print(f"[API] Pre-generating {len(uncached)} thumbnails in background...")
-    loop = asyncio.get_event_loop()
-    generated = 0
-
-    # Process in batches of 50 to avoid overwhelming I/O
-    batch_size = 50
-    for i in range(0, len(uncached), batch_size):
-        batch = uncached[i:i + batch_size]
-        futures = [
-            loop.run_in_executor(
-                _thumbnail_executor,
-                _generate_any_thumbnail,
-                media_path, cache_path, size
-            )
-            for media_path, cache_path, size in batch
-        ]
-        results = await asyncio.gather(*futures, return_exceptions=True)
-        generated += sum(1 for r in results if r is True)
-        await asyncio.sleep(0)  # Yield to other tasks
-
-    print(f"[API] Pre-generated {generated}/{len(uncached)} thumbnails")
+async def _pregenerate_thumbnails(media_items: list):
+    """Background task: queue thumbnails for all uncached media files."""
+    queued = await asyncio.to_thread(_queue_background_thumbnails, media_items)
+    if queued:
+        print(f"[API] Queued {queued} thumbnails for background generation")
 
 
 @app.get("/api/videos/{video_name:path}/thumbnail")
-async def get_video_thumbnail(video_name: str, size: int = 160):
-    """Get thumbnail for a media file. Generates and caches if not exists."""
-    # Clamp size to reasonable bounds
-    size = max(64, min(320, size))
+async def get_video_thumbnail(video_name: str, request: Request, size: int = 160):
+    """Get thumbnail for a media file. Generates and stores it if missing."""
+    # Clamp size to reasonable bounds, then snap to a stored size
+    size = snap_size(max(64, min(320, size)))
 
     working_dir = config.get_working_directory()
     video_path = working_dir / video_name
-    if not video_path.exists():
+    try:
+        stat = video_path.stat()
+    except OSError:
         raise HTTPException(status_code=404, detail="Media not found")
 
-    cache_path = get_thumbnail_cache_path(video_path, size)
+    fmt = negotiate_format(request.headers.get("accept"))
+    store = get_thumbnail_store()
+    key = store.make_key(video_path, stat, size, fmt)
 
-    # Check cache - generate in thread to avoid blocking event loop
-    if not cache_path.exists():
-        success = await asyncio.to_thread(_generate_any_thumbnail, video_path, cache_path, size)
-        if not success:
+    headers = {
+        "Cache-Control": "public, max-age=86400",  # Cache for 24 hours
+        "ETag": f'"{key}"',  # Strong: the key covers file identity, size and format
+        "Vary": "Accept",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    data = store.get(key)
+    if data is None:
+        # Shares the job with concurrent requests, which a disconnecting client must not cancel
+        future = _thumbnail_scheduler.submit(key, video_path, size, fmt, FOREGROUND)
+        result = await asyncio.shield(asyncio.wrap_future(future))
+        if not result.ok:
             raise HTTPException(status_code=500, detail="Failed to generate thumbnail")
+        data = result.data
+        headers["Server-Timing"] = f'thumb;dur={result.elapsed_ms:.1f};desc="{result.backend}"'
 
-    # Return cached thumbnail
-    return FileResponse(
-        cache_path,
-        media_type="image/jpeg",
-        headers={
-            "Cache-Control": "public, max-age=86400",  # Cache for 24 hours
-            "ETag": cache_path.stem,
+    return Response(content=data, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
+
+
+@app.post("/api/thumbnails/sprite", response_model=ThumbnailSpriteResponse)
+async def create_thumbnail_sprite(request: ThumbnailSpriteRequest):
+    """
+    Pack the thumbnails of several media files into one sheet. Returns the
+    tile offsets and the URL of the sheet; missing thumbnails are generated
+    concurrently first.
+    """
+    size = snap_size(max(64, min(320, request.size)))
+    fmt = preferred_format()
+    working_dir = config.get_working_directory()
+    store = get_thumbnail_store()
+    sheets = get_sprite_sheets()
+
+    def resolve():
+        root = working_dir.resolve()
+        found = []
+        for name in request.names:
+            media_path = working_dir / name
+            key = None
+            try:
+                # Names that resolve outside the working directory (.., absolute
+                # paths, symlinks) are reported missing, never read
+                if media_path.resolve().is_relative_to(root):
+                    key = store.make_key(media_path, media_path.stat(), size, fmt)
+            except OSError:
+                pass
+            found.append((name, media_path, key))
+        return found
+
+    entries = await asyncio.to_thread(resolve)
+    columns = min(request.columns, len(entries))
+    sprite_id = make_sprite_id(
+        [name for name, _path, _key in entries], [key for _name, _path, key in entries], size, columns
+    )
+
+    sheet = sheets.get(sprite_id)
+    if sheet is None:
+        tiles = await asyncio.to_thread(lambda: [store.get(key) if key else None for _n, _p, key in entries])
+
+        # Missing thumbnails go to the scheduler ahead of background work
+        pending = {
+            index: _thumbnail_scheduler.submit(key, media_path, size, fmt, FOREGROUND)
+            for index, (_name, media_path, key) in enumerate(entries)
+            if key is not None and tiles[index] is None
         }
+        results = await asyncio.gather(
+            *(asyncio.shield(asyncio.wrap_future(future)) for future in pending.values()),
+            return_exceptions=True,
+        )
+        for index, result in zip(pending, results):
+            if isinstance(result, ThumbnailResult) and result.ok:
+                tiles[index] = result.data
+
+        placed = [(name, data) for (name, _path, _key), data in zip(entries, tiles) if data is not None]
+        missing = [name for (name, _path, _key), data in zip(entries, tiles) if data is None]
+
+        def build():
+            pixels = compose_sheet([data for _name, data in placed], size, columns)
+            return pixels.shape[1], pixels.shape[0], encode_thumbnail(pixels, fmt)
+
+        width, height, data = await asyncio.to_thread(build)
+        if data is None:
+            raise HTTPException(status_code=500, detail="Failed to encode sprite sheet")
+        sheet = SpriteSheet(
+            size=size,
+            columns=columns,
+            width=width,
+            height=height,
+            tiles={
+                name: ((index % columns) * size, (index // columns) * size)
+                for index, (name, _data) in enumerate(placed)
+            },
+            missing=missing,
+            encoded={fmt: data},
+        )
+        if missing:
+            # Served once under a one-off id, so the next request retries the
+            # missing tiles instead of reusing (or browser-caching) this sheet
+            sprite_id = f"{sprite_id}-{uuid.uuid4().hex[:8]}"
+        sheets.put(sprite_id, sheet)
+
+    return ThumbnailSpriteResponse(
+        sheet=f"/api/thumbnails/sprite/{sprite_id}",
+        size=sheet.size,
+        columns=sheet.columns,
+        width=sheet.width,
+        height=sheet.height,
+        tiles={name: list(offset) for name, offset in sheet.tiles.items()},
+        missing=sheet.missing,
     )
 
 
+@app.get("/api/thumbnails/sprite/{sprite_id}")
+async def get_thumbnail_sprite(sprite_id: str, request: Request):
+    """Sprite sheet image built by POST /api/thumbnails/sprite"""
+    fmt = negotiate_format(request.headers.get("accept"))
+    headers = {
+        "Cache-Control": "public, max-age=86400",
+        "ETag": f'"{sprite_id}.{fmt}"',  # The id covers every tile's file identity
+        "Vary": "Accept",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    data = await asyncio.to_thread(get_sprite_sheets().encoded, sprite_id, fmt)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Sprite sheet expired; request it again")
+    return Response(content=data, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
+
+
+@app.get("/api/thumbnails/stats")
+async def get_thumbnail_stats():
+    """Thumbnail store counters and generation latency"""
+    stats = await asyncio.to_thread(get_thumbnail_store().stats)
+    stats["generation"] = thumbnail_stats()
+    stats["scheduler"] = _thumbnail_scheduler.stats()
+    return stats
+
+
 @app.delete("/api/thumbnails/cache")
 async def clear_thumbnail_cache():
     """Clear the thumbnail cache"""
     try:
-        count = 0
-        for f in THUMBNAIL_CACHE_DIR.glob("*.jpg"):
-            f.unlink()
-            count += 1
+        count = await asyncio.to_thread(get_thumbnail_store().clear)
         return {"success": True, "cleared": count}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/videos/{video_name:path}/stream")
-async def stream_video(video_name: str):
-    """Stream video file for preview playback"""
+async def stream_video(
+    video_name: str,
+    preview: str = Query(default="auto", pattern="^(auto|proxy|original)$"),
+):
+    """
+    Stream video file for preview playback.
+
+    preview=auto serves a low-bitrate proxy for large files and containers
+    browsers cannot play, proxy always does, original never does. A proxy that
+    is not built yet is queued and the original is streamed meanwhile; the
+    X-Preview-Proxy header reports which was served.
+    """
     working_dir = config.get_working_directory()
     video_path = working_dir / video_name
 
     if not video_path.exists():
         raise HTTPException(status_code=404, detail="Video not found")
 
+    proxy_status = None
+    if config.PREVIEW_PROXY_ENABLED and preview != "original":
+        stat = video_path.stat()
+        proxies = get_preview_proxies()
+        if preview == "proxy" or proxies.wants_proxy(video_path, stat):
+            proxy_path = await asyncio.to_thread(proxies.get, video_path, stat)
+            if proxy_path is not None:
+                return FileResponse(
+                    path=proxy_path,
+                    media_type=proxies.codec()["media_type"],
+                    headers={"X-Preview-Proxy": "ready"},
+                )
+            proxy_status = proxies.status(video_path, stat)
+
     # Determine MIME type based on extension
     ext = video_path.suffix.lower()
     mime_types = {
@@ -770,16 +1570,37 @@ async def stream_video(video_name: str):
         path=video_path,
         media_type=content_type,
         filename=video_name,
+        headers={"X-Preview-Proxy": proxy_status} if proxy_status else None,
     )
 
 
+@app.get("/api/previews/stats")
+async def get_preview_proxy_stats():
+    """Preview proxy cache counters"""
+    return await asyncio.to_thread(get_preview_proxies().stats)
+
+
+@app.delete("/api/previews/cache")
+async def clear_preview_proxy_cache():
+    """Delete every preview proxy"""
+    try:
+        count = await asyncio.to_thread(get_preview_proxies().clear)
+        return {"success": True, "cleared": count}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================================================
 # Caption Endpoints
 # ============================================================================
 
 @app.get("/api/captions", response_model=CaptionListResponse)
-async def list_captions():
+async def list_captions(request: Request, response: Response):
     """List all generated captions in working directory"""
+    not_modified = _check_not_modified(request, response, _library_etag("captions"))
+    if not_modified is not None:
+        return not_modified
+
     captions = []
     working_dir = config.get_working_directory()
     traverse = config.get_traverse_subfolders()
@@ -816,16 +1637,23 @@ async def list_captions():
 
 
 @app.get("/api/captions/{video_name:path}")
-async def get_caption(video_name: str):
-    """Get caption for a specific video"""
+async def get_caption(video_name: str, request: Request, response: Response):
+    """Get caption for a specific video (ETag from the caption file's mtime and size)"""
     working_dir = config.get_working_directory()
     # Construct path relative to working directory, then get the caption path
     video_path = working_dir / video_name
     caption_path = video_path.parent / (video_path.stem + config.OUTPUT_EXTENSION)
 
-    if not caption_path.exists():
+    try:
+        stat = caption_path.stat()
+    except OSError:
         raise HTTPException(status_code=404, detail="Caption not found")
 
+    etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    not_modified = _check_not_modified(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
     try:
         with open(caption_path, "r", encoding="utf-8") as f:
             text = f.read()
@@ -834,7 +1662,7 @@ async def get_caption(video_name: str):
             video_name=video_path.stem,
             caption_path=str(caption_path),
             caption_text=text,
-            created_at=datetime.fromtimestamp(caption_path.stat().st_mtime).isoformat(),
+            created_at=datetime.fromtimestamp(stat.st_mtime).isoformat(),
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -853,6 +1681,7 @@ async def delete_caption(video_name: str):
 
     try:
         caption_path.unlink()
+        bump_library_generation()
         return {"success": True, "deleted": video_path.stem}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1065,6 +1894,35 @@ async def websocket_resources(websocket: WebSocket):
         print("[API] Resource monitor WebSocket disconnected")
 
 
+# ============================================================================
+# WebSocket for Library Updates
+# ============================================================================
+
+@app.websocket("/ws/library")
+async def websocket_library(websocket: WebSocket):
+    """
+    WebSocket endpoint for media library updates.
+    Sends {"type": "enriched", "videos": [VideoInfo, ...]} as background
+    metadata probes complete.
+    """
+    await websocket.accept()
+    _library_websockets.add(websocket)
+    print(f"[API] Library WebSocket connected. Total: {len(_library_websockets)}")
+
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"[API] Library WebSocket error: {e}")
+    finally:
+        _library_websockets.discard(websocket)
+        print(f"[API] Library WebSocket disconnected. Total: {len(_library_websockets)}")
+
+
 # ============================================================================
 # Analytics Endpoints
 # ============================================================================
@@ -1080,9 +1938,36 @@ from backend.analytics import (
 import time as time_module
 
 
+# Analytics results by (endpoint, library ETag, request), so repeated POSTs
+# while nothing changed skip re-reading every caption
+_analytics_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+_ANALYTICS_CACHE_SIZE = 32
+
+
+def _cached_analytics(endpoint: str, request_model, compute):
+    """Return compute() for this request, reusing it while the library is unchanged"""
+    etag = _library_etag("analytics")
+    if etag is None:
+        return compute()
+    key = (endpoint, etag, request_model.model_dump_json())
+    cached = _analytics_cache.get(key)
+    if cached is not None:
+        _analytics_cache.move_to_end(key)
+        return cached
+    result = compute()
+    _analytics_cache[key] = result
+    while len(_analytics_cache) > _ANALYTICS_CACHE_SIZE:
+        _analytics_cache.popitem(last=False)
+    return result
+
+
 @app.get("/api/analytics/summary", response_model=AnalyticsSummary)
-async def get_analytics_summary():
+async def get_analytics_summary(request: Request, response: Response):
     """Get quick analytics summary for all captions"""
+    not_modified = _check_not_modified(request, response, _library_etag("analytics-summary"))
+    if not_modified is not None:
+        return not_modified
+
     working_dir = config.get_working_directory()
     traverse = config.get_traverse_subfolders()
 
@@ -1125,7 +2010,11 @@ async def get_analytics_summary():
 
 @app.post("/api/analytics/wordfreq", response_model=WordFrequencyResponse)
 async def analyze_word_frequency(request: WordFrequencyRequest):
-    """Analyze word frequency across captions"""
+    """Analyze word frequency across captions (cached until the library changes)"""
+    return _cached_analytics("wordfreq", request, lambda: _analyze_word_frequency(request))
+
+
+def _analyze_word_frequency(request: WordFrequencyRequest) -> WordFrequencyResponse:
     start_time = time_module.time()
 
     working_dir = config.get_working_directory()
@@ -1172,7 +2061,11 @@ async def analyze_word_frequency(request: WordFrequencyRequest):
 
 @app.post("/api/analytics/ngrams", response_model=NgramResponse)
 async def analyze_ngrams(request: NgramRequest):
-    """Analyze n-gram frequency across captions"""
+    """Analyze n-gram frequency across captions (cached until the library changes)"""
+    return _cached_analytics("ngrams", request, lambda: _analyze_ngrams(request))
+
+
+def _analyze_ngrams(request: NgramRequest) -> NgramResponse:
     working_dir = config.get_working_directory()
     traverse = config.get_traverse_subfolders()
 
@@ -1209,7 +2102,11 @@ async def analyze_ngrams(request: NgramRequest):
 
 @app.post("/api/analytics/correlations", response_model=CorrelationResponse)
 async def analyze_correlations(request: CorrelationRequest):
-    """Analyze word co-occurrence correlations using PMI"""
+    """Analyze word co-occurrence correlations using PMI (cached until the library changes)"""
+    return _cached_analytics("correlations", request, lambda: _analyze_correlations(request))
+
+
+def _analyze_correlations(request: CorrelationRequest) -> CorrelationResponse:
     working_dir = config.get_working_directory()
     traverse = config.get_traverse_subfolders()
 
@@ -161,6 +161,41 @@ MAX_FRAMES_PER_VIDEO = 128
 # Range: 224 - 672 (multiples of 56 work best)
 FRAME_SIZE = 336
 
+# Frame sampling strategy: "auto", "sequential", or "seek"
+# sequential = single forward pass with grab(), retrieve() only at sampled frames
+# seek = seek to each distant sampled frame (grab forward when it is close by)
+# auto = sequential when samples are dense, seek when they are sparse
+FRAME_SAMPLE_STRATEGY = "auto"
+
+# Average gap (in frames) between samples below which a forward pass is cheaper
+# than seeking. Every seek decodes from the previous keyframe, so this should be
+# around half a typical GOP (x264 defaults to a 250 frame keyframe interval)
+SEQUENTIAL_MAX_GAP = 120
+
+# Decode backend: "auto", "opencv", "ffmpeg", or "pyav"
+# ffmpeg and pyav scale frames during decode, so 4K sources are never copied
+# out at full resolution. pyav needs `pip install av`, ffmpeg needs it on PATH
+DECODE_BACKEND = "auto"
+
+# Order backends are tried in for "auto", and the fallbacks after a named
+# backend fails on a file. Backends that are not installed are skipped
+DECODE_BACKEND_ORDER = ["pyav", "opencv", "ffmpeg"]
+
+# Adaptive sampling (sample_method "adaptive"): decode this many times
+# max_frames evenly spaced candidates, then keep only the candidates where the
+# picture changes. Static videos end up with far fewer frames (and tokens)
+ADAPTIVE_CANDIDATE_FACTOR = 3
+
+# Change (0-1) from the last kept frame needed to keep a candidate. Measured as
+# the larger of the mean pixel difference and luma histogram distance
+ADAPTIVE_CHANGE_THRESHOLD = 0.08
+
+# Side of the grayscale thumbnails compared by adaptive sampling
+ADAPTIVE_SIGNATURE_SIZE = 32
+
+# Fewest frames adaptive sampling returns, even for a completely static video
+ADAPTIVE_MIN_FRAMES = 4
+
 # Maximum tokens to generate per caption
 MAX_TOKENS = 512
 
@@ -176,6 +211,186 @@ DEFAULT_PROMPT = """Describe this video in detail. Include:
 - The overall mood or atmosphere
 - Any text visible in the video"""
 
+# =============================================================================
+# FRAME CACHE
+# =============================================================================
+
+# Cache decoded frames on disk so re-captioning with a new prompt skips decode.
+# Entries are keyed by file path, mtime, size, max_frames, frame_size and
+# sample method, so any change to the video or those settings is a miss.
+FRAME_CACHE_ENABLED = True
+
+# Where cached frames are stored
+FRAME_CACHE_DIR = PROJECT_ROOT / ".frame_cache"
+
+# Byte budget for the frame cache; least recently used entries are evicted
+# 16 frames at 336px is ~3 MB per video, 128 frames is ~24 MB
+FRAME_CACHE_MAX_BYTES = 20 * 1024 ** 3
+
+# =============================================================================
+# THUMBNAILS
+# =============================================================================
+
+# Video thumbnail backends, tried in order. "pyav" and "opencv" grab one frame
+# in-process; "ffmpeg" starts a subprocess per thumbnail and is the fallback
+THUMBNAIL_BACKEND_ORDER = ["pyav", "opencv", "ffmpeg"]
+
+# Video thumbnails come from the keyframe at or before this point (seconds)
+THUMBNAIL_SEEK_SECONDS = 1.0
+
+# Thumbnail formats in preference order; each request gets the first one its
+# Accept header names that Pillow can encode here. JPEG is always the fallback
+# At thumbnail sizes WebP and AVIF are both about half of JPEG; WebP encodes
+# faster, so it comes first
+THUMBNAIL_FORMATS = ["webp", "avif", "jpeg"]
+
+# Encoder quality per format (0-100)
+THUMBNAIL_JPEG_QUALITY = 85
+THUMBNAIL_WEBP_QUALITY = 80
+THUMBNAIL_AVIF_QUALITY = 60
+
+# Requested sizes snap up to one of these, so a size slider does not store a
+# near-duplicate for every pixel value
+THUMBNAIL_SIZE_BUCKETS = [96, 160, 200, 256, 320]
+
+# Size generated ahead of time (background pass and captioning); matches the
+# thumbnailSize default in VideoTile.vue
+THUMBNAIL_DEFAULT_SIZE = 200
+
+# Generated thumbnails are packed into append-only files under this directory
+THUMBNAIL_STORE_DIR = PROJECT_ROOT / ".thumbnail_store"
+
+# Byte budget for stored thumbnails; least recently used are evicted
+# A 200px JPEG is ~10 KB, so 1 GB holds ~100k thumbnails
+THUMBNAIL_STORE_MAX_BYTES = 1024 ** 3
+
+# Size at which a pack file is sealed and a new one started
+THUMBNAIL_PACK_MAX_BYTES = 64 * 1024 ** 2
+
+# Sealed packs are rewritten once this share of their bytes is evicted
+THUMBNAIL_COMPACT_RATIO = 0.5
+
+# Thumbnail generation threads, shared by on-demand and background jobs
+# Background jobs pause while captioning runs; on-demand ones do not
+THUMBNAIL_WORKERS = 2
+
+# Recently built sprite sheets kept in memory (about 250 KB each for 60 tiles)
+THUMBNAIL_SPRITE_CACHE_SIZE = 64
+
+# =============================================================================
+# PREVIEW PROXIES
+# =============================================================================
+
+# Serve hover previews from small transcoded renditions instead of the
+# original file. Proxies are built in the background on first request; the
+# original is streamed until the proxy is ready
+PREVIEW_PROXY_ENABLED = True
+
+# Where proxies are stored
+PREVIEW_PROXY_DIR = PROJECT_ROOT / ".preview_cache"
+
+# Byte budget for proxies; least recently served are evicted
+# A minute of 480p preview is ~3-5 MB
+PREVIEW_PROXY_MAX_BYTES = 10 * 1024 ** 3
+
+# Proxy codec: "h264" (MP4, plays everywhere) or "vp9" (WebM, smaller, slower)
+PREVIEW_PROXY_CODEC = "h264"
+
+# Proxy height in pixels (never upscaled) and frame rate cap
+PREVIEW_PROXY_HEIGHT = 480
+PREVIEW_PROXY_MAX_FPS = 30
+
+# In "auto" mode, files at least this large get a proxy. Containers browsers
+# cannot play (.mov, .mkv, .avi, ...) always do
+PREVIEW_PROXY_MIN_BYTES = 50 * 1024 ** 2
+
+# Transcode backends in the order they are tried. pyav encodes in-process,
+# ffmpeg needs it on PATH
+PREVIEW_PROXY_BACKEND_ORDER = ["pyav", "ffmpeg"]
+
+# Concurrent proxy transcodes
+PREVIEW_PROXY_WORKERS = 1
+
+# =============================================================================
+# MEDIA METADATA STORE
+# =============================================================================
+
+# Persist probed media metadata (resolution, fps, frame count, duration) so
+# listings return it without opening every file. Entries are keyed by path
+# and revalidated against the file's mtime and size on every lookup.
+METADATA_STORE_ENABLED = True
+
+# SQLite database holding the probed metadata
+METADATA_STORE_PATH = PROJECT_ROOT / ".media_metadata.db"
+
+# Background threads probing files that are not in the store yet
+METADATA_PROBE_WORKERS = 4
+
+# How long enriched records are collected before being pushed to clients
+# over /ws/library, in seconds
+METADATA_PUSH_INTERVAL = 0.5
+
+# =============================================================================
+# MEDIA INDEX
+# =============================================================================
+
+# Answer listings from an index of each working directory that remembers
+# directory mtimes, rescanning only directories whose entries changed.
+# Disable for filesystems that do not update directory mtimes
+MEDIA_INDEX_ENABLED = True
+
+# SQLite database persisting the index across restarts
+MEDIA_INDEX_PATH = PROJECT_ROOT / ".media_index.db"
+
+# Listings within this many seconds of the last refresh reuse the index as-is
+# instead of re-checking directory mtimes
+MEDIA_INDEX_MIN_REFRESH_INTERVAL = 2.0
+
+# Working directories whose index is kept in memory
+MEDIA_INDEX_MAX_ROOTS = 4
+
+# Caption previews kept in memory, keyed by caption mtime, so listings do not
+# reopen caption files that have not changed
+CAPTION_PREVIEW_CACHE_SIZE = 50000
+
+# =============================================================================
+# LIBRARY STREAM
+# =============================================================================
+
+# /api/videos/stream keeps the media list it sent so a client reconnecting
+# with Last-Event-ID resumes where it left off instead of starting over.
+# Snapshots unused for this many seconds are dropped
+STREAM_SNAPSHOT_TTL = 300.0
+
+# Snapshots kept at most (oldest dropped first)
+STREAM_SNAPSHOT_MAX = 8
+
+# =============================================================================
+# LIBRARY WATCHER
+# =============================================================================
+
+# Watch the working directory and push added/removed/caption-changed deltas
+# over /ws/library. Uses watchdog if installed, otherwise polls directory mtimes
+WATCH_ENABLED = True
+
+# Seconds without new events before a batch of changes is processed
+WATCH_DEBOUNCE = 0.5
+
+# Longest a batch is held back while events keep arriving (seconds)
+WATCH_MAX_DELAY = 3.0
+
+# Poll interval when watchdog is not installed (seconds)
+WATCH_POLL_INTERVAL = 5.0
+
+# =============================================================================
+# DECODE WORKERS
+# =============================================================================
+
+# Maximum decoded results held in shared memory at once when decode runs in
+# worker processes (Settings.decode_workers > 0). Each buffer holds one file's
+# frames: max_frames * frame_size^2 * 3 bytes (~5 MB at 16 frames, 336px)
+DECODE_MAX_OUTSTANDING_BUFFERS = 8
+
 # =============================================================================
 # OPTIMIZATION FLAGS
 # =============================================================================
@@ -199,6 +414,22 @@ OUTPUT_EXTENSION = ".txt"
 # Include metadata in output (timing, token counts, etc.)
 INCLUDE_METADATA = False
 
+# =============================================================================
+# UPLOADS
+# =============================================================================
+
+# Bytes copied per read while an upload is written to disk, and buffered
+# before each write of a resumable upload request body
+UPLOAD_CHUNK_BYTES = 4 * 1024 ** 2
+
+# Resumable upload sessions (id, destination, size) are kept here; the
+# uploaded bytes go to a hidden .part file next to the destination
+UPLOAD_SESSION_DIR = PROJECT_ROOT / ".uploads"
+
+# Sessions without any upload activity for this long are deleted together
+# with their part files (seconds)
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
 # =============================================================================
 # MEDIA FILE EXTENSIONS
 # =============================================================================
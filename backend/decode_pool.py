@@ -0,0 +1,182 @@
+"""
+Process pool for frame decoding
+Decodes media in worker processes and hands the frames back through shared
+memory, so OpenCV decode, colour conversion and resizing do not compete with
+the API event loop and the generate threads for the GIL
+"""
+
+import asyncio
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a parent-owned block; only the parent may unlink it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Older Pythons register the block again, but pool workers share the
+        # parent's resource tracker and registrations are a set, so it is a no-op
+        return shared_memory.SharedMemory(name=name)
+
+
+def _decode_worker(
+    path_str: str,
+    is_image: bool,
+    max_frames: int,
+    frame_size: int,
+    sample_method: str,
+    sample_strategy: str,
+    decode_backend: str,
+    slot_name: Optional[str],
+    slot_bytes: int,
+) -> Tuple[Tuple[int, ...], dict, Optional[np.ndarray]]:
+    """
+    Runs in a worker process: decode one file and write its frames into the
+    shared memory slot. Returns (shape, metadata, overflow) where overflow is
+    the array itself only when it does not fit in the slot.
+    """
+    from backend.video_processor import process_video, process_image
+
+    media_path = Path(path_str)
+    if is_image:
+        array, metadata = process_image(media_path, frame_size=frame_size)
+    else:
+        array, metadata = process_video(
+            media_path,
+            max_frames=max_frames,
+            frame_size=frame_size,
+            sample_method=sample_method,
+            sample_strategy=sample_strategy,
+            decode_backend=decode_backend,
+        )
+
+    if slot_name is None or array.nbytes > slot_bytes:
+        # Extreme aspect ratios can exceed the slot; fall back to pickling
+        return array.shape, metadata, array
+
+    shm = _attach_shared_memory(slot_name)
+    try:
+        np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf)[:] = array
+    finally:
+        shm.close()
+    return array.shape, metadata, None
+
+
+class DecodePool:
+    """
+    Worker processes that decode media into parent-owned shared memory slots.
+
+    Slots are allocated lazily, sized for max_frames frames at frame_size, and
+    at most max_outstanding of them are in use at once. A slot stays in use
+    until the caller releases the frames, so callers wait for a free slot,
+    which bounds both shared memory use and how far decode can run ahead of
+    preprocessing.
+    """
+
+    def __init__(self, num_workers: int, max_outstanding: int, slot_bytes: int):
+        self.num_workers = num_workers
+        self.max_outstanding = max_outstanding
+        self.slot_bytes = slot_bytes
+        # spawn: never fork a process that holds CUDA contexts
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=mp.get_context("spawn"),
+        )
+        self._slots: List[shared_memory.SharedMemory] = []
+        self._free_slots: List[shared_memory.SharedMemory] = []
+        self._semaphore = asyncio.Semaphore(max_outstanding)
+        print(f"[DecodePool] Started {num_workers} decode workers ({max_outstanding} buffers of {slot_bytes / (1024 ** 2):.1f} MB)")
+
+    @staticmethod
+    def slot_bytes_for(max_frames: int, frame_size: int) -> int:
+        """Slot size that fits max_frames RGB frames whose longest side is frame_size"""
+        return max_frames * frame_size * frame_size * 3
+
+    def _take_slot(self) -> Optional[shared_memory.SharedMemory]:
+        if self._free_slots:
+            return self._free_slots.pop()
+        try:
+            slot = shared_memory.SharedMemory(create=True, size=self.slot_bytes)
+        except OSError as e:
+            # e.g. /dev/shm too small in a container; results get pickled instead
+            print(f"[DecodePool] Could not allocate shared memory: {e}")
+            return None
+        self._slots.append(slot)
+        return slot
+
+    async def decode(
+        self,
+        media_path: Path,
+        is_image: bool,
+        max_frames: int,
+        frame_size: int,
+        sample_method: str = "uniform",
+        sample_strategy: str = None,
+        decode_backend: str = None,
+    ) -> Tuple[np.ndarray, dict, Callable[[], None]]:
+        """
+        Decode one media file in a worker process.
+
+        Returns (frames, metadata, release). frames is a (N, H, W, 3) view
+        straight into shared memory; it stays valid until release() is called,
+        which must happen once the frames have been consumed.
+        """
+        await self._semaphore.acquire()
+        slot = self._take_slot()
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            if slot is not None:
+                self._free_slots.append(slot)
+            self._semaphore.release()
+
+        try:
+            loop = asyncio.get_running_loop()
+            shape, metadata, overflow = await loop.run_in_executor(
+                self._executor,
+                _decode_worker,
+                str(media_path),
+                is_image,
+                max_frames,
+                frame_size,
+                sample_method,
+                sample_strategy,
+                decode_backend,
+                slot.name if slot is not None else None,
+                self.slot_bytes,
+            )
+        except BaseException:
+            release()
+            raise
+
+        if overflow is not None:
+            release()  # Result came back pickled; the slot was never written
+            frames = overflow
+        else:
+            frames = np.ndarray(shape, dtype=np.uint8, buffer=slot.buf)
+
+        metadata["decode_worker"] = "process"
+        return frames, metadata, release
+
+    def close(self) -> None:
+        """Stop worker processes and free all shared memory"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for slot in self._slots:
+            try:
+                slot.close()
+                slot.unlink()
+            except Exception:
+                pass
+        self._slots.clear()
+        self._free_slots.clear()
+        print("[DecodePool] Shut down")
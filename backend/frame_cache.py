@@ -0,0 +1,209 @@
+"""
+Persistent decoded-frame cache
+Stores sampled, resized frames on disk so re-captioning a library with a new
+prompt skips video decode entirely
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from backend import config
+
+
+class FrameCache:
+    """
+    On-disk cache of decoded frames with a byte budget and LRU eviction.
+
+    Each entry is a (N, H, W, 3) uint8 .npy array, loaded memory-mapped on a
+    hit, plus a small JSON sidecar holding the video info and decode stats so
+    a hit does not need to open the container either. Entry mtimes record
+    last access, which keeps the LRU order across restarts. Decode worker
+    processes share the directory, so every put rebuilds the index from disk
+    before evicting: the byte budget holds for the directory as a whole, not
+    per process.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> entry size in bytes, least recently used first
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def make_key(
+        video_path: Path,
+        max_frames: int,
+        frame_size: int,
+        sample_method: str,
+    ) -> str:
+        """Cache key from the file identity and every setting that changes the frames"""
+        stat = video_path.stat()
+        raw = (
+            f"{video_path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|"
+            f"{max_frames}|{frame_size}|{sample_method}"
+        )
+        if sample_method == "adaptive":
+            # Adaptive sampling settings decide which frames are kept
+            adaptive = sorted((name, getattr(config, name)) for name in dir(config) if name.startswith("ADAPTIVE_"))
+            raw += "|" + json.dumps(adaptive)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _array_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
+
+    def _info_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_index(self, rescan: bool = False) -> None:
+        """Build the in-memory LRU index from the cache directory (called under lock)"""
+        if self._entries is not None and not rescan:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        found = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".npy"):
+                    continue
+                try:
+                    stat = entry.stat()
+                    info_size = os.path.getsize(self._info_path(entry.name[:-4]))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, entry.name[:-4], stat.st_size + info_size))
+
+        found.sort()
+        self._entries = OrderedDict((key, size) for _mtime, key, size in found)
+        self._total_bytes = sum(self._entries.values())
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """Return (memory-mapped frames, video info) for key, or None on a miss"""
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                # May have been written by another process since the index was built
+                try:
+                    size = self._array_path(key).stat().st_size + self._info_path(key).stat().st_size
+                except OSError:
+                    self.misses += 1
+                    return None
+                self._entries[key] = size
+                self._total_bytes += size
+            self._entries.move_to_end(key)
+
+        array_path = self._array_path(key)
+        try:
+            frames = np.load(array_path, mmap_mode="r")
+            with open(self._info_path(key), "r", encoding="utf-8") as f:
+                info = json.load(f)
+            os.utime(array_path)  # Record access for LRU order
+        except (OSError, ValueError):
+            # Evicted by another process or left half-written; treat as a miss
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return frames, info
+
+    def put(self, key: str, frames: np.ndarray, info: Dict[str, Any]) -> None:
+        """Store frames for key, then evict least recently used entries over budget"""
+        array_path = self._array_path(key)
+        info_path = self._info_path(key)
+        tmp_prefix = f"{key}.{os.getpid()}.{threading.get_ident()}"
+        tmp_array = array_path.with_name(f"{tmp_prefix}.tmp")
+        tmp_info = info_path.with_name(f"{tmp_prefix}.json.tmp")
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_array, "wb") as f:
+                np.save(f, np.ascontiguousarray(frames, dtype=np.uint8))
+            with open(tmp_info, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            # Sidecar first: an entry is only visible once its .npy exists.
+            # Both land by rename, so a reader never sees a partial file
+            os.replace(tmp_info, info_path)
+            os.replace(tmp_array, array_path)
+        except OSError as e:
+            print(f"[FrameCache] Failed to store frames for {info.get('name', key)}: {e}")
+            tmp_array.unlink(missing_ok=True)
+            tmp_info.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            # Other processes add and evict entries too; a scandir is cheap
+            # next to the decode that preceded this put
+            self._load_index(rescan=True)
+            if key in self._entries:  # Unless another process evicted it already
+                self._entries.move_to_end(key)
+            self._evict()
+
+    def _forget(self, key: str) -> None:
+        """Drop key from the index and disk (called under lock)"""
+        size = self._entries.pop(key, 0) if self._entries is not None else 0
+        self._total_bytes -= size
+        for path in (self._array_path(key), self._info_path(key)):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass  # Still memory-mapped by a reader on Windows; retried on next scan
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until under budget (called under lock)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+            self.evictions += 1
+
+    def clear(self) -> int:
+        """Remove every cached entry. Returns number of entries removed."""
+        with self._lock:
+            self._load_index()
+            keys = list(self._entries)
+            for key in keys:
+                self._forget(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and size for reporting"""
+        with self._lock:
+            self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_frame_cache: Optional[FrameCache] = None
+_frame_cache_lock = threading.Lock()
+
+
+def get_frame_cache() -> Optional[FrameCache]:
+    """Return the shared frame cache, or None if caching is disabled"""
+    global _frame_cache
+
+    if not config.FRAME_CACHE_ENABLED:
+        return None
+
+    with _frame_cache_lock:
+        if _frame_cache is None:
+            _frame_cache = FrameCache(config.FRAME_CACHE_DIR, config.FRAME_CACHE_MAX_BYTES)
+        return _frame_cache
@@ -0,0 +1,228 @@
+"""
+Working directory watcher
+Turns filesystem changes into library deltas (media added, media removed,
+caption changed) and keeps the media index current. Uses watchdog
+(inotify/FSEvents/ReadDirectoryChangesW) when installed and falls back to
+polling directory mtimes through the media index
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+from backend import config
+from backend.media_index import get_media_index
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    _HAS_WATCHDOG = True
+except ImportError:
+    _HAS_WATCHDOG = False
+
+
+# on_delta(added, removed, caption_changed), called from the watcher thread
+DeltaCallback = Callable[[List[Path], List[Path], List[Path]], None]
+
+
+if _HAS_WATCHDOG:
+    class _EventForwarder(FileSystemEventHandler):
+        """Hands every watchdog event to the watcher"""
+
+        def __init__(self, watcher: "LibraryWatcher"):
+            self._watcher = watcher
+
+        def on_any_event(self, event):
+            if event.event_type in ("opened", "closed_no_write"):
+                return
+            paths = [event.src_path]
+            dest_path = getattr(event, "dest_path", None)
+            if dest_path:
+                paths.append(dest_path)
+            self._watcher.notify(paths, event.is_directory)
+
+
+class LibraryWatcher:
+    """
+    Watches the working directory and reports library deltas.
+
+    Events are collected until none has arrived for WATCH_DEBOUNCE seconds
+    (or WATCH_MAX_DELAY has passed), then the affected directories are
+    re-listed through the media index and the media set is diffed against the
+    previous one. Without watchdog the index is refreshed every
+    WATCH_POLL_INTERVAL seconds instead; in that mode caption_changed lists
+    every existing file in a directory whose entries changed, and captions
+    rewritten in place are not detected.
+
+    watch() and stop() block while the observer thread is joined and new
+    watches are scheduled (one per directory of a recursive tree), so call
+    them from a worker thread rather than the event loop. If the watches
+    cannot be set up the watcher polls instead.
+    """
+
+    def __init__(self, on_delta: DeltaCallback):
+        self._on_delta = on_delta
+        self._lock = threading.Lock()
+        self._watch_lock = threading.Lock()  # Serialises watch() and stop()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._root: Optional[Path] = None
+        self._recursive = False
+        self._pending_dirs: Set[str] = set()
+        self._pending_captions: Set[str] = set()
+        self._first_event = 0.0
+        self._last_event = 0.0
+        self._media: Optional[Set[str]] = None  # Media paths at the last check
+
+    @property
+    def mode(self) -> str:
+        """Either events (watchdog is delivering events) or polling"""
+        return "events" if self._observer is not None else "polling"
+
+    def watch(self, root: Path, recursive: bool) -> None:
+        """Start (or move) the watch; the current contents become the baseline"""
+        with self._watch_lock:
+            self._watch(root, recursive)
+
+    def _watch(self, root: Path, recursive: bool) -> None:
+        self._stop_observer()
+        with self._lock:
+            self._root = root
+            self._recursive = recursive
+            self._media = None
+            self._pending_dirs.clear()
+            self._pending_captions.clear()
+
+        if _HAS_WATCHDOG and root.is_dir():
+            observer = Observer()
+            try:
+                observer.schedule(_EventForwarder(self), str(root), recursive=recursive)
+                observer.start()
+            except Exception as e:
+                # e.g. inotify watch limit reached on a huge tree, or a
+                # directory removed while its watch was being added
+                print(f"[LibraryWatcher] Cannot watch {root} ({e}); polling instead")
+                try:
+                    observer.stop()
+                except Exception:
+                    pass
+            else:
+                self._observer = observer
+
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="library-watcher", daemon=True)
+            self._thread.start()
+        self._wake.set()
+        print(f"[LibraryWatcher] Watching {root} ({self.mode})")
+
+    def notify(self, paths: List[str], is_directory: bool = False) -> None:
+        """Record changed paths (called from the watchdog thread)"""
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending_dirs and not self._pending_captions:
+                self._first_event = now
+            self._last_event = now
+            for path in paths:
+                self._pending_dirs.add(os.path.dirname(path))
+                if is_directory:
+                    self._pending_dirs.add(path)
+                elif path.lower().endswith(config.OUTPUT_EXTENSION):
+                    self._pending_captions.add(path)
+        self._wake.set()
+
+    def _wait_for_batch(self) -> None:
+        """Block until there is something to check"""
+        if self._observer is None:
+            self._wake.wait(config.WATCH_POLL_INTERVAL)
+            self._wake.clear()
+            return
+
+        self._wake.wait()
+        self._wake.clear()
+        # Debounce: wait for a quiet period, bounded by WATCH_MAX_DELAY
+        while not self._stopping.is_set():
+            with self._lock:
+                now = time.monotonic()
+                quiet_until = self._last_event + config.WATCH_DEBOUNCE
+                deadline = self._first_event + config.WATCH_MAX_DELAY
+            remaining = min(quiet_until, deadline) - now
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wait_for_batch()
+            if self._stopping.is_set():
+                return
+            try:
+                self._check()
+            except Exception as e:
+                print(f"[LibraryWatcher] Update failed: {e}")
+
+    def _check(self) -> None:
+        """Re-list changed directories and report what changed"""
+        with self._lock:
+            root, recursive = self._root, self._recursive
+            dirs, self._pending_dirs = self._pending_dirs, set()
+            captions, self._pending_captions = self._pending_captions, set()
+        if root is None:
+            return
+
+        index = get_media_index(root)
+        for directory in dirs:
+            index.invalidate(Path(directory))
+        index.refresh(recursive, force=True)
+        videos, images = index.media(recursive, config.get_include_videos(), config.get_include_images())
+        current = {str(p) for p in videos} | {str(p) for p in images}
+
+        with self._lock:
+            if root != self._root:
+                return  # Moved to another directory meanwhile
+            previous, self._media = self._media, current
+        if previous is None:
+            return  # Baseline
+
+        added = current - previous
+        removed = previous - current
+
+        changed: Set[str] = set()
+        if self._observer is not None:
+            for caption_path in captions:
+                directory, name = os.path.split(caption_path)
+                stem = os.path.splitext(name)[0].lower()
+                for media_name in index.files_in(Path(directory)):
+                    if os.path.splitext(media_name)[0].lower() == stem:
+                        changed.add(os.path.join(directory, media_name))
+        else:
+            for directory in index.changed_dirs:
+                changed.update(os.path.join(directory, name) for name in index.files_in(Path(directory)))
+        changed = (changed & current) - added
+
+        if added or removed or changed:
+            self._on_delta(
+                [Path(p) for p in sorted(added)],
+                [Path(p) for p in sorted(removed)],
+                [Path(p) for p in sorted(changed)],
+            )
+
+    def _stop_observer(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    def stop(self) -> None:
+        """Stop watching"""
+        with self._watch_lock:
+            self._stopping.set()
+            self._wake.set()
+            self._stop_observer()
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+                self._thread = None
@@ -0,0 +1,98 @@
+"""
+Compact media listing encoding
+Packs lists of VideoInfo records into columns: directory prefixes are stored
+once, absolute paths are rebuilt from the working directory, and null values
+are left out. Serialized with orjson (JSON) or msgpack when installed
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+try:
+    import orjson
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
+try:
+    import msgpack
+    _HAS_MSGPACK = True
+except ImportError:
+    _HAS_MSGPACK = False
+
+
+# Order of the media_type codes in the media_type column
+MEDIA_TYPES = ["video", "image"]
+
+# Columns copied as-is. Nullable ones become {"i": [rows], "v": [values]} when
+# some rows are null and are dropped entirely when all rows are null.
+_PLAIN_COLUMNS = ("size_mb",)
+_NULLABLE_COLUMNS = ("duration_sec", "width", "height", "frame_count", "fps", "caption_preview")
+
+
+def has_msgpack() -> bool:
+    return _HAS_MSGPACK
+
+
+def encode_columns(infos: List[Dict[str, Any]], working_dir: Path) -> Dict[str, Any]:
+    """
+    Column-oriented form of VideoInfo dicts (see decodeColumns in the frontend).
+
+    name is split into a directory index into "dirs" and a file name; path is
+    root + sep + name (with sep separators) unless listed in "paths".
+    """
+    root = str(working_dir)
+    dirs: List[str] = []
+    dir_index: Dict[str, int] = {}
+    dir_column = []
+    file_column = []
+    paths = {}
+
+    for row, info in enumerate(infos):
+        directory, _, file_name = info["name"].rpartition("/")
+        index = dir_index.get(directory)
+        if index is None:
+            index = dir_index[directory] = len(dirs)
+            dirs.append(directory)
+        dir_column.append(index)
+        file_column.append(file_name)
+        if info["path"] != os.path.join(root, *info["name"].split("/")):
+            paths[str(row)] = info["path"]  # Outside the working directory
+
+    columns: Dict[str, Any] = {
+        "format": "columns",
+        "count": len(infos),
+        "root": root,
+        "sep": os.sep,
+        "dirs": dirs,
+        "dir": dir_column,
+        "file": file_column,
+        "media_type": [MEDIA_TYPES.index(info["media_type"]) for info in infos],
+        "has_caption": [1 if info["has_caption"] else 0 for info in infos],
+    }
+    for name in _PLAIN_COLUMNS:
+        columns[name] = [info[name] for info in infos]
+    for name in _NULLABLE_COLUMNS:
+        values = [info[name] for info in infos]
+        present = [row for row, value in enumerate(values) if value is not None]
+        if len(present) == len(values):
+            columns[name] = values
+        elif present:
+            columns[name] = {"i": present, "v": [values[row] for row in present]}
+    if paths:
+        columns["paths"] = paths
+    return columns
+
+
+def dumps_json(obj: Any) -> bytes:
+    """JSON bytes, via orjson when installed"""
+    if _HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(obj: Any) -> bytes:
+    """msgpack bytes (check has_msgpack() first)"""
+    return msgpack.packb(obj, use_bin_type=True)
@@ -0,0 +1,397 @@
+"""
+Incremental media index
+Remembers the media files of every directory under the working directory
+together with the directory's mtime, so listings only rescan directories whose
+contents changed instead of walking the whole tree on every request
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend import config
+
+_VIDEO_EXT_SET = {ext.lower() for ext in config.VIDEO_EXTENSIONS}
+_IMAGE_EXT_SET = {ext.lower() for ext in config.IMAGE_EXTENSIONS}
+_ALL_MEDIA_EXT_SET = _VIDEO_EXT_SET | _IMAGE_EXT_SET
+
+# Generations come from one process-wide counter, so an index rebuilt after
+# eviction never repeats a generation handed out for different contents
+_generations = itertools.count(1)
+_generations_lock = threading.Lock()
+
+
+def _next_generation() -> int:
+    with _generations_lock:
+        return next(_generations)
+
+
+@dataclass
+class DirectoryRecord:
+    """Media file names and subdirectory names of one directory at a given mtime"""
+    mtime_ns: int
+    files: List[str] = field(default_factory=list)
+    subdirs: List[str] = field(default_factory=list)
+
+
+class MediaIndex:
+    """
+    Media files under one root directory, maintained incrementally.
+
+    Adding, removing or renaming an entry updates its parent directory's
+    mtime, so refresh() only stats each known directory and re-lists the ones
+    whose mtime moved. Records persist in SQLite, so a restart costs one stat
+    per directory rather than a full walk. generation changes whenever the
+    indexed contents change and is unique across every index in the process.
+    """
+
+    def __init__(self, root: Path, conn: Optional[sqlite3.Connection]):
+        self.root = root
+        self.generation = _next_generation()
+        self.dirs_scanned = 0
+        self.changed_dirs: List[str] = []  # Directories re-listed by the last refresh
+        self._conn = conn
+        self._lock = threading.Lock()
+        self._dirs: Dict[str, DirectoryRecord] = {}
+        self._last_refresh: Dict[bool, float] = {}
+        # (recursive, include_videos, include_images) -> (generation, videos, images)
+        self._results: Dict[Tuple[bool, bool, bool], Tuple[int, List[Path], List[Path]]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Load persisted records for this root"""
+        if self._conn is None:
+            return
+        root = str(self.root)
+        # Every path under root sorts between root + sep and root + (sep + 1)
+        upper = root.rstrip(os.sep) + chr(ord(os.sep) + 1)
+        lower = root.rstrip(os.sep) + os.sep
+        with _db_lock:
+            rows = self._conn.execute(
+                "SELECT path, mtime_ns, files, subdirs FROM dirs"
+                " WHERE path = ? OR (path >= ? AND path < ?)",
+                (root, lower, upper),
+            ).fetchall()
+        for path, mtime_ns, files, subdirs in rows:
+            self._dirs[path] = DirectoryRecord(mtime_ns, json.loads(files), json.loads(subdirs))
+
+    def _scan_directory(self, path: str, mtime_ns: int) -> DirectoryRecord:
+        """List one directory (one scandir, no per-file stat)"""
+        record = DirectoryRecord(mtime_ns)
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            record.subdirs.append(entry.name)
+                        elif os.path.splitext(entry.name)[1].lower() in _ALL_MEDIA_EXT_SET and entry.is_file():
+                            record.files.append(entry.name)
+                    except OSError:
+                        continue
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            pass
+        self.dirs_scanned += 1
+        return record
+
+    def _drop_subtree(self, path: str, removed: List[str]) -> None:
+        """Forget path and every directory below it (called under lock)"""
+        record = self._dirs.pop(path, None)
+        if record is None:
+            return
+        removed.append(path)
+        for name in record.subdirs:
+            self._drop_subtree(os.path.join(path, name), removed)
+
+    def _check_directory(self, path: str, updated: Dict[str, DirectoryRecord], removed: List[str]) -> Optional[DirectoryRecord]:
+        """Stat one directory and re-list it if its mtime moved (called under lock)"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self._drop_subtree(path, removed)
+            return None
+
+        record = self._dirs.get(path)
+        if record is None or record.mtime_ns != mtime_ns:
+            new_record = self._scan_directory(path, mtime_ns)
+            if record is not None:
+                for name in set(record.subdirs) - set(new_record.subdirs):
+                    self._drop_subtree(os.path.join(path, name), removed)
+            self._dirs[path] = updated[path] = record = new_record
+        return record
+
+    def _finish_refresh(self, recursive: bool, started: float, updated: Dict[str, DirectoryRecord], removed: List[str]) -> bool:
+        """Record a completed refresh and persist what changed (called under lock)"""
+        self._last_refresh[recursive] = started
+        self.changed_dirs = list(updated)
+        if not updated and not removed:
+            return False
+
+        self.generation = _next_generation()
+        self._persist(updated, removed)
+        return True
+
+    def refresh(self, recursive: bool, force: bool = False) -> bool:
+        """
+        Bring the index up to date. Returns True if anything changed.
+
+        Skipped if the same kind of refresh ran less than
+        config.MEDIA_INDEX_MIN_REFRESH_INTERVAL seconds ago, unless forced.
+        """
+        with self._lock:
+            now = time.monotonic()
+            last = max(self._last_refresh.get(recursive, -1e9), self._last_refresh.get(True, -1e9))
+            if not force and now - last < config.MEDIA_INDEX_MIN_REFRESH_INTERVAL:
+                return False
+
+            updated: Dict[str, DirectoryRecord] = {}
+            removed: List[str] = []
+            stack = [str(self.root)]
+            while stack:
+                path = stack.pop()
+                record = self._check_directory(path, updated, removed)
+                if record is not None and recursive:
+                    stack.extend(os.path.join(path, name) for name in record.subdirs)
+
+            return self._finish_refresh(recursive, now, updated, removed)
+
+    def walk(
+        self,
+        recursive: bool,
+        include_videos: bool = True,
+        include_images: bool = True,
+    ) -> Iterator[Tuple[List[Path], List[Path]]]:
+        """
+        Refresh the index one directory at a time, yielding each directory's
+        (video_paths, image_paths) as soon as it has been checked, so callers
+        can show results before a deep tree has been fully walked. Directories
+        come in walk order; files within a directory are sorted by name.
+        Closing the generator early still records what was scanned.
+        """
+        started = time.monotonic()
+        updated: Dict[str, DirectoryRecord] = {}
+        removed: List[str] = []
+        stack = [str(self.root)]
+        try:
+            while stack:
+                path = stack.pop()
+                with self._lock:
+                    record = self._check_directory(path, updated, removed)
+                    if record is None:
+                        continue
+                    files = sorted(record.files, key=str.lower)
+                    subdirs = list(record.subdirs)
+                if recursive:
+                    stack.extend(os.path.join(path, name) for name in reversed(sorted(subdirs, key=str.lower)))
+
+                videos = []
+                images = []
+                for name in files:
+                    ext = os.path.splitext(name)[1].lower()
+                    if include_videos and ext in _VIDEO_EXT_SET:
+                        videos.append(Path(path, name))
+                    elif include_images and ext in _IMAGE_EXT_SET:
+                        images.append(Path(path, name))
+                if videos or images:
+                    yield videos, images
+        finally:
+            with self._lock:
+                if stack:
+                    # Walk abandoned: keep what changed, but do not count it as a full refresh
+                    if updated or removed:
+                        self.generation = _next_generation()
+                        self._persist(updated, removed)
+                else:
+                    self._finish_refresh(recursive, started, updated, removed)
+
+    def files_in(self, directory: Path) -> List[str]:
+        """Indexed media file names in one directory (empty if not indexed)"""
+        with self._lock:
+            record = self._dirs.get(str(directory))
+            return list(record.files) if record is not None else []
+
+    def invalidate(self, directory: Path) -> None:
+        """Mark directory for rescanning and let the next refresh run immediately"""
+        with self._lock:
+            record = self._dirs.get(str(directory))
+            if record is not None:
+                record.mtime_ns = -1
+            self._last_refresh.clear()
+
+    def _persist(self, updated: Dict[str, DirectoryRecord], removed: List[str]) -> None:
+        """Write changed records to SQLite (called under lock)"""
+        if self._conn is None:
+            return
+        try:
+            with _db_lock:
+                self._conn.executemany("DELETE FROM dirs WHERE path = ?", [(p,) for p in removed])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO dirs (path, mtime_ns, files, subdirs) VALUES (?, ?, ?, ?)",
+                    [
+                        (p, r.mtime_ns, json.dumps(r.files), json.dumps(r.subdirs))
+                        for p, r in updated.items()
+                    ],
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"[MediaIndex] Failed to persist index for {self.root}: {e}")
+
+    def media(
+        self,
+        recursive: bool,
+        include_videos: bool = True,
+        include_images: bool = True,
+    ) -> Tuple[List[Path], List[Path]]:
+        """(video_paths, image_paths) from the index, each sorted by name (call refresh() first)"""
+        key = (recursive, include_videos, include_images)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == self.generation:
+                return list(cached[1]), list(cached[2])
+
+            videos = []
+            images = []
+            seen = set()
+            stack = [str(self.root)]
+            while stack:
+                path = stack.pop()
+                record = self._dirs.get(path)
+                if record is None:
+                    continue
+                for name in record.files:
+                    full_path = os.path.join(path, name)
+                    key_name = full_path.lower()
+                    if key_name in seen:
+                        continue
+                    seen.add(key_name)
+                    ext = os.path.splitext(name)[1].lower()
+                    if include_videos and ext in _VIDEO_EXT_SET:
+                        videos.append(Path(full_path))
+                    elif include_images and ext in _IMAGE_EXT_SET:
+                        images.append(Path(full_path))
+                if recursive:
+                    stack.extend(os.path.join(path, name) for name in record.subdirs)
+
+            videos.sort(key=lambda p: str(p).lower())
+            images.sort(key=lambda p: str(p).lower())
+            self._results[key] = (self.generation, videos, images)
+            return list(videos), list(images)
+
+
+_indexes: "OrderedDict[str, MediaIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+_db_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+
+
+def _get_connection() -> Optional[sqlite3.Connection]:
+    """Shared SQLite connection for persisted records (None if it cannot be opened)"""
+    global _conn
+    if _conn is None:
+        try:
+            _conn = sqlite3.connect(str(config.MEDIA_INDEX_PATH), check_same_thread=False)
+            _conn.execute("PRAGMA journal_mode=WAL")
+            _conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                " path TEXT PRIMARY KEY,"
+                " mtime_ns INTEGER NOT NULL,"
+                " files TEXT NOT NULL,"
+                " subdirs TEXT NOT NULL)"
+            )
+            _conn.commit()
+        except sqlite3.Error as e:
+            print(f"[MediaIndex] Index will not be persisted: {e}")
+            _conn = None
+    return _conn
+
+
+def get_media_index(directory: Path) -> MediaIndex:
+    """Return the index for directory, keeping the most recently used ones in memory"""
+    key = str(directory)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            with _db_lock:
+                conn = _get_connection()
+            index = MediaIndex(directory, conn)
+            _indexes[key] = index
+            while len(_indexes) > config.MEDIA_INDEX_MAX_ROOTS:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(key)
+        return index
+
+
+# Distinguishes generations of this process from those of earlier runs
+_process_nonce = uuid.uuid4().hex[:8]
+# Bumped for changes that leave directory mtimes alone (captions rewritten in place)
+_content_generation = 0
+
+
+def bump_library_generation() -> None:
+    """Record a library change the index cannot see (call after writing a caption)"""
+    global _content_generation
+    with _generations_lock:  # Called from executor threads
+        _content_generation = next(_generations)
+
+
+def content_generation() -> int:
+    """Current value of the counter bump_library_generation() advances"""
+    return _content_generation
+
+
+def library_version(directory: Path, traverse_subfolders: bool) -> Optional[str]:
+    """
+    Opaque token that changes whenever the listed media or captions under
+    directory may have changed, for ETags. Costs one stat per known directory
+    (less within MEDIA_INDEX_MIN_REFRESH_INTERVAL). None when the index is
+    disabled, so callers cannot tell whether anything changed.
+    """
+    if not config.MEDIA_INDEX_ENABLED or not directory or not directory.exists():
+        return None
+    index = get_media_index(directory)
+    index.refresh(traverse_subfolders)
+    return f"{_process_nonce}.{index.generation}.{_content_generation}"
+
+
+def find_all_media(
+    directory: Path = None,
+    traverse_subfolders: bool = False,
+    include_videos: bool = True,
+    include_images: bool = True,
+) -> Tuple[List[Path], List[Path]]:
+    """
+    Index-backed drop-in for video_processor.find_all_media().
+
+    Returns:
+        Tuple of (video_paths, image_paths), each sorted by name
+    """
+    directory = directory or config.get_working_directory()
+    if not config.MEDIA_INDEX_ENABLED:
+        from backend.video_processor import find_all_media as walk_all_media
+        return walk_all_media(directory, traverse_subfolders, include_videos, include_images)
+
+    if not directory or not directory.exists():
+        return [], []
+
+    index = get_media_index(directory)
+    index.refresh(traverse_subfolders)
+    return index.media(traverse_subfolders, include_videos, include_images)
+
+
+def find_videos(directory: Path = None, traverse_subfolders: bool = False) -> List[Path]:
+    """Find all video files in a directory from the index"""
+    videos, _ = find_all_media(directory, traverse_subfolders, include_videos=True, include_images=False)
+    return videos
+
+
+def find_images(directory: Path = None, traverse_subfolders: bool = False) -> List[Path]:
+    """Find all image files in a directory from the index"""
+    _, images = find_all_media(directory, traverse_subfolders, include_videos=False, include_images=True)
+    return images
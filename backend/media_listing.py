@@ -0,0 +1,376 @@
+"""
+Server-side media listing
+Filters, sorts and paginates the working directory's media so clients only
+receive one page at a time. Sorted listings are cached per media index
+generation, and pages are addressed with keyset cursors that stay valid while
+files are added or removed. File stats and caption presence come from one
+scandir per directory rather than separate exists()/stat() calls per file
+"""
+
+import base64
+import binascii
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend import config
+from backend.media_index import content_generation, find_all_media, get_media_index
+from backend.schemas import MediaSortField, MediaType, SortOrder
+
+
+@dataclass
+class MediaRow:
+    """One media file with the fields listings sort and filter on"""
+    path: Path
+    name: str  # Relative to the working directory, forward slashes
+    media_type: MediaType
+    size: int
+    mtime: float
+    has_caption: bool
+
+
+class CursorError(ValueError):
+    """Cursor is malformed or was issued for a different sort"""
+
+
+class DirectoryScanner:
+    """
+    Directory entries for one listing pass, read with one scandir per directory.
+
+    Entries are kept as os.DirEntry objects, so existence checks (e.g. "has a
+    caption") cost nothing and DirEntry.stat() is only called for files whose
+    size or mtime is actually needed (free on Windows, where scandir already
+    returns it).
+    """
+
+    def __init__(self):
+        self._dirs: Dict[str, Dict[str, os.DirEntry]] = {}
+
+    def _entries(self, directory: Path) -> Dict[str, os.DirEntry]:
+        key = str(directory)
+        entries = self._dirs.get(key)
+        if entries is None:
+            entries = {}
+            try:
+                with os.scandir(key) as it:
+                    for entry in it:
+                        entries[os.path.normcase(entry.name)] = entry
+            except OSError:
+                pass
+            self._dirs[key] = entries
+        return entries
+
+    def stat(self, path: Path) -> Optional[os.stat_result]:
+        """stat result for path, or None if it does not exist"""
+        entry = self._entries(path.parent).get(os.path.normcase(path.name))
+        if entry is None:
+            return None
+        try:
+            return entry.stat()
+        except OSError:
+            return None
+
+    def exists(self, path: Path) -> bool:
+        """Whether path was present when its directory was scanned"""
+        return os.path.normcase(path.name) in self._entries(path.parent)
+
+
+def caption_path_for(media_path: Path) -> Path:
+    """Captions are saved next to the media file with the same stem"""
+    return media_path.parent / (media_path.stem + config.OUTPUT_EXTENSION)
+
+
+_caption_previews: "OrderedDict[str, Tuple[int, int, Optional[str]]]" = OrderedDict()
+_caption_previews_lock = threading.Lock()
+
+
+def caption_preview(caption_path: Path, stat: os.stat_result) -> Optional[str]:
+    """
+    First 150 characters of a caption for listings. Previews are cached by
+    path and reused while the caption's mtime and size are unchanged.
+    """
+    key = str(caption_path)
+    with _caption_previews_lock:
+        cached = _caption_previews.get(key)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            _caption_previews.move_to_end(key)
+            return cached[2]
+
+    preview = None
+    try:
+        with open(caption_path, "r", encoding="utf-8") as f:
+            text = f.read(200)  # Only read first 200 chars for preview
+            preview = text[:150] + "..." if len(text) > 150 else text
+    except Exception:
+        pass
+
+    with _caption_previews_lock:
+        _caption_previews[key] = (stat.st_mtime_ns, stat.st_size, preview)
+        _caption_previews.move_to_end(key)
+        while len(_caption_previews) > config.CAPTION_PREVIEW_CACHE_SIZE:
+            _caption_previews.popitem(last=False)
+    return preview
+
+
+def _relative_name(media_path: Path, working_dir: Path) -> str:
+    try:
+        return str(media_path.relative_to(working_dir)).replace('\\', '/')
+    except ValueError:
+        return media_path.name
+
+
+def _build_rows(working_dir: Path, traverse: bool, include_videos: bool, include_images: bool) -> List[MediaRow]:
+    """Size, mtime and caption presence of every listed file (one scandir per directory)"""
+    videos, images = find_all_media(working_dir, traverse, include_videos, include_images)
+    scanner = DirectoryScanner()
+    rows = []
+    for media_paths, media_type in ((videos, MediaType.VIDEO), (images, MediaType.IMAGE)):
+        for media_path in media_paths:
+            stat = scanner.stat(media_path)
+            if stat is None:
+                continue
+            rows.append(MediaRow(
+                path=media_path,
+                name=_relative_name(media_path, working_dir),
+                media_type=media_type,
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+                has_caption=scanner.exists(caption_path_for(media_path)),
+            ))
+    return rows
+
+
+def _sort_key(row: MediaRow, sort: MediaSortField) -> Tuple[Any, ...]:
+    """Total order for a sort field; the lowercased name breaks ties"""
+    name = row.name.lower()
+    if sort == MediaSortField.SIZE:
+        return (row.size, name)
+    if sort == MediaSortField.MTIME:
+        return (row.mtime, name)
+    if sort == MediaSortField.CAPTION:
+        return (int(row.has_caption), name)
+    return (name,)
+
+
+def encode_cursor(sort: MediaSortField, order: SortOrder, key: Tuple[Any, ...]) -> str:
+    """Opaque cursor pointing just past the row with sort key `key`"""
+    raw = json.dumps([sort.value, order.value, list(key)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+# Types of each sort key field, as _sort_key builds them
+_CURSOR_KEY_TYPES = {
+    MediaSortField.NAME: ((str,),),
+    MediaSortField.SIZE: ((int,), (str,)),
+    MediaSortField.MTIME: ((int, float), (str,)),
+    MediaSortField.CAPTION: ((int,), (str,)),
+}
+
+
+def decode_cursor(cursor: str, sort: MediaSortField, order: SortOrder) -> Tuple[Any, ...]:
+    """Sort key stored in cursor; raises CursorError if it is invalid for this sort"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, key = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise CursorError("Malformed cursor")
+    if cursor_sort != sort.value or cursor_order != order.value:
+        raise CursorError("Cursor was issued for a different sort order")
+    # The key is compared against real sort keys, so a wrong shape would fail inside bisect
+    field_types = _CURSOR_KEY_TYPES[sort]
+    if not isinstance(key, list) or len(key) != len(field_types) or not all(
+        isinstance(value, types) and not isinstance(value, bool)
+        for value, types in zip(key, field_types)
+    ):
+        raise CursorError("Malformed cursor")
+    return tuple(key)
+
+
+class MediaListing:
+    """
+    Cached, filtered and sorted views of the media library.
+
+    Rows (one stat per file) are cached per library generation, and each
+    filter/sort combination's sorted view is kept in a small LRU so paging
+    through a listing sorts it once.
+    """
+
+    def __init__(self, max_views: int = 8):
+        self.max_views = max_views
+        self._lock = threading.Lock()
+        self._rows_key = None
+        self._rows: List[MediaRow] = []
+        self._views: "OrderedDict[tuple, Tuple[List[MediaRow], List[Tuple[Any, ...]]]]" = OrderedDict()
+
+    def _current_rows(self, working_dir: Path, traverse: bool, include_videos: bool, include_images: bool):
+        """Rows for the current library state and the key identifying that state"""
+        rows = None
+        if config.MEDIA_INDEX_ENABLED:
+            # Refreshes the index; its generation and the caption generation, both
+            # drawn from one process-wide counter, then identify the contents
+            find_all_media(working_dir, traverse, include_videos, include_images)
+            index = get_media_index(working_dir)
+            rows_key = (
+                str(working_dir), index.generation, content_generation(),
+                traverse, include_videos, include_images,
+            )
+            with self._lock:
+                if rows_key == self._rows_key:
+                    rows = self._rows
+        else:
+            rows_key = None  # No change tracking without the index: rebuild every time
+
+        if rows is None:
+            rows = _build_rows(working_dir, traverse, include_videos, include_images)
+            with self._lock:
+                self._rows_key = rows_key
+                self._rows = rows
+                self._views.clear()
+        return rows_key, rows
+
+    def query(
+        self,
+        sort: MediaSortField = MediaSortField.NAME,
+        order: SortOrder = SortOrder.ASC,
+        media_type: Optional[MediaType] = None,
+        has_caption: Optional[bool] = None,
+        subfolder: Optional[str] = None,
+        name_contains: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Tuple[List[MediaRow], int, Optional[str]]:
+        """
+        One page of the filtered, sorted listing.
+
+        Returns:
+            (rows on this page, total rows matching the filters, cursor for the next page or None)
+        """
+        working_dir = config.get_working_directory()
+        traverse = config.get_traverse_subfolders()
+        rows_key, rows = self._current_rows(
+            working_dir, traverse, config.get_include_videos(), config.get_include_images()
+        )
+
+        prefix = subfolder.replace('\\', '/').strip('/') + '/' if subfolder else None
+        needle = name_contains.lower() if name_contains else None
+        view_key = (rows_key, sort, media_type, has_caption, prefix, needle)
+
+        with self._lock:
+            view = self._views.get(view_key) if rows_key is not None else None
+            if view is not None:
+                self._views.move_to_end(view_key)
+
+        if view is None:
+            matching = [
+                row for row in rows
+                if (media_type is None or row.media_type == media_type)
+                and (has_caption is None or row.has_caption == has_caption)
+                and (prefix is None or row.name.startswith(prefix))
+                and (needle is None or needle in row.name.lower())
+            ]
+            matching.sort(key=lambda row: _sort_key(row, sort))
+            view = (matching, [_sort_key(row, sort) for row in matching])
+            if rows_key is not None:
+                with self._lock:
+                    self._views[view_key] = view
+                    while len(self._views) > self.max_views:
+                        self._views.popitem(last=False)
+
+        matching, keys = view
+        total = len(matching)
+
+        if order == SortOrder.ASC:
+            start = bisect.bisect_right(keys, decode_cursor(cursor, sort, order)) if cursor else 0
+            page = matching[start:start + limit]
+            has_more = start + limit < total
+        else:
+            end = bisect.bisect_left(keys, decode_cursor(cursor, sort, order)) if cursor else total
+            page = matching[max(0, end - limit):end][::-1]
+            has_more = end - limit > 0
+
+        next_cursor = encode_cursor(sort, order, _sort_key(page[-1], sort)) if page and has_more else None
+        return page, total, next_cursor
+
+
+_media_listing = MediaListing()
+
+
+def get_media_listing() -> MediaListing:
+    """Return the shared listing cache"""
+    return _media_listing
+
+
+@dataclass
+class StreamSnapshot:
+    """
+    Media list of one /api/videos/stream response, kept so a reconnecting
+    client can resume from the last event it received. complete is False
+    while a progressive walk is still adding items (or if it was abandoned).
+    """
+    id: str
+    items: List[Tuple[Path, MediaType]]
+    complete: bool = False
+    touched: float = 0.0
+
+
+class StreamSnapshots:
+    """Short-lived stream snapshots, dropped after config.STREAM_SNAPSHOT_TTL seconds unused"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[str, StreamSnapshot]" = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        """Drop expired and excess snapshots (called under lock)"""
+        for snapshot_id in [s.id for s in self._snapshots.values() if now - s.touched > config.STREAM_SNAPSHOT_TTL]:
+            del self._snapshots[snapshot_id]
+        while len(self._snapshots) > config.STREAM_SNAPSHOT_MAX:
+            self._snapshots.popitem(last=False)
+
+    def create(self, items: List[Tuple[Path, MediaType]], complete: bool) -> StreamSnapshot:
+        now = time.monotonic()
+        snapshot = StreamSnapshot(uuid.uuid4().hex[:12], items, complete, now)
+        with self._lock:
+            self._snapshots[snapshot.id] = snapshot
+            self._expire(now)
+        return snapshot
+
+    def get(self, snapshot_id: str) -> Optional[StreamSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            snapshot = self._snapshots.get(snapshot_id)
+            if snapshot is not None:
+                snapshot.touched = now
+                self._snapshots.move_to_end(snapshot_id)
+            return snapshot
+
+
+def format_event_id(snapshot: StreamSnapshot, offset: int) -> str:
+    """SSE event id: snapshot id and the number of items delivered so far"""
+    return f"{snapshot.id}:{offset}"
+
+
+def parse_event_id(event_id: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(snapshot id, offset) from a Last-Event-ID value, or None if it is not ours"""
+    if not event_id:
+        return None
+    snapshot_id, _, offset = event_id.strip().partition(":")
+    if not snapshot_id or not offset.isdigit():
+        return None
+    return snapshot_id, int(offset)
+
+
+_stream_snapshots = StreamSnapshots()
+
+
+def get_stream_snapshots() -> StreamSnapshots:
+    """Return the shared stream snapshot cache"""
+    return _stream_snapshots
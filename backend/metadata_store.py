@@ -0,0 +1,201 @@
+"""
+Persistent media metadata store
+Caches probed video/image metadata (dimensions, fps, frame count, duration) in
+SQLite so listings return full VideoInfo without re-opening every file, and
+probes new or changed files in a background thread pool
+"""
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from backend import config
+
+# Probed fields, in table column order
+METADATA_FIELDS = ("width", "height", "fps", "frame_count", "duration")
+
+
+def probe_media(media_path: Path) -> Dict[str, Any]:
+    """
+    Read metadata for one file. Images only have their header parsed; videos
+    are opened with get_video_info.
+    """
+    if media_path.suffix.lower() in config.IMAGE_EXTENSIONS:
+        from PIL import Image
+
+        with Image.open(media_path) as img:
+            width, height = img.size
+        return {"width": width, "height": height, "fps": None, "frame_count": 1, "duration": None}
+
+    from backend.video_processor import get_video_info
+
+    info = get_video_info(media_path)
+    return {field: info.get(field) for field in METADATA_FIELDS}
+
+
+class MetadataStore:
+    """
+    SQLite-backed metadata cache keyed by path, validated by mtime and size.
+
+    Lookups never touch the media file. Misses are probed by enqueue() on a
+    background pool (each path at most once at a time), and every completed
+    probe is passed to the registered listeners from the probe thread.
+    Files that fail to probe are stored too, so they are not retried until
+    they change.
+    """
+
+    def __init__(self, db_path: Path, max_workers: int):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.probes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " width INTEGER, height INTEGER, fps REAL, frame_count INTEGER, duration REAL,"
+            " error TEXT)"
+        )
+        self._conn.commit()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="probe")
+        self._pending: Set[str] = set()
+        self._listeners: List[Callable[[Path, Dict[str, Any]], None]] = []
+
+    def add_listener(self, callback: Callable[[Path, Dict[str, Any]], None]) -> None:
+        """Call callback(path, record) from the probe thread after each background probe"""
+        self._listeners.append(callback)
+
+    def get(self, media_path: Path, stat: os.stat_result = None) -> Optional[Dict[str, Any]]:
+        """Stored record for media_path, or None if missing or the file has changed"""
+        stat = stat or media_path.stat()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, size, width, height, fps, frame_count, duration, error"
+                " FROM media WHERE path = ?",
+                (str(media_path),),
+            ).fetchone()
+            if row is None or row[0] != stat.st_mtime_ns or row[1] != stat.st_size:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        record = dict(zip(METADATA_FIELDS, row[2:7]))
+        record["error"] = row[7]
+        return record
+
+    def probe(self, media_path: Path) -> Dict[str, Any]:
+        """Probe media_path now and store the result (raises OSError if the file is gone)"""
+        stat = media_path.stat()
+        error = None
+        try:
+            record = probe_media(media_path)
+        except Exception as e:
+            record = dict.fromkeys(METADATA_FIELDS)
+            error = str(e)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media"
+                " (path, mtime_ns, size, width, height, fps, frame_count, duration, error)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(media_path), stat.st_mtime_ns, stat.st_size,
+                 *(record[field] for field in METADATA_FIELDS), error),
+            )
+            self._conn.commit()
+            self.probes += 1
+
+        record["error"] = error
+        return record
+
+    def probe_many(self, media_paths: Iterable[Path]) -> Dict[str, Dict[str, Any]]:
+        """Probe several files in parallel and wait. Returns {path: record}; vanished files are skipped."""
+        def probe_or_none(media_path: Path):
+            try:
+                return self.probe(media_path)
+            except OSError:
+                return None
+
+        media_paths = list(media_paths)
+        records = self._executor.map(probe_or_none, media_paths)
+        return {
+            str(media_path): record
+            for media_path, record in zip(media_paths, records)
+            if record is not None
+        }
+
+    def enqueue(self, media_path: Path) -> None:
+        """Probe media_path in the background unless it is already queued"""
+        key = str(media_path)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._probe_in_background, media_path)
+
+    def _probe_in_background(self, media_path: Path) -> None:
+        try:
+            record = self.probe(media_path)
+        except OSError:
+            return  # Deleted since it was listed
+        finally:
+            with self._lock:
+                self._pending.discard(str(media_path))
+
+        for listener in self._listeners:
+            try:
+                listener(media_path, record)
+            except Exception as e:
+                print(f"[MetadataStore] Listener failed for {media_path.name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for reporting"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "probes": self.probes,
+                "pending": len(self._pending),
+                "entries": entries,
+            }
+
+    def close(self) -> None:
+        """Stop background probes and close the database"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
+
+
+_metadata_store: Optional[MetadataStore] = None
+_metadata_store_lock = threading.Lock()
+
+
+def get_metadata_store() -> Optional[MetadataStore]:
+    """Return the shared metadata store, or None if it is disabled"""
+    global _metadata_store
+
+    if not config.METADATA_STORE_ENABLED:
+        return None
+
+    with _metadata_store_lock:
+        if _metadata_store is None:
+            _metadata_store = MetadataStore(config.METADATA_STORE_PATH, config.METADATA_PROBE_WORKERS)
+        return _metadata_store
+
+
+def close_metadata_store() -> None:
+    """Close the shared metadata store (a later get_metadata_store() reopens it)"""
+    global _metadata_store
+
+    with _metadata_store_lock:
+        if _metadata_store is not None:
+            _metadata_store.close()
+            _metadata_store = None
@@ -295,37 +295,27 @@ def load_model(
     return model_info
 
 
-def generate_caption(
+def prepare_inputs(
     model_info: Dict[str, Any],
     images: list,
     prompt: str,
-    max_tokens: int = None,
-    temperature: float = None,
-) -> Tuple[str, Dict[str, Any]]:
+) -> Tuple[Dict[str, Any], float]:
     """
-    Generate a caption for a list of video frames.
+    Build model inputs on the CPU: chat template, tokenization and image preprocessing.
+    Kept separate from generation so it can overlap with another video's generate.
 
     Args:
-        model_info: Dict from load_model()
-        images: List of PIL Images (video frames)
+        model_info: Dict from load_model() (only the processor is used)
+        images: (N, H, W, 3) uint8 RGB array or list of PIL Images (video frames)
         prompt: Text prompt for captioning
-        max_tokens: Maximum tokens to generate (default: from config)
-        temperature: Sampling temperature (default: from config)
 
     Returns:
-        Tuple of (caption_text, metadata_dict)
+        Tuple of (CPU input tensors, encode_time)
     """
-    max_tokens = max_tokens or config.MAX_TOKENS
-    temperature = temperature or config.TEMPERATURE
-
-    model = model_info["model"]
     processor = model_info["processor"]
-    device = model_info["device"]
 
-    # Build message with images
-    content = []
-    for img in images:
-        content.append({"type": "image", "image": img})
+    # Build message with image placeholders; pixels go to the processor directly
+    content = [{"type": "image"} for _ in range(len(images))]
     content.append({"type": "text", "text": prompt})
 
     messages = [{"role": "user", "content": content}]
@@ -333,21 +323,59 @@ def generate_caption(
     # Process inputs
     encode_start = time.time()
 
-    inputs = processor.apply_chat_template(
+    text = processor.apply_chat_template(
         messages,
-        tokenize=True,
+        tokenize=False,
         add_generation_prompt=True,
-        return_dict=True,
+    )
+
+    # The image processor takes (H, W, 3) uint8 arrays as-is, no PIL round trip
+    inputs = processor(
+        text=[text],
+        images=list(images),
         return_tensors="pt",
     )
 
     # Remove token_type_ids if present (not needed and can cause issues)
     inputs.pop("token_type_ids", None)
 
+    return dict(inputs), time.time() - encode_start
+
+
+def generate_from_inputs(
+    model_info: Dict[str, Any],
+    inputs: Dict[str, Any],
+    max_tokens: int = None,
+    temperature: float = None,
+    num_frames: int = 0,
+    encode_time: float = 0.0,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Generate a caption from inputs built by prepare_inputs().
+
+    Args:
+        model_info: Dict from load_model()
+        inputs: CPU input tensors from prepare_inputs()
+        max_tokens: Maximum tokens to generate (default: from config)
+        temperature: Sampling temperature (default: from config)
+        num_frames: Number of frames in inputs (for metadata)
+        encode_time: Time spent in prepare_inputs() (for metadata)
+
+    Returns:
+        Tuple of (caption_text, metadata_dict)
+    """
+    max_tokens = max_tokens or config.MAX_TOKENS
+    temperature = temperature or config.TEMPERATURE
+
+    model = model_info["model"]
+    processor = model_info["processor"]
+    device = model_info["device"]
+
     # Move to device
+    move_start = time.time()
     inputs = {k: v.to(device) if hasattr(v, 'to') else v for k, v in inputs.items()}
 
-    encode_time = time.time() - encode_start
+    encode_time += time.time() - move_start
     input_tokens = inputs["input_ids"].shape[1]
 
     # Generate
@@ -401,12 +429,43 @@ def generate_caption(
         "generate_time": generate_time,
         "total_time": encode_time + generate_time,
         "tokens_per_sec": tokens_per_sec,
-        "num_frames": len(images),
+        "num_frames": num_frames,
     }
 
     return output_text, metadata
 
 
+def generate_caption(
+    model_info: Dict[str, Any],
+    images: list,
+    prompt: str,
+    max_tokens: int = None,
+    temperature: float = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Generate a caption for a list of video frames.
+
+    Args:
+        model_info: Dict from load_model()
+        images: (N, H, W, 3) uint8 RGB array or list of PIL Images (video frames)
+        prompt: Text prompt for captioning
+        max_tokens: Maximum tokens to generate (default: from config)
+        temperature: Sampling temperature (default: from config)
+
+    Returns:
+        Tuple of (caption_text, metadata_dict)
+    """
+    inputs, encode_time = prepare_inputs(model_info, images, prompt)
+    return generate_from_inputs(
+        model_info,
+        inputs,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        num_frames=len(images),
+        encode_time=encode_time,
+    )
+
+
 def clear_cache():
     """Clear model cache and free GPU memory"""
     global _MODEL_CACHE
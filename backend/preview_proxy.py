@@ -0,0 +1,310 @@
+"""
+Preview proxies
+Small H.264 (MP4) or VP9 (WebM) renditions of large or browser-unfriendly
+videos for hover previews, transcoded in the background and kept on disk
+under a byte budget. Previews are muted, so proxies carry no audio.
+"""
+
+import hashlib
+import os
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from fractions import Fraction
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend import config
+from backend.video_processor import _has_ffmpeg
+
+try:
+    import av
+    _HAS_AV = True
+except ImportError:
+    _HAS_AV = False
+
+
+# Container, media type, PyAV encoder and ffmpeg arguments per proxy codec
+_CODECS: Dict[str, Dict[str, Any]] = {
+    "h264": {
+        "suffix": ".mp4",
+        "media_type": "video/mp4",
+        "encoder": "libx264",
+        "options": {"preset": "veryfast", "crf": "30", "movflags": "+faststart"},
+        "ffmpeg": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "30", "-movflags", "+faststart"],
+    },
+    "vp9": {
+        "suffix": ".webm",
+        "media_type": "video/webm",
+        "encoder": "libvpx-vp9",
+        "options": {"crf": "40", "b": "0", "deadline": "realtime", "cpu-used": "8"},
+        "ffmpeg": ["-c:v", "libvpx-vp9", "-crf", "40", "-b:v", "0", "-deadline", "realtime", "-cpu-used", "8"],
+    },
+}
+
+# Extensions every browser plays in a <video> element
+_BROWSER_EXTENSIONS = {".mp4", ".webm", ".m4v"}
+
+
+def proxy_dims(width: int, height: int, max_height: int) -> tuple:
+    """Even dimensions no taller than max_height, keeping the aspect ratio"""
+    if height > max_height:
+        width = width * max_height / height
+        height = max_height
+    return max(2, int(width) // 2 * 2), max(2, int(height) // 2 * 2)
+
+
+def _transcode_pyav(source: Path, target: Path, codec: Dict[str, Any]) -> None:
+    """Decode, scale and re-encode the first video stream in-process"""
+    max_fps = config.PREVIEW_PROXY_MAX_FPS
+    with av.open(str(source)) as input_container:
+        in_stream = input_container.streams.video[0]
+        in_stream.thread_type = "AUTO"
+        width, height = proxy_dims(
+            in_stream.codec_context.width, in_stream.codec_context.height, config.PREVIEW_PROXY_HEIGHT
+        )
+        rate = in_stream.average_rate or Fraction(max_fps)
+        if rate > max_fps:
+            rate = Fraction(max_fps)
+
+        with av.open(str(target), mode="w", format=codec["suffix"][1:]) as output_container:
+            out_stream = output_container.add_stream(codec["encoder"], rate=rate)
+            out_stream.width = width
+            out_stream.height = height
+            out_stream.pix_fmt = "yuv420p"
+            out_stream.codec_context.time_base = 1 / rate
+            out_stream.options = {k: v for k, v in codec["options"].items() if k != "movflags"}
+            if "movflags" in codec["options"]:
+                output_container.options["movflags"] = codec["options"]["movflags"]
+
+            next_pts = 0
+            for frame in input_container.decode(in_stream):
+                if frame.time is None:
+                    continue
+                # Frame index at the proxy rate; repeats are dropped (caps the fps)
+                pts = round(frame.time * rate)
+                if pts < next_pts:
+                    continue
+                out_frame = frame.reformat(width=width, height=height, format="yuv420p", interpolation="AREA")
+                out_frame.pts = pts
+                out_frame.time_base = out_stream.codec_context.time_base
+                for packet in out_stream.encode(out_frame):
+                    output_container.mux(packet)
+                next_pts = pts + 1
+            for packet in out_stream.encode():
+                output_container.mux(packet)
+
+
+def _transcode_ffmpeg(source: Path, target: Path, codec: Dict[str, Any]) -> None:
+    """Transcode with an ffmpeg subprocess (fallback)"""
+    cmd = [
+        "ffmpeg", "-y", "-v", "error",
+        "-i", str(source),
+        "-map", "0:v:0", "-an", "-sn",
+        "-vf", f"scale=-2:'min({config.PREVIEW_PROXY_HEIGHT},ih)',fps='min({config.PREVIEW_PROXY_MAX_FPS},source_fps)'",
+        "-pix_fmt", "yuv420p",
+        *codec["ffmpeg"],
+        "-f", codec["suffix"][1:],
+        str(target),
+    ]
+    result = subprocess.run(cmd, capture_output=True, timeout=3600)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", errors="replace").strip()[-500:])
+
+
+class PreviewProxies:
+    """
+    On-disk proxy cache with a byte budget and LRU eviction.
+
+    Each proxy is one file named by a key over the source identity and the
+    proxy settings; file mtimes record last access, as in the frame cache.
+    Builds run on a small background pool, at most one per key, and land via
+    a temp file so a proxy is only visible once complete.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, workers: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.builds = 0
+        self.failures = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._building: Dict[str, Future] = {}
+        self._failed: Dict[str, str] = {}  # key -> error, so a bad file is not retried until it changes
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="proxy")
+
+    @staticmethod
+    def codec() -> Dict[str, Any]:
+        return _CODECS.get(config.PREVIEW_PROXY_CODEC, _CODECS["h264"])
+
+    @staticmethod
+    def wants_proxy(video_path: Path, stat: os.stat_result) -> bool:
+        """Whether auto mode proxies this file: large, or a container browsers may not play"""
+        return (
+            stat.st_size >= config.PREVIEW_PROXY_MIN_BYTES
+            or video_path.suffix.lower() not in _BROWSER_EXTENSIONS
+        )
+
+    def _proxy_path(self, video_path: Path, stat: os.stat_result) -> Path:
+        raw = (
+            f"{video_path}|{stat.st_mtime_ns}|{stat.st_size}|"
+            f"{config.PREVIEW_PROXY_CODEC}|{config.PREVIEW_PROXY_HEIGHT}|{config.PREVIEW_PROXY_MAX_FPS}"
+        )
+        key = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}{self.codec()['suffix']}"
+
+    def get(self, video_path: Path, stat: os.stat_result) -> Optional[Path]:
+        """
+        Path of the finished proxy, or None after starting a background build
+        (if one is not already running and the file has not failed before)
+        """
+        proxy_path = self._proxy_path(video_path, stat)
+        try:
+            os.utime(proxy_path)  # Record access for LRU order
+            with self._lock:
+                self.hits += 1
+            return proxy_path
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            key = proxy_path.name
+            if key not in self._building and key not in self._failed:
+                self._building[key] = self._executor.submit(self._build, video_path, proxy_path)
+        return None
+
+    def status(self, video_path: Path, stat: os.stat_result) -> str:
+        """ready, building, failed or missing"""
+        proxy_path = self._proxy_path(video_path, stat)
+        if proxy_path.exists():
+            return "ready"
+        with self._lock:
+            if proxy_path.name in self._building:
+                return "building"
+            if proxy_path.name in self._failed:
+                return "failed"
+        return "missing"
+
+    def _build(self, video_path: Path, proxy_path: Path) -> None:
+        codec = self.codec()
+        tmp_path = proxy_path.with_name(f"{proxy_path.stem}.{threading.get_ident()}.tmp{codec['suffix']}")
+        error = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for backend in config.PREVIEW_PROXY_BACKEND_ORDER:
+                if backend == "pyav" and _HAS_AV:
+                    transcode = _transcode_pyav
+                elif backend == "ffmpeg" and _has_ffmpeg():
+                    transcode = _transcode_ffmpeg
+                else:
+                    continue
+                try:
+                    transcode(video_path, tmp_path, codec)
+                    os.replace(tmp_path, proxy_path)
+                    error = None
+                    print(f"[PreviewProxy] Built {backend} proxy for {video_path.name} "
+                          f"({video_path.stat().st_size / 1024 / 1024:.1f} MB -> "
+                          f"{proxy_path.stat().st_size / 1024 / 1024:.1f} MB)")
+                    break
+                except Exception as e:
+                    error = f"{backend}: {e}"
+                    tmp_path.unlink(missing_ok=True)
+            else:
+                if error is None:
+                    error = "no transcode backend available"
+        finally:
+            tmp_path.unlink(missing_ok=True)
+            with self._lock:
+                self._building.pop(proxy_path.name, None)
+                if error is None:
+                    self.builds += 1
+                else:
+                    self.failures += 1
+                    self._failed[proxy_path.name] = error
+                    print(f"[PreviewProxy] Could not build proxy for {video_path.name}: {error}")
+        if error is None:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used proxies until under budget"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith((".mp4", ".webm")) and ".tmp" not in entry.name:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries)[:-1]:  # Never the newest
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Being served on Windows; retried after the next build
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        size_bytes = 0
+        entries = 0
+        if self.cache_dir.exists():
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if ".tmp" not in entry.name:
+                        entries += 1
+                        size_bytes += entry.stat().st_size
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "builds": self.builds,
+                "failures": self.failures,
+                "evictions": self.evictions,
+                "building": len(self._building),
+                "entries": entries,
+                "size_bytes": size_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> int:
+        """Delete every finished proxy. Returns number removed."""
+        count = 0
+        if self.cache_dir.exists():
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if ".tmp" in entry.name:
+                        continue
+                    try:
+                        os.remove(entry.path)
+                        count += 1
+                    except OSError:
+                        pass
+        with self._lock:
+            self._failed.clear()
+        return count
+
+    def shutdown(self) -> None:
+        """Drop queued builds (a running transcode finishes in its thread) and start a fresh pool"""
+        with self._lock:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            for key in [key for key, future in self._building.items() if future.cancelled()]:
+                del self._building[key]
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="proxy")
+
+
+_preview_proxies: Optional[PreviewProxies] = None
+_preview_proxies_lock = threading.Lock()
+
+
+def get_preview_proxies() -> PreviewProxies:
+    """Return the shared preview proxy cache"""
+    global _preview_proxies
+
+    with _preview_proxies_lock:
+        if _preview_proxies is None:
+            _preview_proxies = PreviewProxies(
+                config.PREVIEW_PROXY_DIR, config.PREVIEW_PROXY_MAX_BYTES, config.PREVIEW_PROXY_WORKERS
+            )
+        return _preview_proxies
@@ -1,5 +1,10 @@
 """
 Processing manager for video captioning with multi-GPU parallel processing
+
+Media flows through a staged pipeline connected by bounded asyncio queues:
+discovery -> decode -> preprocess -> generate -> write
+Decode and preprocess run ahead of the GPUs (up to prefetch_depth videos per
+GPU), so a GPU can start its next video as soon as it finishes the last one.
 """
 
 import asyncio
@@ -12,9 +17,12 @@ from dataclasses import dataclass, field
 
 from backend.schemas import (
     Settings, ProgressUpdate, ProcessingStage, ProcessingSubstage,
-    VideoInfo, WorkerProgress, MediaType
+    VideoInfo, WorkerProgress, MediaType, PipelineStageProgress
 )
 
+# Pipeline stage names, in order
+PIPELINE_STAGES = ("discovery", "decode", "preprocess", "generate", "write")
+
 
 @dataclass
 class WorkerState:
@@ -27,6 +35,7 @@ class WorkerState:
     model_info: Optional[Dict[str, Any]] = None
     is_busy: bool = False
     error: Optional[str] = None
+    idle_time: float = 0.0
 
     def to_worker_progress(self) -> WorkerProgress:
         return WorkerProgress(
@@ -35,9 +44,55 @@ class WorkerState:
             current_video=self.current_video,
             substage=self.substage,
             substage_progress=self.substage_progress,
+            idle_time=self.idle_time,
+        )
+
+
+@dataclass
+class StageState:
+    """Counters for one pipeline stage"""
+    name: str
+    queue: Optional[asyncio.Queue] = None  # Input queue feeding this stage
+    active: int = 0
+    processed: int = 0
+    idle_time: float = 0.0
+
+    def to_stage_progress(self) -> PipelineStageProgress:
+        return PipelineStageProgress(
+            name=self.name,
+            queue_depth=self.queue.qsize() if self.queue is not None else 0,
+            active=self.active,
+            processed=self.processed,
+            idle_time=self.idle_time,
         )
 
 
+@dataclass
+class PipelineItem:
+    """One media file moving through the processing pipeline"""
+    index: int
+    path: Path
+    display_name: str
+    is_image: bool = False
+    frames: Any = None
+    metadata: Optional[Dict[str, Any]] = None
+    num_frames: int = 0
+    inputs: Optional[Dict[str, Any]] = None
+    encode_time: float = 0.0
+    caption: Optional[str] = None
+    gen_meta: Optional[Dict[str, Any]] = None
+    worker_id: Optional[int] = None
+    error: Optional[str] = None
+    release: Optional[Callable[[], None]] = None  # Frees the decode buffer behind frames
+
+    def release_frames(self):
+        """Drop the frames and return their decode buffer"""
+        self.frames = None
+        if self.release is not None:
+            self.release()
+            self.release = None
+
+
 @dataclass
 class ProcessingState:
     """Mutable state for tracking processing progress"""
@@ -57,6 +112,8 @@ class ProcessingState:
     # Multi-GPU fields
     batch_size: int = 1
     workers: List[WorkerState] = field(default_factory=list)
+    # Pipeline stage counters
+    stages: List[StageState] = field(default_factory=list)
     # Transient completion event (cleared after each emit)
     _just_completed_video: Optional[str] = None
     _just_completed_caption_preview: Optional[str] = None
@@ -79,6 +136,7 @@ class ProcessingState:
             elapsed_time=elapsed,
             batch_size=self.batch_size,
             workers=[w.to_worker_progress() for w in self.workers],
+            stages=[st.to_stage_progress() for st in self.stages],
             just_completed_video=self._just_completed_video,
             just_completed_caption_preview=self._just_completed_caption_preview,
         )
@@ -99,6 +157,7 @@ class ProcessingManager:
         self.state = ProcessingState()
         self._lock = asyncio.Lock()
         self._tokens_lock = threading.Lock()
+        self._decode_pool = None  # DecodePool when settings.decode_workers > 0
         print("[ProcessingManager] Initialized")
 
     async def emit_progress(self):
@@ -122,6 +181,78 @@ class ProcessingManager:
         except ValueError:
             return video_path.name
 
+    def _ensure_decode_pool(self, settings: Settings):
+        """Start, resize or stop the decode process pool to match settings"""
+        from backend.decode_pool import DecodePool
+        from backend import config
+
+        if settings.decode_workers <= 0:
+            self.shutdown_decode_pool()
+            return None
+
+        slot_bytes = DecodePool.slot_bytes_for(settings.max_frames, settings.frame_size)
+        pool = self._decode_pool
+        if pool is None or pool.num_workers != settings.decode_workers or pool.slot_bytes != slot_bytes:
+            self.shutdown_decode_pool()
+            self._decode_pool = DecodePool(
+                num_workers=settings.decode_workers,
+                max_outstanding=config.DECODE_MAX_OUTSTANDING_BUFFERS,
+                slot_bytes=slot_bytes,
+            )
+        return self._decode_pool
+
+    def shutdown_decode_pool(self):
+        """Stop decode worker processes and free their shared memory"""
+        if self._decode_pool is not None:
+            self._decode_pool.close()
+            self._decode_pool = None
+
+    async def _decode_media(self, media_path: Path, settings: Settings):
+        """
+        Decode frames for one media file (image or video by extension).
+        Uses the decode process pool when configured, otherwise the default thread pool.
+        Returns (frames, metadata, release); call release() once the
+        (N, H, W, 3) frames array is no longer needed.
+        """
+        from backend.video_processor import process_video, process_image
+        from backend import config
+
+        is_image = media_path.suffix.lower() in config.IMAGE_EXTENSIONS
+
+        if self._decode_pool is not None:
+            return await self._decode_pool.decode(
+                media_path,
+                is_image,
+                max_frames=settings.max_frames,
+                frame_size=settings.frame_size,
+                sample_method=settings.sample_method.value,
+                sample_strategy=settings.sample_strategy.value,
+                decode_backend=settings.decode_backend.value,
+            )
+
+        loop = asyncio.get_event_loop()
+        if is_image:
+            frames, metadata = await loop.run_in_executor(
+                None,
+                lambda: process_image(
+                    media_path,
+                    frame_size=settings.frame_size,
+                )
+            )
+        else:
+            frames, metadata = await loop.run_in_executor(
+                None,
+                lambda: process_video(
+                    media_path,
+                    max_frames=settings.max_frames,
+                    frame_size=settings.frame_size,
+                    sample_method=settings.sample_method.value,
+                    sample_strategy=settings.sample_strategy.value,
+                    decode_backend=settings.decode_backend.value,
+                )
+            )
+        return frames, metadata, lambda: None
+
     def _update_vram(self):
         """Update VRAM usage (sum across all GPUs)"""
         if torch.cuda.is_available():
@@ -268,380 +399,402 @@ class ProcessingManager:
         settings: Settings,
     ) -> List[Dict[str, Any]]:
         """
-        Process videos - dispatches to parallel or sequential based on batch_size.
+        Process media files (videos and images) through the staged pipeline.
+        Uses one GPU worker per device when batch_size > 1, otherwise the single loaded model.
+        Returns list of results for each file.
         """
+        print(f"[ProcessingManager] process_videos called with {len(videos)} videos")
+
         if settings.batch_size > 1:
-            return await self._process_videos_parallel(videos, settings)
-        else:
-            return await self._process_videos_sequential(videos, settings)
+            batch_size = min(settings.batch_size, len(videos))
+            devices = [f"cuda:{i}" for i in range(batch_size)]
+
+            print(f"[ProcessingManager] Processing {len(videos)} videos with {batch_size} workers on {devices}")
+
+            # Load models if needed
+            if not self.model_infos or len(self.model_infos) < batch_size:
+                success = await self.load_models_parallel(settings, devices)
+                if not success:
+                    return []
+
+            model_infos = [self.model_infos.get(device) for device in devices]
+            return await self._run_pipeline(videos, settings, devices, model_infos, multi_gpu=True)
+
+        print(f"[ProcessingManager] Checking model state. model_loaded={self.state.model_loaded}, model_info={self.model_info is not None}")
+        if not self.state.model_loaded or self.model_info is None:
+            # Load model first (load_model acquires its own lock)
+            print("[ProcessingManager] Model not loaded, loading now...")
+            success = await self.load_model(settings)
+            if not success:
+                print("[ProcessingManager] Model load failed, returning early")
+                return []
+            print("[ProcessingManager] Model load succeeded")
 
-    async def _process_videos_parallel(
+        devices = [str(self.model_info.get("device", settings.device.value))]
+        return await self._run_pipeline(videos, settings, devices, [self.model_info], multi_gpu=False)
+
+    async def _run_stage(
+        self,
+        stage: StageState,
+        num_tasks: int,
+        handler: Callable[[PipelineItem, int], Any],
+        out_queue: Optional[asyncio.Queue],
+        num_downstream: int,
+        on_idle: Optional[Callable[[int, float], None]] = None,
+    ):
+        """
+        Run num_tasks copies of handler over the stage's input queue.
+
+        None is the end-of-input sentinel: each task exits on one, and once all
+        tasks have exited num_downstream sentinels are sent on. Items that
+        already failed pass straight through to the write stage; when a stop is
+        requested, unfinished items are dropped instead of handled.
+        """
+        async def run_task(task_id: int):
+            while True:
+                wait_start = time.time()
+                item = await stage.queue.get()
+                waited = time.time() - wait_start
+                stage.idle_time += waited
+                if on_idle is not None:
+                    on_idle(task_id, waited)
+
+                if item is None:
+                    return
+
+                if self.should_stop and out_queue is not None:
+                    item.release_frames()
+                    continue
+
+                if item.error is None:
+                    stage.active += 1
+                    try:
+                        await handler(item, task_id)
+                    except Exception as e:
+                        item.error = str(e)
+                        item.release_frames()
+                        print(f"[ProcessingManager] {stage.name} failed for {item.path.name}: {e}")
+                    finally:
+                        stage.active -= 1
+                stage.processed += 1
+
+                if out_queue is not None:
+                    await out_queue.put(item)
+
+        try:
+            await asyncio.gather(*(run_task(i) for i in range(num_tasks)))
+        finally:
+            if out_queue is not None:
+                for _ in range(num_downstream):
+                    await out_queue.put(None)
+
+    async def _run_pipeline(
         self,
         videos: List[Path],
         settings: Settings,
+        devices: List[str],
+        model_infos: List[Optional[Dict[str, Any]]],
+        multi_gpu: bool,
     ) -> List[Dict[str, Any]]:
         """
-        Process media (videos and images) in parallel across multiple GPUs.
+        Caption media through discovery -> decode -> preprocess -> generate -> write.
+
+        Each GPU has its own generate task; decode and preprocess fill bounded
+        queues of prefetch_depth videos per GPU so the next video is ready
+        when a GPU frees up.
         """
-        from backend.model_loader import generate_caption
-        from backend.video_processor import process_video, process_image
+        from backend.model_loader import prepare_inputs, generate_from_inputs
         from backend import config
 
-        batch_size = min(settings.batch_size, len(videos))
-        devices = [f"cuda:{i}" for i in range(batch_size)]
-
-        print(f"[ProcessingManager] Processing {len(videos)} videos with {batch_size} workers on {devices}")
-
-        # Load models if needed
-        if not self.model_infos or len(self.model_infos) < batch_size:
-            success = await self.load_models_parallel(settings, devices)
-            if not success:
-                return []
-
         async with self._lock:
+            print("[ProcessingManager] Acquired lock, starting processing pipeline")
             self.is_processing = True
             self.should_stop = False
             self.state.stage = ProcessingStage.PROCESSING
             self.state.total_videos = len(videos)
             self.state.video_index = 0
             self.state.completed_videos = 0
-            self.state.batch_size = batch_size
+            self.state.batch_size = len(devices) if multi_gpu else 1
             self.state.start_time = time.time()
-
-            # Initialize worker states
             self.state.workers = [
-                WorkerState(worker_id=i, device=devices[i])
-                for i in range(batch_size)
-            ]
-
+                WorkerState(worker_id=i, device=device)
+                for i, device in enumerate(devices)
+            ] if multi_gpu else []  # Single GPU reports top-level substage only
+            self._ensure_decode_pool(settings)
+
+            # GPU workers that actually have a model
+            gpu_workers = [i for i, info in enumerate(model_infos) if info is not None]
+            for i, info in enumerate(model_infos):
+                if info is None and multi_gpu:
+                    self.state.workers[i].error = f"No model loaded on {devices[i]}"
+
+            queue_size = settings.prefetch_depth * len(gpu_workers)
+            decode_tasks = settings.decode_workers or len(gpu_workers)
+            preprocess_tasks = len(gpu_workers)
+
+            stages = {name: StageState(name=name) for name in PIPELINE_STAGES}
+            stages["decode"].queue = asyncio.Queue(maxsize=queue_size)
+            stages["preprocess"].queue = asyncio.Queue(maxsize=queue_size)
+            stages["generate"].queue = asyncio.Queue(maxsize=queue_size)
+            stages["write"].queue = asyncio.Queue()
+            self.state.stages = [stages[name] for name in PIPELINE_STAGES]
             await self.emit_progress()
 
             results = []
-            video_queue = list(videos)
-            active_tasks: Dict[int, asyncio.Task] = {}
-
             loop = asyncio.get_event_loop()
 
-            async def process_single_video(worker_id: int, video_path: Path):
-                """Process a single video on a specific worker/GPU"""
-                device = devices[worker_id]
-                model_info = self.model_infos.get(device)
-
-                if not model_info:
-                    return {
-                        "video": video_path.name,
-                        "success": False,
-                        "error": f"No model loaded on {device}",
-                        "caption": None,
-                        "worker_id": worker_id,
-                    }
-
-                worker = self.state.workers[worker_id]
-
-                worker.is_busy = True
-                worker.current_video = self._get_display_name(video_path)
-                worker.substage = ProcessingSubstage.EXTRACTING_FRAMES
-                worker.substage_progress = 0.0
-                await self.emit_progress()
-
-                result = {
-                    "video": video_path.name,
-                    "success": False,
-                    "error": None,
-                    "caption": None,
-                    "worker_id": worker_id,
-                }
-
+            def set_substage(worker_id: int, item: Optional[PipelineItem], substage: ProcessingSubstage, progress: float):
+                if multi_gpu:
+                    worker = self.state.workers[worker_id]
+                    worker.is_busy = item is not None
+                    worker.current_video = item.display_name if item else None
+                    worker.substage = substage
+                    worker.substage_progress = progress
+                else:
+                    self.state.substage = substage
+                    self.state.substage_progress = progress
+
+            async def discover():
+                """Discovery: classify media and feed the decode queue in order"""
+                discovery = stages["discovery"]
                 try:
-                    # Extract frames (detect image vs video by extension)
-                    worker.substage_progress = 0.2
-                    await self.emit_progress()
-
-                    is_image = video_path.suffix.lower() in config.IMAGE_EXTENSIONS
-                    if is_image:
-                        frames, video_meta = await loop.run_in_executor(
-                            None,
-                            lambda: process_image(
-                                video_path,
-                                frame_size=settings.frame_size,
-                            )
-                        )
-                    else:
-                        frames, video_meta = await loop.run_in_executor(
-                            None,
-                            lambda: process_video(
-                                video_path,
-                                max_frames=settings.max_frames,
-                                frame_size=settings.frame_size,
-                            )
+                    for index, media_path in enumerate(videos):
+                        if self.should_stop:
+                            break
+                        discovery.active = 1
+                        item = PipelineItem(
+                            index=index,
+                            path=media_path,
+                            display_name=self._get_display_name(media_path),
+                            is_image=media_path.suffix.lower() in config.IMAGE_EXTENSIONS,
                         )
+                        discovery.processed += 1
+                        await stages["decode"].queue.put(item)
+                finally:
+                    discovery.active = 0
+                    for _ in range(decode_tasks):
+                        await stages["decode"].queue.put(None)
+
+            async def decode(item: PipelineItem, _task_id: int):
+                item.frames, item.metadata, item.release = await self._decode_media(item.path, settings)
+                item.num_frames = len(item.frames)
+                if not item.is_image:
+                    await loop.run_in_executor(None, self._store_thumbnail, item)
+
+            async def preprocess(item: PipelineItem, task_id: int):
+                # One preprocess task per model, so no processor is used from two threads
+                model_info = model_infos[gpu_workers[task_id]]
+                try:
+                    item.inputs, item.encode_time = await loop.run_in_executor(
+                        None,
+                        lambda: prepare_inputs(model_info, self._dedup_frames(item, settings), settings.prompt)
+                    )
+                finally:
+                    item.release_frames()  # Pixel values are copied into inputs
 
-                    worker.substage = ProcessingSubstage.ENCODING
-                    worker.substage_progress = 0.4
-                    await self.emit_progress()
+            async def generate(item: PipelineItem, task_id: int):
+                worker_id = gpu_workers[task_id]
+                model_info = model_infos[worker_id]
+                item.worker_id = worker_id
 
-                    # Generate caption
-                    worker.substage = ProcessingSubstage.GENERATING
-                    worker.substage_progress = 0.5
-                    await self.emit_progress()
+                self.state.video_index = item.index
+                self.state.current_video = item.display_name
+                set_substage(worker_id, item, ProcessingSubstage.GENERATING, 0.5)
+                await self.emit_progress()
 
+                try:
                     caption, gen_meta = await loop.run_in_executor(
                         None,
-                        lambda: generate_caption(
-                            model_info=model_info,
-                            images=frames,
-                            prompt=settings.prompt,
+                        lambda: generate_from_inputs(
+                            model_info,
+                            item.inputs,
                             max_tokens=settings.max_tokens,
                             temperature=settings.temperature,
+                            num_frames=item.num_frames,
+                            encode_time=item.encode_time,
                         )
                     )
-
-                    # Thread-safe token counter update
-                    with self._tokens_lock:
-                        self.state.tokens_generated += gen_meta["output_tokens"]
-                        self.state.tokens_per_sec = gen_meta["tokens_per_sec"]
-
-                    self._update_vram()
-
-                    # Save caption
-                    worker.substage_progress = 0.9
-                    await self.emit_progress()
-
-                    output_path = video_path.parent / (video_path.stem + config.OUTPUT_EXTENSION)
-                    with open(output_path, "w", encoding="utf-8") as f:
-                        f.write(caption)
-                        if settings.include_metadata:
-                            f.write("\n\n" + "=" * 60 + "\n")
-                            f.write("METADATA\n")
-                            f.write("=" * 60 + "\n")
-                            f.write(f"Video: {video_path.name}\n")
-                            f.write(f"Worker: {worker_id} ({device})\n")
-                            f.write(f"Frames processed: {gen_meta['num_frames']}\n")
-                            f.write(f"Output tokens: {gen_meta['output_tokens']}\n")
-                            f.write(f"Tokens/sec: {gen_meta['tokens_per_sec']:.1f}\n")
-
-                    result["success"] = True
-                    result["caption"] = caption[:200] + "..." if len(caption) > 200 else caption
-                    result["output_path"] = str(output_path)
-
-                except Exception as e:
-                    result["error"] = str(e)
-                    worker.error = str(e)
-                    print(f"[ProcessingManager] Worker {worker_id} error processing {video_path.name}: {e}")
-
                 finally:
-                    worker.substage_progress = 1.0
-                    worker.is_busy = False
-                    worker.current_video = None
-                    worker.substage = ProcessingSubstage.IDLE
-                    self.state.completed_videos += 1
-                    self.state._just_completed_video = self._get_display_name(video_path)
-                    if result.get("success") and result.get("caption"):
-                        caption_text = result["caption"]
-                        self.state._just_completed_caption_preview = caption_text[:150] + "..." if len(caption_text) > 150 else caption_text
-                    await self.emit_progress()
-
-                return result
-
-            # Main processing loop - distribute work across workers
-            while video_queue or active_tasks:
-                if self.should_stop:
-                    # Cancel all active tasks
-                    for task in active_tasks.values():
-                        task.cancel()
-                    break
-
-                # Start new tasks on available workers
-                for worker_id in range(batch_size):
-                    if worker_id not in active_tasks and video_queue:
-                        video_path = video_queue.pop(0)
-                        self.state.video_index = len(videos) - len(video_queue) - len(active_tasks)
-                        # Update current_video to first active video for backward compat
-                        self.state.current_video = self._get_display_name(video_path)
-                        task = asyncio.create_task(process_single_video(worker_id, video_path))
-                        active_tasks[worker_id] = task
-
-                if not active_tasks:
-                    break
-
-                # Wait for any task to complete
-                done, _ = await asyncio.wait(
-                    active_tasks.values(),
-                    return_when=asyncio.FIRST_COMPLETED
-                )
-
-                # Collect results and free workers
-                for task in done:
-                    try:
-                        result = task.result()
-                        results.append(result)
-                        worker_id = result["worker_id"]
-                        del active_tasks[worker_id]
-                    except asyncio.CancelledError:
-                        pass
-                    except Exception as e:
-                        print(f"[ProcessingManager] Task error: {e}")
-
-            # Complete
-            self.state.stage = ProcessingStage.COMPLETE
-            self.state.substage = ProcessingSubstage.IDLE
-            self.state.current_video = None
-            self.is_processing = False
-            await self.emit_progress()
-
-        return results
-
-    async def _process_videos_sequential(
-        self,
-        videos: List[Path],
-        settings: Settings,
-    ) -> List[Dict[str, Any]]:
-        """
-        Process a list of media files (videos and images) sequentially (original single-GPU behavior).
-        Returns list of results for each file.
-        """
-        from backend.model_loader import generate_caption
-        from backend.video_processor import process_video, process_image
-        from backend import config
-
-        print(f"[ProcessingManager] process_videos called with {len(videos)} videos")
-        for v in videos:
-            print(f"  - {v}")
+                    item.inputs = None
+                    set_substage(worker_id, None, ProcessingSubstage.IDLE, 1.0)
 
-        results = []
+                item.caption = caption
+                item.gen_meta = gen_meta
 
-        print(f"[ProcessingManager] Checking model state. model_loaded={self.state.model_loaded}, model_info={self.model_info is not None}")
-        if not self.state.model_loaded or self.model_info is None:
-            # Load model first (load_model acquires its own lock)
-            print("[ProcessingManager] Model not loaded, loading now...")
-            success = await self.load_model(settings)
-            if not success:
-                print("[ProcessingManager] Model load failed, returning early")
-                return results
-            print("[ProcessingManager] Model load succeeded")
-
-        async with self._lock:
-            print("[ProcessingManager] Acquired lock, starting video processing loop")
-            self.is_processing = True
-            self.should_stop = False
-            self.state.stage = ProcessingStage.PROCESSING
-            self.state.total_videos = len(videos)
-            self.state.video_index = 0
-            self.state.completed_videos = 0
-            self.state.batch_size = 1
-            self.state.workers = []  # No workers for sequential
-            self.state.start_time = time.time()
-            await self.emit_progress()
-
-            loop = asyncio.get_event_loop()
+                # Thread-safe token counter update
+                with self._tokens_lock:
+                    self.state.tokens_generated += gen_meta["output_tokens"]
+                    self.state.tokens_per_sec = gen_meta["tokens_per_sec"]
 
-            for i, video_path in enumerate(videos):
-                if self.should_stop:
-                    break
+                self._update_vram()
 
-                self.state.video_index = i
-                self.state.current_video = self._get_display_name(video_path)
-                self.state.substage = ProcessingSubstage.EXTRACTING_FRAMES
-                self.state.substage_progress = 0.0
-                await self.emit_progress()
+            def record_gpu_idle(task_id: int, seconds: float):
+                if multi_gpu:
+                    self.state.workers[gpu_workers[task_id]].idle_time += seconds
 
+            async def write(item: PipelineItem, _task_id: int):
                 result = {
-                    "video": video_path.name,
+                    "video": item.path.name,
                     "success": False,
-                    "error": None,
+                    "error": item.error,
                     "caption": None,
                 }
+                if multi_gpu:
+                    result["worker_id"] = item.worker_id
 
-                try:
-                    # Extract frames (detect image vs video by extension)
-                    self.state.substage_progress = 0.2
-                    await self.emit_progress()
-
-                    is_image = video_path.suffix.lower() in config.IMAGE_EXTENSIONS
-                    if is_image:
-                        frames, video_meta = await loop.run_in_executor(
-                            None,
-                            lambda: process_image(
-                                video_path,
-                                frame_size=settings.frame_size,
-                            )
-                        )
-                    else:
-                        frames, video_meta = await loop.run_in_executor(
+                if item.error is None:
+                    try:
+                        output_path = await loop.run_in_executor(
                             None,
-                            lambda: process_video(
-                                video_path,
-                                max_frames=settings.max_frames,
-                                frame_size=settings.frame_size,
-                            )
+                            lambda: self._write_caption(item, settings, devices if multi_gpu else None)
                         )
+                        caption = item.caption
+                        result["success"] = True
+                        result["caption"] = caption[:200] + "..." if len(caption) > 200 else caption
+                        result["output_path"] = str(output_path)
+                        if "frames_dropped" in item.metadata:
+                            result["frames_dropped"] = item.metadata["frames_dropped"]
+                        self.state._just_completed_caption_preview = caption[:150] + "..." if len(caption) > 150 else caption
+                    except Exception as e:
+                        item.error = str(e)
+                        result["error"] = str(e)
 
-                    self.state.substage = ProcessingSubstage.ENCODING
-                    self.state.substage_progress = 0.4
-                    await self.emit_progress()
+                if item.error is not None:
+                    if multi_gpu and item.worker_id is not None:
+                        self.state.workers[item.worker_id].error = item.error
+                    self.state.error_message = f"Error processing {item.path.name}: {item.error}"
+                    print(f"[ProcessingManager] Error processing {item.path.name}: {item.error}")
 
-                    # Generate caption
-                    self.state.substage = ProcessingSubstage.GENERATING
-                    self.state.substage_progress = 0.5
-                    await self.emit_progress()
+                self.state.completed_videos += 1
+                self.state._just_completed_video = item.display_name
+                results.append(result)
+                await self.emit_progress()
 
-                    caption, gen_meta = await loop.run_in_executor(
-                        None,
-                        lambda: generate_caption(
-                            model_info=self.model_info,
-                            images=frames,
-                            prompt=settings.prompt,
-                            max_tokens=settings.max_tokens,
-                            temperature=settings.temperature,
-                        )
-                    )
+            async def write_stage():
+                # Write handles failed items too, so it runs its own loop
+                write_state = stages["write"]
+                while True:
+                    wait_start = time.time()
+                    item = await write_state.queue.get()
+                    write_state.idle_time += time.time() - wait_start
+                    if item is None:
+                        return
+                    write_state.active = 1
+                    try:
+                        await write(item, 0)
+                    finally:
+                        write_state.active = 0
+                    write_state.processed += 1
+
+            stage_tasks = [
+                asyncio.create_task(discover()),
+                asyncio.create_task(self._run_stage(
+                    stages["decode"], decode_tasks, decode,
+                    stages["preprocess"].queue, preprocess_tasks,
+                )),
+                asyncio.create_task(self._run_stage(
+                    stages["preprocess"], preprocess_tasks, preprocess,
+                    stages["generate"].queue, len(gpu_workers),
+                )),
+                asyncio.create_task(self._run_stage(
+                    stages["generate"], len(gpu_workers), generate,
+                    stages["write"].queue, 1, on_idle=record_gpu_idle,
+                )),
+                asyncio.create_task(write_stage()),
+            ]
 
-                    self.state.tokens_generated += gen_meta["output_tokens"]
-                    self.state.tokens_per_sec = gen_meta["tokens_per_sec"]
-                    self._update_vram()
-
-                    # Save caption to same directory as video
-                    self.state.substage_progress = 0.9
-                    await self.emit_progress()
-
-                    output_path = video_path.parent / (video_path.stem + config.OUTPUT_EXTENSION)
-                    with open(output_path, "w", encoding="utf-8") as f:
-                        f.write(caption)
-                        if settings.include_metadata:
-                            f.write("\n\n" + "=" * 60 + "\n")
-                            f.write("METADATA\n")
-                            f.write("=" * 60 + "\n")
-                            f.write(f"Video: {video_path.name}\n")
-                            f.write(f"Frames processed: {gen_meta['num_frames']}\n")
-                            f.write(f"Output tokens: {gen_meta['output_tokens']}\n")
-                            f.write(f"Tokens/sec: {gen_meta['tokens_per_sec']:.1f}\n")
-
-                    result["success"] = True
-                    result["caption"] = caption[:200] + "..." if len(caption) > 200 else caption
-                    result["output_path"] = str(output_path)
-
-                    self.state.substage_progress = 1.0
-                    self.state.completed_videos += 1
-                    self.state._just_completed_video = self._get_display_name(video_path)
-                    preview = caption[:150] + "..." if len(caption) > 150 else caption
-                    self.state._just_completed_caption_preview = preview
-                    await self.emit_progress()
-
-                except Exception as e:
-                    result["error"] = str(e)
-                    self.state.error_message = f"Error processing {video_path.name}: {e}"
-                    await self.emit_progress()
+            try:
+                await asyncio.gather(*stage_tasks)
+            finally:
+                for task in stage_tasks:
+                    task.cancel()
+                # Return decode buffers held by anything still queued
+                for stage in self.state.stages:
+                    while stage.queue is not None and not stage.queue.empty():
+                        item = stage.queue.get_nowait()
+                        if item is not None:
+                            item.release_frames()
+
+                # Complete
+                self.state.stage = ProcessingStage.COMPLETE
+                self.state.substage = ProcessingSubstage.IDLE
+                self.state.current_video = None
+                self.is_processing = False
+                await self.emit_progress()
 
-                results.append(result)
+        return results
 
-            # Complete
-            self.state.stage = ProcessingStage.COMPLETE
-            self.state.substage = ProcessingSubstage.IDLE
-            self.state.current_video = None
-            self.is_processing = False
-            await self.emit_progress()
+    def _dedup_frames(self, item: PipelineItem, settings: Settings):
+        """
+        Drop near-duplicate frames before they become visual tokens.
+        Records frames_dropped in the item metadata and returns the frames to caption.
+        """
+        from backend.video_processor import dedup_frames
 
-        return results
+        frames = item.frames
+        if settings.dedup_threshold == 0 or len(frames) <= 1:
+            return frames
+
+        keep = dedup_frames(frames, settings.dedup_threshold, settings.dedup_method.value)
+        item.metadata["frames_dropped"] = len(frames) - len(keep)
+        if len(keep) < len(frames):
+            frames = frames[keep]
+            item.num_frames = len(frames)
+        return frames
+
+    def _store_thumbnail(self, item: PipelineItem):
+        """
+        Store the grid thumbnail from the decoded frames when none is stored,
+        so a captioned video is never decoded again just for its thumbnail.
+        """
+        from backend import config
+        from backend.thumbnail_store import get_thumbnail_store
+        from backend.thumbnailer import thumbnail_from_frames, preferred_format
+
+        try:
+            store = get_thumbnail_store()
+            size = config.THUMBNAIL_DEFAULT_SIZE
+            fmt = preferred_format()
+            key = store.make_key(item.path, item.path.stat(), size, fmt)
+            if store.contains(key):
+                return
+            result = thumbnail_from_frames(item.frames, item.metadata.get("duration"), size, fmt)
+            if result is not None and result.ok:
+                store.put(key, result.data)
+        except Exception as e:
+            # A missing thumbnail is generated on demand later
+            print(f"[ProcessingManager] Could not store thumbnail for {item.path.name}: {e}")
+
+    def _write_caption(
+        self,
+        item: PipelineItem,
+        settings: Settings,
+        devices: Optional[List[str]],
+    ) -> Path:
+        """Save caption to the same directory as the media file. Returns the output path."""
+        from backend import config
+        from backend.media_index import bump_library_generation
+
+        video_path = item.path
+        gen_meta = item.gen_meta
+        output_path = video_path.parent / (video_path.stem + config.OUTPUT_EXTENSION)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(item.caption)
+            if settings.include_metadata:
+                f.write("\n\n" + "=" * 60 + "\n")
+                f.write("METADATA\n")
+                f.write("=" * 60 + "\n")
+                f.write(f"Video: {video_path.name}\n")
+                if devices is not None:
+                    f.write(f"Worker: {item.worker_id} ({devices[item.worker_id]})\n")
+                f.write(f"Frames processed: {gen_meta['num_frames']}\n")
+                if "frames_dropped" in item.metadata:
+                    f.write(f"Duplicate frames dropped: {item.metadata['frames_dropped']}\n")
+                f.write(f"Output tokens: {gen_meta['output_tokens']}\n")
+                f.write(f"Tokens/sec: {gen_meta['tokens_per_sec']:.1f}\n")
+        # Overwriting an existing caption leaves the directory mtime unchanged
+        bump_library_generation()
+        return output_path
 
     def stop(self):
         """Request processing to stop"""
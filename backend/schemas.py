@@ -18,6 +18,30 @@ class DtypeType(str, Enum):
     FLOAT32 = "float32"
 
 
+class SampleMethod(str, Enum):
+    UNIFORM = "uniform"
+    FIRST_LAST = "first_last"
+    ADAPTIVE = "adaptive"
+
+
+class SampleStrategy(str, Enum):
+    AUTO = "auto"
+    SEQUENTIAL = "sequential"
+    SEEK = "seek"
+
+
+class DecodeBackend(str, Enum):
+    AUTO = "auto"
+    OPENCV = "opencv"
+    FFMPEG = "ffmpeg"
+    PYAV = "pyav"
+
+
+class DedupMethod(str, Enum):
+    DHASH = "dhash"
+    PHASH = "phash"
+
+
 class ProcessingStage(str, Enum):
     IDLE = "idle"
     LOADING_MODEL = "loading_model"
@@ -46,6 +70,13 @@ class Settings(BaseModel):
     use_torch_compile: bool = True
     include_metadata: bool = False
     batch_size: int = Field(default=1, ge=1, le=8)
+    sample_method: SampleMethod = SampleMethod.UNIFORM
+    sample_strategy: SampleStrategy = SampleStrategy.AUTO
+    decode_backend: DecodeBackend = DecodeBackend.AUTO
+    dedup_threshold: int = Field(default=0, ge=0, le=64)  # Hamming bits; 0 = keep all frames
+    dedup_method: DedupMethod = DedupMethod.DHASH
+    decode_workers: int = Field(default=0, ge=0, le=32)  # 0 = decode in-process
+    prefetch_depth: int = Field(default=2, ge=1, le=16)  # Decoded videos queued per GPU
     prompt: str = """Describe this video in detail. Include:
 - The main subject and their actions
 - The setting and environment
@@ -67,6 +98,13 @@ class SettingsUpdate(BaseModel):
     use_torch_compile: Optional[bool] = None
     include_metadata: Optional[bool] = None
     batch_size: Optional[int] = Field(default=None, ge=1, le=8)
+    sample_method: Optional[SampleMethod] = None
+    sample_strategy: Optional[SampleStrategy] = None
+    decode_backend: Optional[DecodeBackend] = None
+    dedup_threshold: Optional[int] = Field(default=None, ge=0, le=64)
+    dedup_method: Optional[DedupMethod] = None
+    decode_workers: Optional[int] = Field(default=None, ge=0, le=32)
+    prefetch_depth: Optional[int] = Field(default=None, ge=1, le=16)
     prompt: Optional[str] = None
 
 
@@ -77,6 +115,16 @@ class WorkerProgress(BaseModel):
     current_video: Optional[str] = None
     substage: ProcessingSubstage = ProcessingSubstage.IDLE
     substage_progress: float = 0.0
+    idle_time: float = 0.0  # Seconds spent waiting for preprocessed input
+
+
+class PipelineStageProgress(BaseModel):
+    """Queue depth and utilisation for one processing pipeline stage"""
+    name: str
+    queue_depth: int = 0  # Items waiting in this stage's input queue
+    active: int = 0  # Items currently being handled
+    processed: int = 0
+    idle_time: float = 0.0  # Seconds this stage's tasks spent waiting for input
 
 
 class ProgressUpdate(BaseModel):
@@ -97,6 +145,8 @@ class ProgressUpdate(BaseModel):
     batch_size: int = 1
     workers: List[WorkerProgress] = []
     completed_videos: int = 0
+    # Pipeline stage stats (discovery, decode, preprocess, generate, write)
+    stages: List[PipelineStageProgress] = []
     # Transient completion event fields (set only on the message after a video finishes)
     just_completed_video: Optional[str] = None
     just_completed_caption_preview: Optional[str] = None
@@ -129,6 +179,87 @@ class VideoListResponse(BaseModel):
     total_count: int
 
 
+class MediaSortField(str, Enum):
+    """Sort key for paginated media listings"""
+    NAME = "name"
+    SIZE = "size"
+    MTIME = "mtime"
+    CAPTION = "caption"
+
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+class ListingEncoding(str, Enum):
+    """Wire format for media listings"""
+    JSON = "json"  # List of VideoInfo objects
+    COMPACT = "compact"  # Columnar JSON (see backend/listing_codec.py)
+    MSGPACK = "msgpack"  # Columnar msgpack; not available for SSE streams
+
+
+class VideoPageResponse(BaseModel):
+    """One page of a sorted, filtered media listing"""
+    videos: List[VideoInfo]
+    total_count: int  # Files matching the filters, across all pages
+    next_cursor: Optional[str] = None  # None on the last page
+
+
+class UploadedFile(BaseModel):
+    """A file written to the working directory"""
+    filename: str
+    path: str
+    size_bytes: int
+
+
+class UploadFailure(BaseModel):
+    """A file that could not be written"""
+    filename: str
+    error: str
+
+
+class UploadResponse(BaseModel):
+    """Result of a multi-file upload"""
+    success: bool  # False if any file failed
+    uploaded: List[UploadedFile] = []
+    failed: List[UploadFailure] = []
+
+
+class UploadSessionRequest(BaseModel):
+    """Declares a file to upload in resumable chunks"""
+    filename: str = Field(..., min_length=1)  # Relative to the working directory
+    size_bytes: int = Field(..., ge=0)
+
+
+class UploadSessionResponse(BaseModel):
+    """State of a resumable upload"""
+    upload_id: str
+    filename: str
+    size_bytes: int
+    offset: int  # Bytes received; the next chunk starts here
+    complete: bool = False
+    path: Optional[str] = None  # Set once complete
+
+
+class ThumbnailSpriteRequest(BaseModel):
+    """Media files to pack into one thumbnail sprite sheet"""
+    names: List[str] = Field(..., min_length=1, max_length=200)
+    size: int = 160  # Snapped to a thumbnail size bucket
+    columns: int = Field(default=10, ge=1, le=50)
+
+
+class ThumbnailSpriteResponse(BaseModel):
+    """Layout of a sprite sheet of size x size tiles"""
+    sheet: str  # URL of the sheet image
+    size: int
+    columns: int
+    width: int
+    height: int
+    tiles: Dict[str, List[int]]  # name -> [x, y] of the tile's top-left corner
+    missing: List[str] = []  # Names not found or failed to generate
+
+
 class CaptionInfo(BaseModel):
     """Information about a generated caption"""
     video_name: str
@@ -11,6 +11,18 @@ from unittest.mock import MagicMock, patch
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+# test_api imports the app inside patch.dict("sys.modules"), which unloads
+# every module imported there on exit. Extension modules cannot be loaded
+# twice per process, so load them before any test module is collected.
+import numpy  # noqa: E402,F401
+import cv2  # noqa: E402,F401
+from PIL import Image  # noqa: E402,F401
+
+try:
+    import av  # noqa: F401
+except ImportError:
+    pass
+
 
 @pytest.fixture(autouse=True)
 def mock_config():
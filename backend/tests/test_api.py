@@ -6,6 +6,7 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 import sys
+from collections import OrderedDict
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -17,6 +18,10 @@ with patch.dict('sys.modules', {
     'backend.video_processor': MagicMock(),
 }):
     from backend.api import app
+    from backend import api  # After app: the module app was defined in
+
+from backend import config
+from backend import media_index
 
 
 @pytest.fixture
@@ -171,5 +176,75 @@ class TestProcessingEndpoints:
         assert data["success"] is True
 
 
+@pytest.fixture
+def library_client(tmp_path, monkeypatch):
+    """Client without the lifespan over a working directory with one captioned video"""
+    (tmp_path / "a.mp4").write_bytes(b"x")
+    (tmp_path / "a.txt").write_text("a caption")
+    monkeypatch.setattr(config, "_current_working_dir", tmp_path)
+    monkeypatch.setattr(config, "_traverse_subfolders", False)
+    monkeypatch.setattr(config, "_include_videos", True)
+    monkeypatch.setattr(config, "_include_images", False)
+    monkeypatch.setattr(config, "MEDIA_INDEX_ENABLED", True)
+    monkeypatch.setattr(config, "MEDIA_INDEX_PATH", tmp_path / "index.db")
+    monkeypatch.setattr(config, "MEDIA_INDEX_MIN_REFRESH_INTERVAL", 0)
+    monkeypatch.setattr(media_index, "_conn", None)
+    monkeypatch.setattr(media_index, "_indexes", OrderedDict())
+    monkeypatch.setattr(api, "get_metadata_store", lambda: None)
+    return TestClient(app)
+
+
+class TestConditionalRequests:
+    """Tests for ETag / If-None-Match on library responses"""
+
+    @pytest.mark.parametrize("path", ["/api/videos", "/api/captions", "/api/directory"])
+    def test_matching_etag_is_304(self, library_client, path):
+        """Test a client that has the current version gets an empty 304"""
+        first = library_client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert etag.startswith('W/"')
+
+        again = library_client.get(path, headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["etag"] == etag
+
+    def test_weak_list_and_wildcard_match(self, library_client):
+        """Test If-None-Match compares weakly and accepts lists and *"""
+        etag = library_client.get("/api/videos").headers["etag"]
+        strong = etag.removeprefix("W/")
+        for header in (strong, f'"stale", {etag}', f'W/"stale",{strong}', "*"):
+            assert library_client.get("/api/videos", headers={"If-None-Match": header}).status_code == 304
+        assert library_client.get("/api/videos", headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+
+    def test_caption_write_changes_etag(self, library_client, tmp_path):
+        """Test rewriting a caption in place (as processing does) changes the listing ETag"""
+        etag = library_client.get("/api/videos").headers["etag"]
+        (tmp_path / "a.txt").write_text("a new caption")
+        api.bump_library_generation()
+
+        response = library_client.get("/api/videos", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["videos"][0]["caption_preview"].startswith("a new caption")
+
+    def test_caption_delete_changes_etag(self, library_client):
+        etag = library_client.get("/api/captions").headers["etag"]
+        assert library_client.delete("/api/captions/a.mp4").status_code == 200
+
+        response = library_client.get("/api/captions", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["total_count"] == 0
+
+    def test_single_caption_etag(self, library_client, tmp_path):
+        """Test a caption's ETag follows its file"""
+        etag = library_client.get("/api/captions/a.mp4").headers["etag"]
+        assert library_client.get("/api/captions/a.mp4", headers={"If-None-Match": etag}).status_code == 304
+
+        (tmp_path / "a.txt").write_text("a longer caption than before")
+        assert library_client.get("/api/captions/a.mp4", headers={"If-None-Match": etag}).status_code == 200
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,64 @@
+"""
+Tests for the shared-memory decode pool
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.decode_pool import DecodePool
+
+
+@pytest.fixture
+def image(tmp_path):
+    """Flat-colour PNG at the 224px minimum frame size"""
+    path = tmp_path / "still.png"
+    Image.fromarray(np.full((224, 224, 3), 99, dtype=np.uint8)).save(path)
+    return path
+
+
+def decode(slot_bytes: int, image: Path):
+    """Decode image in a one-worker pool; returns (frames, metadata, viewed in a slot, slot held)"""
+    async def run():
+        pool = DecodePool(num_workers=1, max_outstanding=1, slot_bytes=slot_bytes)
+        try:
+            frames, metadata, release = await pool.decode(image, is_image=True, max_frames=1, frame_size=224)
+            in_slot = any(np.shares_memory(frames, np.frombuffer(slot.buf, dtype=np.uint8)) for slot in pool._slots)
+            held = pool._semaphore.locked()
+            result = (frames.copy(), metadata, in_slot, held)
+            del frames  # Drop the view so the slot can be closed
+            release()
+            assert not pool._semaphore.locked()
+            assert len(pool._free_slots) == len(pool._slots)
+            return result
+        finally:
+            pool.close()
+    return asyncio.run(run())
+
+
+class TestDecodePool:
+    """Tests for handing frames back from worker processes"""
+
+    def test_frames_in_shared_memory(self, image):
+        """Test frames that fit are viewed in the slot, which stays held until release"""
+        frames, metadata, in_slot, held = decode(DecodePool.slot_bytes_for(1, 224), image)
+        assert frames.shape == (1, 224, 224, 3)
+        assert (frames == 99).all()
+        assert metadata["decode_worker"] == "process"
+        assert in_slot
+        assert held
+
+    def test_slot_overflow_falls_back_to_pickle(self, image):
+        """Test frames larger than the slot come back pickled and free the slot at once"""
+        frames, metadata, in_slot, held = decode(16, image)
+        assert frames.shape == (1, 224, 224, 3)
+        assert (frames == 99).all()
+        assert metadata["decode_worker"] == "process"
+        assert not in_slot
+        assert not held
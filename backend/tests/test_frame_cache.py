@@ -0,0 +1,126 @@
+"""
+Tests for the persistent decoded-frame cache
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend.frame_cache import FrameCache
+
+INFO = {"name": "clip.mp4", "duration": 4.0, "decode_time": 0.5}
+
+
+def make_frames(value: int) -> np.ndarray:
+    """Four 8x8 frames filled with value (about 900 bytes as .npy)"""
+    return np.full((4, 8, 8, 3), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FrameCache(tmp_path / "frames", max_bytes=10_000_000)
+
+
+class TestFrameCache:
+    """Tests for hits, misses and eviction"""
+
+    def test_miss_then_hit(self, cache):
+        """Test a stored entry comes back memory-mapped with its sidecar"""
+        assert cache.get("a") is None
+
+        cache.put("a", make_frames(7), INFO)
+        frames, info = cache.get("a")
+        assert isinstance(frames, np.memmap)
+        assert np.array_equal(frames, make_frames(7))
+        assert info == INFO
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_index_rebuilt_from_disk(self, cache, tmp_path):
+        """Test a new cache over the same directory finds earlier entries"""
+        cache.put("a", make_frames(1), INFO)
+        reopened = FrameCache(tmp_path / "frames", max_bytes=10_000_000)
+        assert reopened.stats()["entries"] == 1
+        assert reopened.get("a") is not None
+
+    def test_lru_eviction_by_bytes(self, cache):
+        """Test the least recently used entry goes once the byte budget is exceeded"""
+        cache.put("a", make_frames(1), INFO)
+        entry_bytes = cache.stats()["size_bytes"]
+        cache.max_bytes = entry_bytes * 2
+
+        cache.put("b", make_frames(2), INFO)
+        assert cache.get("a") is not None  # a is now more recent than b
+        cache.put("c", make_frames(3), INFO)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["entries"] == 2
+        assert stats["size_bytes"] <= cache.max_bytes
+        assert not (cache.cache_dir / "b.npy").exists()
+        assert not (cache.cache_dir / "b.json").exists()
+
+    def test_budget_shared_across_processes(self, cache, tmp_path):
+        """Test caches in different processes over one directory keep it under one budget"""
+        other = FrameCache(tmp_path / "frames", max_bytes=10_000_000)
+        cache.put("a", make_frames(1), INFO)
+        entry_bytes = cache.stats()["size_bytes"]
+        cache.max_bytes = other.max_bytes = entry_bytes * 2
+
+        other.put("b", make_frames(2), INFO)
+        cache.put("c", make_frames(3), INFO)  # Sees b on disk and evicts a
+
+        assert sorted(p.stem for p in cache.cache_dir.glob("*.npy")) == ["b", "c"]
+        assert cache.stats()["size_bytes"] == entry_bytes * 2
+
+    def test_overwrite_leaves_no_temp_files(self, cache):
+        """Test storing a key again replaces both files by rename"""
+        cache.put("a", make_frames(1), INFO)
+        cache.put("a", make_frames(2), {**INFO, "decode_time": 0.25})
+        frames, info = cache.get("a")
+        assert np.array_equal(frames, make_frames(2))
+        assert info["decode_time"] == 0.25
+        assert sorted(p.name for p in cache.cache_dir.iterdir()) == ["a.json", "a.npy"]
+
+    def test_half_written_entry_is_a_miss(self, cache):
+        """Test an array without a readable sidecar is dropped rather than served"""
+        cache.put("a", make_frames(1), INFO)
+        os.remove(cache.cache_dir / "a.json")
+        assert cache.get("a") is None
+        assert not (cache.cache_dir / "a.npy").exists()
+
+
+class TestFrameCacheKey:
+    """Tests for FrameCache.make_key"""
+
+    def test_key_follows_file_and_settings(self, tmp_path):
+        """Test the key changes with the file contents and the sampling settings"""
+        video = tmp_path / "clip.mp4"
+        video.write_bytes(b"x")
+        key = FrameCache.make_key(video, 8, 336, "uniform")
+        assert FrameCache.make_key(video, 8, 336, "uniform") == key
+        assert FrameCache.make_key(video, 16, 336, "uniform") != key
+        assert FrameCache.make_key(video, 8, 336, "adaptive") != key
+
+        video.write_bytes(b"xy")
+        assert FrameCache.make_key(video, 8, 336, "uniform") != key
+
+    def test_adaptive_key_follows_adaptive_settings(self, tmp_path, monkeypatch):
+        """Test changing an ADAPTIVE_* setting changes adaptive keys only"""
+        video = tmp_path / "clip.mp4"
+        video.write_bytes(b"x")
+        adaptive = FrameCache.make_key(video, 8, 336, "adaptive")
+        uniform = FrameCache.make_key(video, 8, 336, "uniform")
+
+        monkeypatch.setattr(config, "ADAPTIVE_CHANGE_THRESHOLD", config.ADAPTIVE_CHANGE_THRESHOLD * 2)
+        assert FrameCache.make_key(video, 8, 336, "adaptive") != adaptive
+        assert FrameCache.make_key(video, 8, 336, "uniform") == uniform
@@ -0,0 +1,200 @@
+"""
+Tests for the working directory watcher and the library deltas it pushes
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import library_watcher
+from backend import media_index
+
+# Mock the imports that require GPU/model (as in test_api)
+with patch.dict('sys.modules', {
+    'torch': MagicMock(),
+    'backend.model_loader': MagicMock(),
+    'backend.video_processor': MagicMock(),
+}):
+    from backend.api import app  # noqa: F401
+    from backend import api  # After app: the module app was defined in
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """Directory with one video, an isolated media index and short watch timings"""
+    root = tmp_path / "library"
+    root.mkdir()
+    (root / "a.mp4").write_bytes(b"x")
+
+    monkeypatch.setattr(config, "_current_working_dir", root)
+    monkeypatch.setattr(config, "_include_videos", True)
+    monkeypatch.setattr(config, "_include_images", False)
+    monkeypatch.setattr(config, "MEDIA_INDEX_ENABLED", True)
+    monkeypatch.setattr(config, "MEDIA_INDEX_PATH", tmp_path / "index.db")
+    monkeypatch.setattr(config, "MEDIA_INDEX_MIN_REFRESH_INTERVAL", 0)
+    monkeypatch.setattr(config, "WATCH_DEBOUNCE", 0.3)
+    monkeypatch.setattr(config, "WATCH_MAX_DELAY", 5.0)
+    monkeypatch.setattr(config, "WATCH_POLL_INTERVAL", 0.1)
+    monkeypatch.setattr(media_index, "_conn", None)
+    monkeypatch.setattr(media_index, "_indexes", OrderedDict())
+    return root
+
+
+class Deltas:
+    """on_delta callback that records (added, removed, caption_changed) names"""
+
+    def __init__(self):
+        self.calls = []
+        self.received = threading.Event()
+
+    def __call__(self, added, removed, caption_changed):
+        self.calls.append(tuple([p.name for p in paths] for paths in (added, removed, caption_changed)))
+        self.received.set()
+
+    def next(self, timeout: float = 5.0):
+        assert self.received.wait(timeout), "no delta"
+        self.received.clear()
+        return self.calls[-1]
+
+
+def start(watcher: library_watcher.LibraryWatcher, root: Path) -> None:
+    """Watch root and wait until the baseline listing has been taken"""
+    watcher.watch(root, recursive=False)
+    deadline = time.monotonic() + 5
+    while watcher._media is None:
+        assert time.monotonic() < deadline, "no baseline"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def watcher():
+    deltas = Deltas()
+    watcher = library_watcher.LibraryWatcher(deltas)
+    watcher.deltas = deltas
+    yield watcher
+    watcher.stop()
+
+
+class TestLibraryWatcher:
+    """Tests for LibraryWatcher"""
+
+    @pytest.mark.skipif(not library_watcher._HAS_WATCHDOG, reason="watchdog not installed")
+    def test_burst_coalesced_into_one_delta(self, watcher, library):
+        """Test a burst of changes within WATCH_DEBOUNCE of each other is reported once"""
+        start(watcher, library)
+        assert watcher.mode == "events"
+
+        for i in range(5):
+            (library / f"new{i}.mp4").write_bytes(b"x")
+            time.sleep(0.05)
+
+        assert watcher.deltas.next() == ([f"new{i}.mp4" for i in range(5)], [], [])
+        time.sleep(2 * config.WATCH_DEBOUNCE)
+        assert len(watcher.deltas.calls) == 1
+
+    @pytest.mark.skipif(not library_watcher._HAS_WATCHDOG, reason="watchdog not installed")
+    def test_caption_and_removal_deltas(self, watcher, library):
+        start(watcher, library)
+
+        (library / "a.txt").write_text("a caption")
+        assert watcher.deltas.next() == ([], [], ["a.mp4"])
+
+        (library / "a.mp4").unlink()
+        assert watcher.deltas.next() == ([], ["a.mp4"], [])
+
+    def test_polls_when_watches_cannot_be_scheduled(self, watcher, library, monkeypatch):
+        """Test a failing observer start leaves the watcher polling instead of raising"""
+        stopped = []
+
+        class FailingObserver:
+            def schedule(self, *args, **kwargs):
+                pass
+
+            def start(self):
+                raise RuntimeError("inotify watch limit reached")
+
+            def stop(self):
+                stopped.append(True)
+
+        monkeypatch.setattr(library_watcher, "_HAS_WATCHDOG", True)
+        monkeypatch.setattr(library_watcher, "_EventForwarder", lambda watcher: None, raising=False)
+        monkeypatch.setattr(library_watcher, "Observer", FailingObserver, raising=False)
+
+        start(watcher, library)
+        assert watcher.mode == "polling"
+        assert stopped == [True]
+
+        (library / "b.mp4").write_bytes(b"x")
+        added, removed, _caption_changed = watcher.deltas.next()  # Polling reports the whole directory as changed
+        assert (added, removed) == (["b.mp4"], [])
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str):
+        self.messages.append(json.loads(text))
+
+
+class TestLibraryDeltaPush:
+    """Tests for the /ws/library side of the watcher"""
+
+    def test_delta_message(self, library, monkeypatch):
+        """Test deltas carry full records for added and changed media and names for removed ones"""
+        (library / "b.mp4").write_bytes(b"xy")
+        (library / "a.txt").write_text("a caption")
+        ws = FakeWebSocket()
+        monkeypatch.setattr(api, "_library_websockets", {ws})
+        monkeypatch.setattr(api, "get_metadata_store", lambda: None)
+
+        asyncio.run(api._push_library_delta(
+            [library / "b.mp4", library / "vanished.mp4"], [library / "old.mp4"], [library / "a.mp4"],
+        ))
+
+        [message] = ws.messages
+        assert message["type"] == "delta"
+        assert [info["name"] for info in message["added"]] == ["b.mp4"]
+        assert message["removed"] == ["old.mp4"]
+        assert [info["name"] for info in message["caption_changed"]] == ["a.mp4"]
+        assert message["caption_changed"][0]["has_caption"] is True
+
+    def test_startup_does_not_wait_for_watches(self, library, monkeypatch):
+        """Test the watcher is started in the background and later moves apply in order"""
+        release = threading.Event()
+        watched = []
+
+        class SlowWatcher:
+            def __init__(self, on_delta):
+                pass
+
+            def watch(self, root, recursive):
+                assert release.wait(5)
+                watched.append((root, recursive))
+
+        monkeypatch.setattr(config, "WATCH_ENABLED", True)
+        monkeypatch.setattr(config, "_traverse_subfolders", True)
+        monkeypatch.setattr(api, "LibraryWatcher", SlowWatcher)
+        monkeypatch.setattr(api, "_library_watcher", None)
+        monkeypatch.setattr(api, "_library_watch_task", None)
+
+        async def scenario():
+            api._start_library_watcher()
+            api._watch_library(library / "other", False)
+            await asyncio.sleep(0.05)
+            assert watched == []  # Startup returned while the first watch is still running
+            release.set()
+            await asyncio.wait_for(api._library_watch_task, timeout=5)
+
+        asyncio.run(scenario())
+        assert watched == [(library, True), (library / "other", False)]
@@ -0,0 +1,119 @@
+"""
+Tests for the compact media listing encoding
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.listing_codec import MEDIA_TYPES, dumps_json, dumps_msgpack, encode_columns
+
+ROOT = Path(os.sep, "library")
+
+
+def make_info(name: str, **fields) -> dict:
+    """VideoInfo dict for a file under ROOT, with every nullable field null"""
+    info = {
+        "name": name,
+        "path": os.path.join(str(ROOT), *name.split("/")),
+        "size_mb": 1.5,
+        "media_type": "video",
+        "duration_sec": None,
+        "width": None,
+        "height": None,
+        "frame_count": None,
+        "fps": None,
+        "has_caption": False,
+        "caption_preview": None,
+    }
+    info.update(fields)
+    return info
+
+
+def decode_columns(columns: dict) -> list:
+    """Python port of decodeVideoColumns (frontend/src/utils/listing.ts)"""
+    videos = []
+    paths = columns.get("paths", {})
+    for row in range(columns["count"]):
+        directory = columns["dirs"][columns["dir"][row]]
+        name = f"{directory}/{columns['file'][row]}" if directory else columns["file"][row]
+        videos.append({
+            "name": name,
+            "path": paths.get(str(row), columns["root"] + columns["sep"] + columns["sep"].join(name.split("/"))),
+            "size_mb": columns["size_mb"][row],
+            "media_type": MEDIA_TYPES[columns["media_type"][row]],
+            "duration_sec": None,
+            "width": None,
+            "height": None,
+            "frame_count": None,
+            "fps": None,
+            "has_caption": columns["has_caption"][row] == 1,
+            "caption_preview": None,
+        })
+    for key in ("duration_sec", "width", "height", "frame_count", "fps", "caption_preview"):
+        column = columns.get(key)
+        if column is None:
+            continue
+        if isinstance(column, list):
+            for row, value in enumerate(column):
+                videos[row][key] = value
+        else:
+            for row, value in zip(column["i"], column["v"]):
+                videos[row][key] = value
+    return videos
+
+
+@pytest.fixture
+def infos():
+    return [
+        make_info("a.mp4", duration_sec=12.5, width=1920, height=1080, frame_count=300, fps=24.0,
+                  has_caption=True, caption_preview="A dog runs"),
+        make_info("sub/b.mp4", duration_sec=3.0, width=640, height=360),
+        make_info("sub/deeper/c.jpg", media_type="image", width=800, height=600),
+        make_info("sub/d.mp4"),
+        # Reached through a symlinked folder: the path is not under the working directory
+        make_info("linked/e.mp4", path=os.path.join(os.sep, "elsewhere", "e.mp4")),
+    ]
+
+
+class TestEncodeColumns:
+    """Tests for the columnar listing form"""
+
+    def test_round_trip(self, infos):
+        """Test every row, null and out-of-root path survives encoding and JSON serialization"""
+        columns = json.loads(dumps_json(encode_columns(infos, ROOT)))
+        assert decode_columns(columns) == infos
+
+    def test_round_trip_msgpack(self, infos):
+        """Test the same through msgpack"""
+        msgpack = pytest.importorskip("msgpack")
+        columns = msgpack.unpackb(dumps_msgpack(encode_columns(infos, ROOT)), raw=False)
+        assert decode_columns(columns) == infos
+
+    def test_layout(self, infos):
+        """Test directories are stored once, nulls left out and only foreign paths listed"""
+        columns = encode_columns(infos, ROOT)
+        assert columns["dirs"] == ["", "sub", "sub/deeper", "linked"]
+        assert columns["dir"] == [0, 1, 2, 1, 3]
+        assert columns["paths"] == {"4": infos[4]["path"]}
+        assert columns["width"] == {"i": [0, 1, 2], "v": [1920, 640, 800]}
+        assert columns["caption_preview"] == {"i": [0], "v": ["A dog runs"]}
+        assert columns["size_mb"] == [1.5] * 5
+
+    def test_all_null_column_dropped(self):
+        """Test a column that is null in every row is left out entirely"""
+        columns = encode_columns([make_info("a.mp4"), make_info("b.mp4")], ROOT)
+        assert "fps" not in columns
+        assert "paths" not in columns
+        assert decode_columns(columns)[1]["fps"] is None
+
+    def test_empty(self):
+        """Test an empty batch encodes to empty columns"""
+        columns = encode_columns([], ROOT)
+        assert columns["count"] == 0
+        assert decode_columns(columns) == []
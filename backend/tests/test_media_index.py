@@ -0,0 +1,133 @@
+"""
+Tests for the incremental media index
+"""
+
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend.media_index import MediaIndex
+
+
+def names(paths):
+    return [p.name for p in paths]
+
+
+def touch_dir(path: Path, mtime: int) -> None:
+    """Give a directory an explicit mtime (filesystem timestamps can be coarse)"""
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """root/{a.mp4, b.jpg, notes.txt, sub/c.mp4}"""
+    monkeypatch.setattr(config, "MEDIA_INDEX_MIN_REFRESH_INTERVAL", 0)
+    root = tmp_path / "root"
+    (root / "sub").mkdir(parents=True)
+    for name in ("a.mp4", "b.jpg", "notes.txt", "sub/c.mp4"):
+        (root / name).write_bytes(b"x")
+    touch_dir(root / "sub", 1_000_000)
+    touch_dir(root, 1_000_000)
+    return root
+
+
+class TestMediaIndex:
+    """Tests for refreshing from directory mtimes"""
+
+    def test_initial_scan(self, tree):
+        """Test the first refresh lists media only, recursively when asked"""
+        index = MediaIndex(tree, None)
+        assert index.refresh(recursive=True) is True
+        videos, images = index.media(recursive=True)
+        assert names(videos) == ["a.mp4", "c.mp4"]
+        assert names(images) == ["b.jpg"]
+        assert names(index.media(recursive=False)[0]) == ["a.mp4"]
+
+    def test_unchanged_directories_are_not_relisted(self, tree):
+        """Test a refresh with no mtime changes only stats and keeps the generation"""
+        index = MediaIndex(tree, None)
+        index.refresh(recursive=True)
+        scanned, generation = index.dirs_scanned, index.generation
+
+        assert index.refresh(recursive=True) is False
+        assert index.dirs_scanned == scanned
+        assert index.generation == generation
+
+    def test_refresh_after_directory_mtime_change(self, tree):
+        """Test only the directory whose mtime moved is re-listed"""
+        index = MediaIndex(tree, None)
+        index.refresh(recursive=True)
+        scanned, generation = index.dirs_scanned, index.generation
+
+        (tree / "sub" / "d.mp4").write_bytes(b"x")
+        touch_dir(tree / "sub", 1_000_100)
+        assert index.refresh(recursive=True) is True
+        assert index.dirs_scanned == scanned + 1
+        assert index.changed_dirs == [str(tree / "sub")]
+        assert index.generation != generation
+        assert names(index.media(recursive=True)[0]) == ["a.mp4", "c.mp4", "d.mp4"]
+
+    def test_removed_subdirectory_is_dropped(self, tree):
+        """Test files under a deleted subdirectory leave the index"""
+        index = MediaIndex(tree, None)
+        index.refresh(recursive=True)
+
+        (tree / "sub" / "c.mp4").unlink()
+        (tree / "sub").rmdir()
+        touch_dir(tree, 1_000_100)
+        assert index.refresh(recursive=True) is True
+        assert names(index.media(recursive=True)[0]) == ["a.mp4"]
+
+    def test_invalidate_forces_rescan(self, tree, monkeypatch):
+        """Test invalidate re-lists a directory whose mtime did not move, inside the refresh interval"""
+        monkeypatch.setattr(config, "MEDIA_INDEX_MIN_REFRESH_INTERVAL", 3600)
+        index = MediaIndex(tree, None)
+        index.refresh(recursive=False)
+
+        # A change the mtime does not show, e.g. a file moved in with its parent's mtime restored
+        (tree / "e.mp4").write_bytes(b"x")
+        touch_dir(tree, 1_000_000)
+        assert index.refresh(recursive=False, force=True) is False
+        assert names(index.media(recursive=False)[0]) == ["a.mp4"]
+
+        index.invalidate(tree)
+        assert index.refresh(recursive=False) is True
+        assert names(index.media(recursive=False)[0]) == ["a.mp4", "e.mp4"]
+
+    def test_refresh_interval(self, tree, monkeypatch):
+        """Test refreshes within MEDIA_INDEX_MIN_REFRESH_INTERVAL are skipped unless forced"""
+        monkeypatch.setattr(config, "MEDIA_INDEX_MIN_REFRESH_INTERVAL", 3600)
+        index = MediaIndex(tree, None)
+        index.refresh(recursive=False)
+
+        (tree / "e.mp4").write_bytes(b"x")
+        touch_dir(tree, 1_000_100)
+        assert index.refresh(recursive=False) is False
+        assert index.refresh(recursive=False, force=True) is True
+
+    def test_records_persist(self, tree, tmp_path):
+        """Test an index reopened from SQLite needs no directory listings"""
+        conn = sqlite3.connect(str(tmp_path / "index.db"))
+        conn.execute(
+            "CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL,"
+            " files TEXT NOT NULL, subdirs TEXT NOT NULL)"
+        )
+        MediaIndex(tree, conn).refresh(recursive=True)
+
+        reopened = MediaIndex(tree, conn)
+        assert reopened.refresh(recursive=True) is False
+        assert reopened.dirs_scanned == 0
+        assert names(reopened.media(recursive=True)[0]) == ["a.mp4", "c.mp4"]
+
+    def test_walk_matches_media(self, tree):
+        """Test walk yields the same files per directory as media() lists"""
+        index = MediaIndex(tree, None)
+        walked = [(names(videos), names(images)) for videos, images in index.walk(recursive=True)]
+        assert walked == [(["a.mp4"], ["b.jpg"]), (["c.mp4"], [])]
+        assert index.refresh(recursive=True) is False
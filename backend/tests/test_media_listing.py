@@ -0,0 +1,251 @@
+"""
+Tests for the server-side media listing
+"""
+
+import base64
+import json
+import os
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import media_index
+from backend import media_listing
+from backend.media_listing import (
+    CursorError, MediaListing, StreamSnapshots, decode_cursor, encode_cursor,
+    parse_event_id,
+)
+from backend.schemas import MediaSortField, MediaType, SortOrder
+
+# Mock the imports that require GPU/model (as in test_api)
+with patch.dict('sys.modules', {
+    'torch': MagicMock(),
+    'backend.model_loader': MagicMock(),
+    'backend.video_processor': MagicMock(),
+}):
+    from backend.api import app
+    from backend import api  # After app: the module app was defined in
+
+
+# name -> size in bytes; three files tie on size
+LIBRARY = {"a.mp4": 30, "b.mp4": 10, "c.mp4": 10, "d.mp4": 20, "e.mp4": 10}
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """Working directory with LIBRARY's files and an isolated media index"""
+    for index, (name, size) in enumerate(LIBRARY.items()):
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        os.utime(path, (1_000_000 + index, 1_000_000 + index))
+    (tmp_path / "b.txt").write_text("caption")
+
+    monkeypatch.setattr(config, "_current_working_dir", tmp_path)
+    monkeypatch.setattr(config, "_traverse_subfolders", False)
+    monkeypatch.setattr(config, "_include_videos", True)
+    monkeypatch.setattr(config, "_include_images", False)
+    monkeypatch.setattr(config, "MEDIA_INDEX_ENABLED", True)
+    monkeypatch.setattr(config, "MEDIA_INDEX_PATH", tmp_path / "index.db")
+    monkeypatch.setattr(config, "MEDIA_INDEX_MIN_REFRESH_INTERVAL", 0)
+    monkeypatch.setattr(media_index, "_conn", None)
+    monkeypatch.setattr(media_index, "_indexes", OrderedDict())
+    return tmp_path
+
+
+def all_pages(listing, sort, order, limit=2):
+    """Names of every row, following next_cursor page by page"""
+    names, cursor = [], None
+    while True:
+        rows, total, cursor = listing.query(sort=sort, order=order, cursor=cursor, limit=limit)
+        assert total == len(LIBRARY)
+        names.extend(row.name for row in rows)
+        if cursor is None:
+            return names
+
+
+class TestCursorPaging:
+    """Tests for keyset pagination"""
+
+    def test_name_ascending_and_descending(self, library):
+        """Test pages cover every file once, in both directions"""
+        listing = MediaListing()
+        expected = sorted(LIBRARY)
+        assert all_pages(listing, MediaSortField.NAME, SortOrder.ASC) == expected
+        assert all_pages(listing, MediaSortField.NAME, SortOrder.DESC) == expected[::-1]
+
+    def test_size_ties_break_by_name(self, library):
+        """Test files with equal sizes are neither skipped nor repeated across pages"""
+        listing = MediaListing()
+        expected = ["b.mp4", "c.mp4", "e.mp4", "d.mp4", "a.mp4"]
+        assert all_pages(listing, MediaSortField.SIZE, SortOrder.ASC) == expected
+        assert all_pages(listing, MediaSortField.SIZE, SortOrder.DESC) == expected[::-1]
+
+    def test_caption_and_mtime_sorts(self, library):
+        """Test the remaining sort fields page through every file"""
+        listing = MediaListing()
+        assert all_pages(listing, MediaSortField.CAPTION, SortOrder.DESC)[0] == "b.mp4"
+        assert all_pages(listing, MediaSortField.MTIME, SortOrder.ASC) == list(LIBRARY)
+
+    def test_cursor_survives_insertions(self, library):
+        """Test a cursor keeps pointing past the same file after new files appear"""
+        listing = MediaListing()
+        rows, _total, cursor = listing.query(cursor=None, limit=2)
+        assert [row.name for row in rows] == ["a.mp4", "b.mp4"]
+
+        (library / "aa.mp4").write_bytes(b"x")
+        rows, total, _cursor = listing.query(cursor=cursor, limit=2)
+        assert total == len(LIBRARY) + 1
+        assert [row.name for row in rows] == ["c.mp4", "d.mp4"]
+
+    def test_cursor_round_trip(self):
+        """Test cursors decode to the key they were made from"""
+        key = (10, "b.mp4")
+        cursor = encode_cursor(MediaSortField.SIZE, SortOrder.ASC, key)
+        assert decode_cursor(cursor, MediaSortField.SIZE, SortOrder.ASC) == key
+
+    @pytest.mark.parametrize("cursor", [
+        "not base64 json!",
+        encode_cursor(MediaSortField.SIZE, SortOrder.DESC, (10, "b.mp4")),  # Different order
+        encode_cursor(MediaSortField.NAME, SortOrder.ASC, ("b.mp4",)),  # Different sort
+        encode_cursor(MediaSortField.SIZE, SortOrder.ASC, ("x", 1)),  # Field types swapped
+        encode_cursor(MediaSortField.SIZE, SortOrder.ASC, (10,)),  # Too short
+        encode_cursor(MediaSortField.SIZE, SortOrder.ASC, (True, "b.mp4")),
+        base64.urlsafe_b64encode(json.dumps(["size", "asc", "b.mp4"]).encode()).decode(),
+    ])
+    def test_invalid_cursor_rejected(self, library, cursor):
+        """Test cursors that do not fit the sort raise CursorError instead of failing in bisect"""
+        with pytest.raises(CursorError):
+            MediaListing().query(sort=MediaSortField.SIZE, order=SortOrder.ASC, cursor=cursor)
+
+    def test_invalid_cursor_is_400(self, library):
+        """Test the page endpoint answers a crafted cursor with 400"""
+        cursor = encode_cursor(MediaSortField.SIZE, SortOrder.ASC, ("x", 1))
+        response = TestClient(app).get("/api/videos/page", params={"sort": "size", "cursor": cursor})
+        assert response.status_code == 400
+
+
+def stream_events(response) -> list:
+    """(event id, data) for each SSE message of a streamed response"""
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("id"), json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def stream_library(library, monkeypatch):
+    """library with a fresh snapshot cache and no thumbnail pass after each stream"""
+    async def no_thumbnails(_items):
+        pass
+
+    monkeypatch.setattr(media_listing, "_stream_snapshots", StreamSnapshots())
+    monkeypatch.setattr(api, "_pregenerate_thumbnails", no_thumbnails)
+    return library
+
+
+class TestStreamSnapshots:
+    """Tests for resumable /api/videos/stream snapshots"""
+
+    ITEMS = [(Path(f"{i}.mp4"), MediaType.VIDEO) for i in range(3)]
+
+    def test_get_refreshes_ttl(self, monkeypatch):
+        """Test snapshots expire after STREAM_SNAPSHOT_TTL unused, and get() counts as use"""
+        monkeypatch.setattr(config, "STREAM_SNAPSHOT_TTL", 60)
+        clock = [1000.0]
+        monkeypatch.setattr(media_listing.time, "monotonic", lambda: clock[0])
+        snapshots = StreamSnapshots()
+        used = snapshots.create(self.ITEMS, complete=True)
+        idle = snapshots.create(self.ITEMS, complete=True)
+
+        clock[0] += 40
+        assert snapshots.get(used.id) is used
+        clock[0] += 40
+        assert snapshots.get(idle.id) is None
+        assert snapshots.get(used.id) is used
+
+    def test_oldest_dropped_over_max(self, monkeypatch):
+        """Test at most STREAM_SNAPSHOT_MAX snapshots are kept, least recently used first out"""
+        monkeypatch.setattr(config, "STREAM_SNAPSHOT_MAX", 2)
+        snapshots = StreamSnapshots()
+        first = snapshots.create(self.ITEMS, complete=True)
+        second = snapshots.create(self.ITEMS, complete=True)
+        snapshots.get(first.id)
+        snapshots.create(self.ITEMS, complete=True)
+        assert snapshots.get(first.id) is first
+        assert snapshots.get(second.id) is None
+
+    @pytest.mark.parametrize("event_id, expected", [
+        ("abc:100", ("abc", 100)),
+        (None, None),
+        ("", None),
+        ("abc", None),
+        ("abc:-1", None),
+        (":5", None),
+    ])
+    def test_parse_event_id(self, event_id, expected):
+        """Test only ids in our snapshot:offset format are accepted"""
+        assert parse_event_id(event_id) == expected
+
+    def test_stream_resumes_after_last_event(self, stream_library):
+        """Test reconnecting with Last-Event-ID sends only the items after that batch"""
+        for i in range(150):
+            (stream_library / f"m{i:03}.mp4").write_bytes(b"x")
+        client = TestClient(app)
+
+        events = stream_events(client.get("/api/videos/stream"))
+        total = len(LIBRARY) + 150
+        assert events[0][1] == {"type": "total", "count": total}
+        batches = [(event_id, data) for event_id, data in events if data["type"] == "batch"]
+        first_id, first = batches[0]
+        assert len(first["videos"]) == 100
+        assert first_id.endswith(":100")
+
+        resumed = stream_events(client.get("/api/videos/stream", headers={"Last-Event-ID": first_id}))
+        names = [video["name"] for _id, data in resumed if data["type"] == "batch" for video in data["videos"]]
+        sent = [video["name"] for _id, data in batches for video in data["videos"]]
+        assert names == sent[100:]
+        assert resumed[-1][1]["type"] == "done"
+
+    def test_progressive_stream_corrects_estimate(self, stream_library, monkeypatch):
+        """Test progressive=true estimates the total from the index, raises it while walking and finalizes it"""
+        monkeypatch.setattr(config, "_traverse_subfolders", True)
+        (stream_library / "sub").mkdir()
+        for name in ("x.mp4", "y.mp4"):
+            (stream_library / "sub" / name).write_bytes(b"x")
+        client = TestClient(app)
+        total = len(LIBRARY) + 2
+
+        def run():
+            events = [data for _id, data in stream_events(client.get("/api/videos/stream?progressive=true"))]
+            names = [video["name"] for data in events if data["type"] == "batch" for video in data["videos"]]
+            totals = [(data["count"], data["estimated"]) for data in events if data["type"] == "total"]
+            return events, names, totals
+
+        # Cold index: estimate starts at 0 and grows with the batches
+        events, names, totals = run()
+        assert sorted(names) == sorted(list(LIBRARY) + ["sub/x.mp4", "sub/y.mp4"])
+        assert totals[0] == (0, True)
+        assert all(count <= total and estimated for count, estimated in totals[1:-1])
+        assert totals[-1] == (total, False)
+        assert events[-1]["type"] == "done" and events[-1]["encoding"] == "json"
+        assert events[-2] == {"type": "total", "count": total, "estimated": False}
+
+        # Warm index: the estimate is what the last walk found, corrected after a removal
+        (stream_library / "sub" / "y.mp4").unlink()
+        _events, names, totals = run()
+        assert len(names) == total - 1
+        assert totals == [(total, True), (total - 1, False)]
+
+    def test_stream_restarts_for_unknown_snapshot(self, stream_library):
+        """Test an expired or foreign Last-Event-ID starts the stream over"""
+        response = TestClient(app).get("/api/videos/stream", headers={"Last-Event-ID": "gone:3"})
+        batches = [data for _id, data in stream_events(response) if data["type"] == "batch"]
+        assert [video["name"] for video in batches[0]["videos"]] == sorted(LIBRARY)
@@ -0,0 +1,136 @@
+"""
+Tests for the persistent media metadata store
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import media_index
+from backend import metadata_store
+
+# Mock the imports that require GPU/model (as in test_api)
+with patch.dict('sys.modules', {
+    'torch': MagicMock(),
+    'backend.model_loader': MagicMock(),
+    'backend.video_processor': MagicMock(),
+}):
+    from backend.api import app
+    from backend import api  # After app: the module app was defined in
+
+
+def write_image(path: Path, size=(40, 30)) -> Path:
+    Image.new("RGB", size, (10, 20, 30)).save(path)
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = metadata_store.MetadataStore(tmp_path / "metadata.db", max_workers=2)
+    yield store
+    store.close()
+
+
+class TestMetadataStore:
+    """Tests for storing and validating probed metadata"""
+
+    def test_probe_then_get(self, store, tmp_path):
+        image = write_image(tmp_path / "a.png")
+        assert store.get(image) is None
+
+        record = store.probe(image)
+        assert record["width"] == 40 and record["height"] == 30 and record["frame_count"] == 1
+        assert store.get(image) == record
+        assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+    def test_changed_mtime_invalidates(self, store, tmp_path):
+        image = write_image(tmp_path / "a.png")
+        store.probe(image)
+        stat = image.stat()
+        os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert store.get(image) is None
+
+    def test_changed_size_invalidates(self, store, tmp_path):
+        image = write_image(tmp_path / "a.png")
+        store.probe(image)
+        stat = image.stat()
+        write_image(image, size=(80, 60))
+        os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns))  # Same mtime, new size
+        assert store.get(image) is None
+
+    def test_probe_failure_stored(self, store, tmp_path):
+        """Test a file that cannot be probed is remembered with its error, not retried"""
+        broken = tmp_path / "broken.png"
+        broken.write_bytes(b"not an image")
+        record = store.probe(broken)
+        assert record["error"] and record["width"] is None
+        assert store.get(broken)["error"] == record["error"]
+
+    def test_probe_many_skips_vanished(self, store, tmp_path):
+        images = [write_image(tmp_path / f"{i}.png", size=(10 + i, 10)) for i in range(3)]
+        records = store.probe_many(images + [tmp_path / "gone.png"])
+        assert sorted(records) == sorted(str(image) for image in images)
+        assert [records[str(image)]["width"] for image in images] == [10, 11, 12]
+        assert all(store.get(image) is not None for image in images)
+
+    def test_enqueue_probes_in_background(self, store, tmp_path):
+        """Test enqueue stores the record and notifies listeners from the probe thread"""
+        image = write_image(tmp_path / "a.png")
+        done = threading.Event()
+        seen = []
+
+        def listener(path, record):
+            seen.append((path, record["width"]))
+            done.set()
+
+        store.add_listener(listener)
+        store.enqueue(image)
+        assert done.wait(5)
+        assert seen == [(image, 40)]
+        assert store.get(image)["height"] == 30
+        assert store.stats()["pending"] == 0
+
+
+@pytest.fixture
+def video_library(tmp_path, monkeypatch):
+    """Working directory of two videos with a metadata store that fakes probing"""
+    for name in ("a.mp4", "b.mp4"):
+        (tmp_path / name).write_bytes(b"x")
+
+    monkeypatch.setattr(config, "_current_working_dir", tmp_path)
+    monkeypatch.setattr(config, "_traverse_subfolders", False)
+    monkeypatch.setattr(config, "MEDIA_INDEX_ENABLED", False)
+    monkeypatch.setattr(media_index, "_conn", None)
+    monkeypatch.setattr(media_index, "_indexes", OrderedDict())
+    monkeypatch.setattr(metadata_store, "probe_media", lambda path: {
+        "width": 640, "height": 360, "fps": 25.0, "frame_count": 50, "duration": 2.0,
+    })
+    store = metadata_store.MetadataStore(tmp_path / "metadata.db", max_workers=2)
+    monkeypatch.setattr(api, "get_metadata_store", lambda: store)
+    yield store
+    store.close()
+
+
+class TestListVideosMetadata:
+    """Tests for metadata in /api/videos"""
+
+    def test_full_listing_probes_unknown_files(self, video_library):
+        """Test fast=false returns probed fields for files the store has not seen"""
+        response = TestClient(app).get("/api/videos", params={"fast": "false"})
+        assert response.status_code == 200
+        videos = response.json()["videos"]
+        assert [v["name"] for v in videos] == ["a.mp4", "b.mp4"]
+        for video in videos:
+            assert (video["width"], video["height"], video["fps"]) == (640, 360, 25.0)
+            assert (video["frame_count"], video["duration_sec"]) == (50, 2.0)
+        assert video_library.stats()["probes"] == 2
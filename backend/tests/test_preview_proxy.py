@@ -0,0 +1,208 @@
+"""
+Tests for the preview proxy cache and the video stream endpoint
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import preview_proxy
+
+# Mock the imports that require GPU/model (as in test_api)
+with patch.dict('sys.modules', {
+    'torch': MagicMock(),
+    'backend.model_loader': MagicMock(),
+    'backend.video_processor': MagicMock(),
+}):
+    from backend.api import app
+    from backend import api  # After app: the module app was defined in
+
+
+class FakeTranscoder:
+    """Stands in for _transcode_pyav: writes size bytes once release is set, or raises"""
+
+    def __init__(self, size: int = 100, fail: bool = False):
+        self.size = size
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+        self.calls = 0
+
+    def __call__(self, source: Path, target: Path, codec):
+        self.calls += 1
+        assert self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("unsupported codec")
+        target.write_bytes(b"p" * self.size)
+
+
+@pytest.fixture
+def transcoder(monkeypatch):
+    transcoder = FakeTranscoder()
+    monkeypatch.setattr(preview_proxy, "_HAS_AV", True)
+    monkeypatch.setattr(preview_proxy, "_transcode_pyav", transcoder)
+    monkeypatch.setattr(config, "PREVIEW_PROXY_BACKEND_ORDER", ["pyav"])
+    monkeypatch.setattr(config, "PREVIEW_PROXY_CODEC", "h264")
+    return transcoder
+
+
+@pytest.fixture
+def proxies(tmp_path, transcoder):
+    proxies = preview_proxy.PreviewProxies(tmp_path / "proxies", max_bytes=10_000, workers=1)
+    yield proxies
+    proxies.shutdown()
+
+
+def make_video(directory: Path, name: str, size: int = 10) -> Path:
+    path = directory / name
+    path.write_bytes(b"v" * size)
+    return path
+
+
+def wait_for_status(proxies, video: Path, status: str):
+    deadline = time.monotonic() + 5
+    while proxies.status(video, video.stat()) != status:
+        assert time.monotonic() < deadline, f"never {status}"
+        time.sleep(0.01)
+
+
+class TestWantsProxy:
+    """Tests for which files auto mode proxies"""
+
+    @pytest.mark.parametrize("name, size, expected", [
+        ("clip.mp4", 999, False),
+        ("clip.mp4", 1000, True),  # Large
+        ("clip.webm", 10, False),
+        ("clip.M4V", 10, False),
+        ("clip.mkv", 10, True),  # Container browsers may not play
+        ("clip.MOV", 10, True),
+        ("clip.avi", 10, True),
+    ])
+    def test_wants_proxy(self, tmp_path, monkeypatch, name, size, expected):
+        monkeypatch.setattr(config, "PREVIEW_PROXY_MIN_BYTES", 1000)
+        video = make_video(tmp_path, name, size)
+        assert preview_proxy.PreviewProxies.wants_proxy(video, video.stat()) is expected
+
+
+class TestPreviewProxies:
+    """Tests for building, serving and evicting proxies"""
+
+    def test_missing_building_ready(self, proxies, transcoder, tmp_path):
+        """Test a proxy is built once in the background and served when complete"""
+        video = make_video(tmp_path, "clip.mkv")
+        transcoder.release.clear()
+        assert proxies.status(video, video.stat()) == "missing"
+
+        assert proxies.get(video, video.stat()) is None
+        assert proxies.status(video, video.stat()) == "building"
+        assert proxies.get(video, video.stat()) is None  # Not queued twice
+
+        transcoder.release.set()
+        wait_for_status(proxies, video, "ready")
+        proxy_path = proxies.get(video, video.stat())
+        assert proxy_path.suffix == ".mp4" and proxy_path.read_bytes() == b"p" * 100
+        assert transcoder.calls == 1
+        assert proxies.stats()["builds"] == 1 and proxies.stats()["hits"] == 1
+
+    def test_failed_build_not_retried_until_file_changes(self, proxies, transcoder, tmp_path):
+        video = make_video(tmp_path, "clip.mkv")
+        transcoder.fail = True
+        proxies.get(video, video.stat())
+        wait_for_status(proxies, video, "failed")
+
+        assert proxies.get(video, video.stat()) is None
+        assert transcoder.calls == 1
+        assert not list((tmp_path / "proxies").iterdir())  # No temp file left behind
+
+        make_video(tmp_path, "clip.mkv", size=20)
+        assert proxies.status(video, video.stat()) == "missing"
+
+    def test_lru_eviction_over_budget(self, proxies, tmp_path):
+        """Test the least recently served proxy is deleted once the budget is exceeded"""
+        proxies.max_bytes = 250  # Room for two 100 byte proxies
+        videos = [make_video(tmp_path, f"{name}.mkv") for name in ("a", "b", "c")]
+
+        def build(video):
+            proxies.get(video, video.stat())
+            wait_for_status(proxies, video, "ready")
+            return proxies.get(video, video.stat())
+
+        a, b = build(videos[0]), build(videos[1])
+        os.utime(a, (1_000, 1_000))
+        os.utime(b, (2_000, 2_000))
+        proxies.get(videos[0], videos[0].stat())  # a served again: b is now least recent
+        c = build(videos[2])
+
+        assert a.exists() and c.exists() and not b.exists()
+        assert proxies.stats()["evictions"] == 1
+        assert proxies.status(videos[1], videos[1].stat()) == "missing"
+
+
+@pytest.fixture
+def stream_client(tmp_path, monkeypatch, proxies):
+    """Working directory with a small MKV and a browser-friendly MP4"""
+    library = tmp_path / "library"
+    library.mkdir()
+    make_video(library, "clip.mkv")
+    make_video(library, "small.mp4")
+    monkeypatch.setattr(config, "_current_working_dir", library)
+    monkeypatch.setattr(config, "PREVIEW_PROXY_ENABLED", True)
+    monkeypatch.setattr(config, "PREVIEW_PROXY_MIN_BYTES", 1000)
+    monkeypatch.setattr(api, "get_preview_proxies", lambda: proxies)
+    return TestClient(app)
+
+
+class TestStreamVideo:
+    """Tests for GET /api/videos/{name}/stream"""
+
+    def test_original_served_until_proxy_ready(self, stream_client, transcoder, proxies, tmp_path):
+        transcoder.release.clear()
+        response = stream_client.get("/api/videos/clip.mkv/stream")
+        assert response.status_code == 200
+        assert response.content == b"v" * 10
+        assert response.headers["content-type"] == "video/x-matroska"
+        assert response.headers["x-preview-proxy"] == "building"
+
+        transcoder.release.set()
+        wait_for_status(proxies, tmp_path / "library" / "clip.mkv", "ready")
+        response = stream_client.get("/api/videos/clip.mkv/stream")
+        assert response.content == b"p" * 100
+        assert response.headers["content-type"] == "video/mp4"
+        assert response.headers["x-preview-proxy"] == "ready"
+
+    def test_original_served_when_proxy_fails(self, stream_client, transcoder, proxies, tmp_path):
+        transcoder.fail = True
+        stream_client.get("/api/videos/clip.mkv/stream")
+        wait_for_status(proxies, tmp_path / "library" / "clip.mkv", "failed")
+
+        response = stream_client.get("/api/videos/clip.mkv/stream")
+        assert response.content == b"v" * 10
+        assert response.headers["x-preview-proxy"] == "failed"
+
+    def test_small_browser_file_never_proxied(self, stream_client, transcoder):
+        response = stream_client.get("/api/videos/small.mp4/stream")
+        assert response.content == b"v" * 10
+        assert "x-preview-proxy" not in response.headers
+        assert transcoder.calls == 0
+
+    def test_preview_modes(self, stream_client, transcoder, proxies, tmp_path):
+        """Test preview=original skips the proxy and preview=proxy forces one"""
+        response = stream_client.get("/api/videos/clip.mkv/stream", params={"preview": "original"})
+        assert response.content == b"v" * 10 and "x-preview-proxy" not in response.headers
+        assert transcoder.calls == 0
+
+        stream_client.get("/api/videos/small.mp4/stream", params={"preview": "proxy"})
+        wait_for_status(proxies, tmp_path / "library" / "small.mp4", "ready")
+        assert transcoder.calls == 1
+
+    def test_missing_video(self, stream_client):
+        assert stream_client.get("/api/videos/nope.mkv/stream").status_code == 404
@@ -0,0 +1,217 @@
+"""
+Tests for the staged captioning pipeline
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.schemas import Settings
+
+# processing imports torch at module level
+with patch.dict('sys.modules', {'torch': MagicMock()}):
+    from backend import processing
+    from backend.processing import ProcessingManager
+
+MODEL_INFO = {"device": "cuda:0"}
+
+
+class Pipeline:
+    """
+    ProcessingManager with decode and generate stubbed out. Records
+    (stage, video index) events; videos whose index is in fail_decode raise
+    on decode, and generate waits for gate while gate_generate is set.
+    prepared maps each video index to the frame count it was captioned from.
+    """
+
+    def __init__(self, tmp_path: Path, count: int, **settings):
+        self.videos = []
+        for i in range(count):
+            path = tmp_path / f"v{i:02}.mp4"
+            path.write_bytes(b"x")
+            self.videos.append(path)
+        self.settings = Settings(**{"decode_workers": 0, **settings})
+        self.events = []
+        self.released = 0
+        self.prepared = {}
+        self.fail_decode = set()
+        self.frames = lambda i: np.full((4, 8, 8, 3), i, dtype=np.uint8)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.manager = ProcessingManager()
+        self.manager._decode_media = self._decode_media
+        self.manager._store_thumbnail = lambda item: None
+
+    def index(self, path: Path) -> int:
+        return self.videos.index(path)
+
+    async def _decode_media(self, media_path, settings):
+        i = self.index(media_path)
+        self.events.append(("decode", i))
+        await asyncio.sleep(0)
+        if i in self.fail_decode:
+            raise ValueError("corrupt file")
+
+        def release():
+            self.released += 1
+
+        return self.frames(i), {"duration": 1.0}, release
+
+    def prepare_inputs(self, model_info, frames, prompt):
+        self.events.append(("preprocess", int(frames[0, 0, 0, 0])))
+        self.prepared[int(frames[0, 0, 0, 0])] = len(frames)
+        return {"frames": len(frames), "value": int(frames[0, 0, 0, 0])}, 0.0
+
+    def generate_from_inputs(self, model_info, inputs, **kwargs):
+        self.events.append(("generate", inputs["value"]))
+        assert self.gate.wait(5)
+        return f"caption {inputs['value']}", {
+            "output_tokens": 3, "tokens_per_sec": 10.0, "num_frames": inputs["frames"],
+        }
+
+    def stages_of(self, i: int):
+        return [stage for stage, index in self.events if index == i]
+
+    async def run(self):
+        return await self.manager._run_pipeline(
+            self.videos, self.settings, ["cuda:0"], [MODEL_INFO], multi_gpu=False
+        )
+
+
+@pytest.fixture
+def pipeline_factory(tmp_path, monkeypatch):
+    """Builds Pipelines with model_loader and torch replaced by stubs"""
+    monkeypatch.setattr(processing, "torch", MagicMock(**{"cuda.is_available.return_value": False}))
+
+    def factory(count: int, **settings) -> Pipeline:
+        pipeline = Pipeline(tmp_path, count, **settings)
+        monkeypatch.setitem(sys.modules, "backend.model_loader", types.SimpleNamespace(
+            prepare_inputs=pipeline.prepare_inputs,
+            generate_from_inputs=pipeline.generate_from_inputs,
+        ))
+        return pipeline
+
+    return factory
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class TestPipeline:
+    """Tests for ProcessingManager._run_pipeline"""
+
+    def test_every_video_passes_every_stage_in_order(self, pipeline_factory):
+        """Test each video is decoded, preprocessed and generated in that order, then written"""
+        pipeline = pipeline_factory(5)
+        results = asyncio.run(pipeline.run())
+
+        assert [r["video"] for r in results] == [p.name for p in pipeline.videos]
+        assert all(r["success"] for r in results)
+        for i, path in enumerate(pipeline.videos):
+            assert pipeline.stages_of(i) == ["decode", "preprocess", "generate"]
+            assert path.with_suffix(".txt").read_text() == f"caption {i}"
+        assert pipeline.released == 5  # Every decode buffer returned
+        assert pipeline.manager.state.completed_videos == 5
+        assert not pipeline.manager.is_processing
+
+    def test_prefetch_depth_bounds_decode(self, pipeline_factory):
+        """Test decode stops running ahead once the bounded queues behind a busy GPU are full"""
+        pipeline = pipeline_factory(20, prefetch_depth=1)
+        pipeline.gate.clear()
+
+        async def scenario():
+            task = asyncio.create_task(pipeline.run())
+            await wait_until(lambda: ("generate", 0) in pipeline.events)
+            await asyncio.sleep(0.2)  # Let every stage fill up
+            decoded = sum(1 for stage, _ in pipeline.events if stage == "decode")
+            pipeline.gate.set()
+            results = await task
+            return decoded, results
+
+        decoded, results = asyncio.run(scenario())
+        # Generating 0; one item in each queue of size 1 and one held by each
+        # upstream task waiting to put: videos 1-4 decoded ahead, no further
+        assert decoded == 5
+        assert len(results) == 20
+
+    def test_stop_drains_every_stage(self, pipeline_factory):
+        """Test a stop finishes the pipeline, drops queued videos and returns their buffers"""
+        pipeline = pipeline_factory(20, prefetch_depth=2)
+        pipeline.gate.clear()
+
+        async def scenario():
+            task = asyncio.create_task(pipeline.run())
+            await wait_until(lambda: ("generate", 0) in pipeline.events)
+            await asyncio.sleep(0.1)
+            pipeline.manager.stop()
+            pipeline.gate.set()
+            return await asyncio.wait_for(task, timeout=5)
+
+        results = asyncio.run(scenario())
+        decoded = sum(1 for stage, _ in pipeline.events if stage == "decode")
+        assert len(results) < 20
+        assert pipeline.released == decoded
+        assert all(stage.queue.empty() for stage in pipeline.manager.state.stages if stage.queue is not None)
+        assert not pipeline.manager.is_processing
+
+    def test_failed_video_does_not_stall(self, pipeline_factory):
+        """Test a video that fails to decode is reported and the rest are still captioned"""
+        pipeline = pipeline_factory(4)
+        pipeline.fail_decode = {1}
+        results = asyncio.run(pipeline.run())
+
+        by_name = {r["video"]: r for r in results}
+        assert len(results) == 4
+        assert by_name["v01.mp4"]["success"] is False
+        assert "corrupt file" in by_name["v01.mp4"]["error"]
+        assert pipeline.stages_of(1) == ["decode"]
+        assert all(by_name[f"v0{i}.mp4"]["success"] for i in (0, 2, 3))
+        assert "v01.mp4" in pipeline.manager.state.error_message
+
+
+class TestDedupFrames:
+    """Tests for ProcessingManager._dedup_frames"""
+
+    def item(self, frames):
+        return processing.PipelineItem(
+            index=0, path=Path("clip.mp4"), display_name="clip.mp4",
+            frames=frames, metadata={}, num_frames=len(frames),
+        )
+
+    def test_zero_threshold_keeps_every_frame(self):
+        """Test dedup is off at threshold 0, even for identical frames"""
+        item = self.item(np.zeros((4, 8, 8, 3), dtype=np.uint8))
+        frames = ProcessingManager()._dedup_frames(item, Settings(dedup_threshold=0))
+        assert len(frames) == 4
+        assert "frames_dropped" not in item.metadata
+
+    @pytest.mark.parametrize("method", ["dhash", "phash"])
+    def test_duplicates_dropped_and_counted(self, method):
+        a, b = (np.random.default_rng(seed).integers(0, 256, (32, 32, 3), dtype=np.uint8) for seed in (1, 2))
+        item = self.item(np.stack([a, a, b, a]))
+        kept = ProcessingManager()._dedup_frames(item, Settings(dedup_threshold=4, dedup_method=method))
+        assert len(kept) == 2
+        assert item.num_frames == 2
+        assert item.metadata["frames_dropped"] == 2
+
+    def test_frames_dropped_reaches_result(self, pipeline_factory):
+        """Test the pipeline captions the deduplicated frames and reports how many were dropped"""
+        pipeline = pipeline_factory(2, dedup_threshold=4)
+        results = asyncio.run(pipeline.run())
+
+        assert all(r["success"] for r in results)
+        assert [r["frames_dropped"] for r in results] == [3, 3]  # Four identical frames each
+        assert pipeline.prepared == {0: 1, 1: 1}
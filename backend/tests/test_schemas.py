@@ -11,7 +11,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from backend.schemas import (
     Settings, SettingsUpdate, ProgressUpdate, VideoInfo,
-    ProcessingStage, ProcessingSubstage, DeviceType, DtypeType
+    ProcessingStage, ProcessingSubstage, DeviceType, DtypeType,
+    SampleStrategy, PipelineStageProgress, DecodeBackend, SampleMethod,
+    DedupMethod, VideoPageResponse, MediaSortField, SortOrder, ListingEncoding,
+    ThumbnailSpriteRequest, UploadSessionRequest, UploadResponse,
 )
 
 
@@ -95,6 +98,54 @@ class TestSettings:
         with pytest.raises(ValidationError):
             Settings(temperature=2.1)
 
+    def test_settings_sample_strategy(self):
+        """Test sample_strategy default and validation"""
+        assert Settings().sample_strategy == SampleStrategy.AUTO
+        assert Settings(sample_strategy="seek").sample_strategy == SampleStrategy.SEEK
+
+        with pytest.raises(ValidationError):
+            Settings(sample_strategy="random")
+
+    def test_settings_sample_method(self):
+        """Test sample_method default and validation"""
+        assert Settings().sample_method == SampleMethod.UNIFORM
+        assert SettingsUpdate(sample_method="adaptive").sample_method == SampleMethod.ADAPTIVE
+
+        with pytest.raises(ValidationError):
+            Settings(sample_method="random")
+
+    def test_settings_validation_dedup(self):
+        """Test dedup_threshold validation and dedup_method default"""
+        settings = Settings()
+        assert settings.dedup_threshold == 0
+        assert settings.dedup_method == DedupMethod.DHASH
+        Settings(dedup_threshold=64, dedup_method="phash")
+
+        with pytest.raises(ValidationError):
+            Settings(dedup_threshold=65)
+
+        with pytest.raises(ValidationError):
+            Settings(dedup_threshold=-1)
+
+    def test_settings_decode_backend(self):
+        """Test decode_backend default and validation"""
+        assert Settings().decode_backend == DecodeBackend.AUTO
+        assert Settings(decode_backend="pyav").decode_backend == DecodeBackend.PYAV
+
+        with pytest.raises(ValidationError):
+            Settings(decode_backend="gstreamer")
+
+    def test_settings_validation_decode_workers(self):
+        """Test decode_workers validation"""
+        assert Settings().decode_workers == 0
+        Settings(decode_workers=32)
+
+        with pytest.raises(ValidationError):
+            Settings(decode_workers=-1)
+
+        with pytest.raises(ValidationError):
+            Settings(decode_workers=33)
+
 
 class TestSettingsUpdate:
     """Tests for SettingsUpdate schema"""
@@ -184,6 +235,20 @@ class TestProgressUpdate:
         with pytest.raises(ValidationError):
             ProgressUpdate(substage_progress=1.1)
 
+    def test_progress_pipeline_stages(self):
+        """Test per-stage pipeline stats"""
+        assert ProgressUpdate().stages == []
+
+        progress = ProgressUpdate(stages=[
+            PipelineStageProgress(name="decode", queue_depth=3, active=2, processed=5, idle_time=0.5),
+            PipelineStageProgress(name="generate", idle_time=1.25),
+        ])
+
+        assert progress.stages[0].queue_depth == 3
+        assert progress.stages[1].name == "generate"
+        assert progress.stages[1].queue_depth == 0
+        assert progress.stages[1].idle_time == 1.25
+
 
 class TestVideoInfo:
     """Tests for VideoInfo schema"""
@@ -221,6 +286,46 @@ class TestVideoInfo:
         assert video.has_caption is True
         assert video.caption_preview == "This is a preview..."
 
+    def test_video_page_response(self):
+        """Test paginated listing response; next_cursor is None on the last page"""
+        page = VideoPageResponse(
+            videos=[VideoInfo(name="test.mp4", path="/path/to/test.mp4", size_mb=1.0)],
+            total_count=250,
+            next_cursor="abc",
+        )
+        assert page.total_count == 250
+        assert page.next_cursor == "abc"
+
+        last_page = VideoPageResponse(videos=[], total_count=0)
+        assert last_page.next_cursor is None
+
+    def test_thumbnail_sprite_request(self):
+        """Test sprite request defaults and bounds"""
+        request = ThumbnailSpriteRequest(names=["a.mp4", "b.mp4"])
+        assert request.size == 160
+        assert request.columns == 10
+
+        with pytest.raises(ValidationError):
+            ThumbnailSpriteRequest(names=[])
+        with pytest.raises(ValidationError):
+            ThumbnailSpriteRequest(names=["a.mp4"] * 201)
+        with pytest.raises(ValidationError):
+            ThumbnailSpriteRequest(names=["a.mp4"], columns=0)
+
+    def test_upload_session_request(self):
+        """Test upload session bounds and upload response defaults"""
+        request = UploadSessionRequest(filename="clip.mp4", size_bytes=0)
+        assert request.size_bytes == 0
+
+        with pytest.raises(ValidationError):
+            UploadSessionRequest(filename="", size_bytes=1)
+        with pytest.raises(ValidationError):
+            UploadSessionRequest(filename="clip.mp4", size_bytes=-1)
+
+        response = UploadResponse(success=True)
+        assert response.uploaded == []
+        assert response.failed == []
+
 
 class TestEnums:
     """Tests for enum types"""
@@ -236,6 +341,16 @@ class TestEnums:
         assert DtypeType.BFLOAT16.value == "bfloat16"
         assert DtypeType.FLOAT32.value == "float32"
 
+    def test_media_sort_values(self):
+        """Test listing sort enums"""
+        assert [f.value for f in MediaSortField] == ["name", "size", "mtime", "caption"]
+        assert SortOrder.ASC.value == "asc"
+        assert SortOrder.DESC.value == "desc"
+
+    def test_listing_encoding_values(self):
+        """Test listing encodings; JSON is the default wire format"""
+        assert [e.value for e in ListingEncoding] == ["json", "compact", "msgpack"]
+
     def test_processing_stage_values(self):
         """Test ProcessingStage enum values"""
         assert ProcessingStage.IDLE.value == "idle"
@@ -0,0 +1,140 @@
+"""
+Tests for the thumbnail job scheduler
+"""
+
+import sys
+import threading
+from concurrent.futures import CancelledError, wait
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.thumbnail_scheduler import BACKGROUND, FOREGROUND, ThumbnailScheduler
+
+TIMEOUT = 5
+
+
+class Runner:
+    """Job function that records run order; the "gate" job blocks until opened"""
+
+    def __init__(self):
+        self.order = []
+        self.gate_started = threading.Event()
+        self.gate_open = threading.Event()
+        self.allow_background = True
+
+    def __call__(self, media_path, key, size, fmt):
+        self.order.append(key)
+        if key == "gate":
+            self.gate_started.set()
+            assert self.gate_open.wait(TIMEOUT)
+        if key.startswith("bad"):
+            raise ValueError("cannot decode")
+        return f"{key}.{fmt}"
+
+
+@pytest.fixture
+def runner():
+    return Runner()
+
+
+@pytest.fixture
+def scheduler(runner):
+    """One worker, so queued jobs run strictly in priority order"""
+    scheduler = ThumbnailScheduler(runner, workers=1, background_allowed=lambda: runner.allow_background)
+    yield scheduler
+    runner.gate_open.set()
+    scheduler.stop()
+
+
+def submit(scheduler, key, priority=FOREGROUND):
+    return scheduler.submit(key, Path(f"{key}.mp4"), 256, priority=priority)
+
+
+def hold_worker(scheduler, runner, priority=FOREGROUND):
+    """Occupy the only worker so later submissions queue up"""
+    future = submit(scheduler, "gate", priority)
+    assert runner.gate_started.wait(TIMEOUT)
+    return future
+
+
+class TestThumbnailScheduler:
+    """Tests for ordering, coalescing, promotion and cancellation"""
+
+    def test_foreground_before_background(self, scheduler, runner):
+        """Test on-demand jobs run first (newest first), then background jobs (oldest first)"""
+        hold_worker(scheduler, runner)
+        futures = [
+            submit(scheduler, "bg1", BACKGROUND),
+            submit(scheduler, "bg2", BACKGROUND),
+            submit(scheduler, "fg1"),
+            submit(scheduler, "fg2"),
+        ]
+        runner.gate_open.set()
+        wait(futures, timeout=TIMEOUT)
+        assert runner.order == ["gate", "fg2", "fg1", "bg1", "bg2"]
+        assert futures[0].result() == "bg1.jpeg"
+        assert scheduler.stats()["completed"] == 5
+
+    def test_concurrent_requests_coalesce(self, scheduler, runner):
+        """Test requests for a queued or running thumbnail share one job"""
+        gate = hold_worker(scheduler, runner)
+        assert submit(scheduler, "gate") is gate
+        first = submit(scheduler, "a")
+        assert submit(scheduler, "a") is first
+        assert submit(scheduler, "a", BACKGROUND) is first
+
+        runner.gate_open.set()
+        assert first.result(timeout=TIMEOUT) == "a.jpeg"
+        assert runner.order == ["gate", "a"]
+        assert scheduler.stats()["coalesced"] == 3
+        assert scheduler.stats()["promoted"] == 0
+
+    def test_background_job_promoted(self, scheduler, runner):
+        """Test a queued background job requested on demand jumps the background queue"""
+        hold_worker(scheduler, runner)
+        futures = [submit(scheduler, "bg1", BACKGROUND), submit(scheduler, "bg2", BACKGROUND)]
+        assert submit(scheduler, "bg2") is futures[1]
+
+        runner.gate_open.set()
+        wait(futures, timeout=TIMEOUT)
+        assert runner.order == ["gate", "bg2", "bg1"]
+        assert scheduler.stats()["promoted"] == 1
+
+    def test_cancel_background(self, scheduler, runner):
+        """Test queued background jobs are cancelled while running and foreground jobs are kept"""
+        running = hold_worker(scheduler, runner, BACKGROUND)
+        queued = [submit(scheduler, "bg1", BACKGROUND), submit(scheduler, "bg2", BACKGROUND)]
+        foreground = submit(scheduler, "fg1")
+
+        assert scheduler.cancel_background() == 2
+        assert all(future.cancelled() for future in queued)
+        with pytest.raises(CancelledError):
+            queued[0].result()
+
+        runner.gate_open.set()
+        assert running.result(timeout=TIMEOUT) == "gate.jpeg"
+        assert foreground.result(timeout=TIMEOUT) == "fg1.jpeg"
+        assert runner.order == ["gate", "fg1"]
+        assert scheduler.stats()["cancelled"] == 2
+
+    def test_background_held_while_not_allowed(self, scheduler, runner):
+        """Test background jobs wait for background_allowed() while foreground jobs still run"""
+        runner.allow_background = False
+        background = submit(scheduler, "bg1", BACKGROUND)
+        assert submit(scheduler, "fg1").result(timeout=TIMEOUT) == "fg1.jpeg"
+        assert not background.done()
+        assert scheduler.stats()["queued_background"] == 1
+
+        runner.allow_background = True
+        assert background.result(timeout=TIMEOUT) == "bg1.jpeg"
+
+    def test_failed_job(self, scheduler, runner):
+        """Test an exception reaches the job's future and the key can be retried"""
+        future = submit(scheduler, "bad")
+        with pytest.raises(ValueError):
+            future.result(timeout=TIMEOUT)
+        assert scheduler.stats()["failed"] == 1
+        assert submit(scheduler, "bad") is not future
@@ -0,0 +1,95 @@
+"""
+Tests for thumbnail sprite sheets
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import thumbnail_sprites
+from backend import thumbnail_store
+from backend.thumbnail_sprites import make_sprite_id
+from backend.thumbnail_store import ThumbnailStore
+
+# Mock the imports that require GPU/model (as in test_api)
+with patch.dict('sys.modules', {
+    'torch': MagicMock(),
+    'backend.model_loader': MagicMock(),
+    'backend.video_processor': MagicMock(),
+}):
+    from backend.api import app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Working directory with two images, an isolated thumbnail store and sheet cache"""
+    library = tmp_path / "library"
+    library.mkdir()
+    for name, value in (("a.png", 40), ("b.png", 200)):
+        Image.fromarray(np.full((300, 300, 3), value, dtype=np.uint8)).save(library / name)
+    monkeypatch.setattr(config, "_current_working_dir", library)
+    monkeypatch.setattr(
+        thumbnail_store, "_thumbnail_store", ThumbnailStore(tmp_path / "thumbs", 10_000_000, 1_000_000, 0.5)
+    )
+    monkeypatch.setattr(thumbnail_sprites, "_sprite_sheets", None)
+    return TestClient(app)
+
+
+def post_sprite(client, names):
+    response = client.post("/api/thumbnails/sprite", json={"names": names, "size": 64, "columns": 4})
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestSpriteId:
+    """Tests for make_sprite_id"""
+
+    def test_unresolved_names_do_not_collide(self):
+        """Test names that did not resolve to a store key still give distinct ids"""
+        assert make_sprite_id(["gone.mp4"], [None], 64, 4) != make_sprite_id(["other.mp4"], [None], 64, 4)
+
+    def test_stable(self):
+        """Test the same names, keys and layout give the same id"""
+        assert make_sprite_id(["a.mp4"], ["k"], 64, 4) == make_sprite_id(["a.mp4"], ["k"], 64, 4)
+        assert make_sprite_id(["a.mp4"], ["k"], 64, 4) != make_sprite_id(["a.mp4"], ["k"], 64, 2)
+
+
+class TestSpriteEndpoint:
+    """Tests for POST /api/thumbnails/sprite"""
+
+    def test_complete_sheet_is_reused(self, client):
+        """Test a sheet with every tile is cached under a stable id and served"""
+        first = post_sprite(client, ["a.png", "b.png"])
+        assert first["missing"] == []
+        assert first["tiles"] == {"a.png": [0, 0], "b.png": [first["size"], 0]}
+        assert post_sprite(client, ["a.png", "b.png"])["sheet"] == first["sheet"]
+        assert client.get(first["sheet"]).status_code == 200
+
+    def test_incomplete_sheet_is_not_reused(self, client):
+        """Test a sheet with missing tiles is served once but rebuilt on the next request"""
+        first = post_sprite(client, ["a.png", "nope.png"])
+        assert first["missing"] == ["nope.png"]
+        assert client.get(first["sheet"]).status_code == 200
+
+        second = post_sprite(client, ["a.png", "nope.png"])
+        assert second["sheet"] != first["sheet"]
+        assert post_sprite(client, ["a.png", "other.png"])["missing"] == ["other.png"]
+
+    def test_names_outside_working_directory_are_missing(self, client, tmp_path):
+        """Test traversal, absolute and symlinked names are reported missing instead of read"""
+        secret = tmp_path / "secret.png"
+        Image.fromarray(np.zeros((300, 300, 3), dtype=np.uint8)).save(secret)
+        (tmp_path / "library" / "link.png").symlink_to(secret)
+        escaping = ["../secret.png", str(secret), "link.png"]
+
+        sheet = post_sprite(client, ["a.png", *escaping])
+        assert sheet["missing"] == escaping
+        assert list(sheet["tiles"]) == ["a.png"]
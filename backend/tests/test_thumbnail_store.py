@@ -0,0 +1,168 @@
+"""
+Tests for the packed thumbnail store
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.thumbnail_store import ThumbnailStore, remove_legacy_cache
+
+
+def blob(tag: str) -> bytes:
+    """100 bytes identifying tag"""
+    return tag.encode("ascii").ljust(100, b".")
+
+
+def open_store(store_dir: Path, max_bytes: int = 10_000, pack_max_bytes: int = 10_000, compact_ratio: float = 0.5):
+    return ThumbnailStore(store_dir, max_bytes, pack_max_bytes, compact_ratio)
+
+
+def pack_files(store_dir: Path):
+    return sorted(p.name for p in store_dir.glob("*.pack"))
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    return tmp_path / "thumbs"
+
+
+class TestThumbnailStore:
+    """Tests for storing, evicting and compacting thumbnails"""
+
+    def test_put_get(self, store_dir):
+        """Test thumbnails come back byte for byte and a re-put replaces the old bytes"""
+        store = open_store(store_dir)
+        assert store.get("a") is None
+        store.put("a", blob("a"))
+        store.put("b", blob("b"))
+        assert store.get("a") == blob("a")
+        assert store.get("b") == blob("b")
+
+        store.put("a", blob("a2"))
+        assert store.get("a") == blob("a2")
+        stats = store.stats()
+        assert stats["entries"] == 2
+        assert stats["live_bytes"] == 200
+        assert stats["disk_bytes"] == 300
+        assert (stats["hits"], stats["misses"]) == (3, 1)
+
+    def test_survives_reopen(self, store_dir):
+        """Test a new store over the same directory serves earlier thumbnails"""
+        store = open_store(store_dir)
+        store.put("a", blob("a"))
+        store.put("b", blob("b"))
+        reopened = open_store(store_dir)
+        assert reopened.get("a") == blob("a")
+        assert reopened.get("b") == blob("b")
+
+    def test_lru_eviction(self, store_dir):
+        """Test the least recently read thumbnail goes once max_bytes is exceeded"""
+        store = open_store(store_dir, max_bytes=250)
+        store.put("a", blob("a"))
+        store.put("b", blob("b"))
+        assert store.get("a") is not None  # b is now least recently used
+        store.put("c", blob("c"))
+
+        assert store.get("b") is None
+        assert store.get("a") == blob("a")
+        assert store.get("c") == blob("c")
+        assert store.stats()["evictions"] == 1
+        assert store.stats()["live_bytes"] == 200
+
+    def test_packs_sealed_at_size(self, store_dir):
+        """Test a new pack is started once the active one would pass pack_max_bytes"""
+        store = open_store(store_dir, pack_max_bytes=250)
+        for tag in "abc":
+            store.put(tag, blob(tag))
+        assert pack_files(store_dir) == ["000000.pack", "000001.pack"]
+        assert store.get("c") == blob("c")
+
+    def test_mostly_dead_sealed_pack_is_compacted(self, store_dir):
+        """Test a sealed pack whose dead share reaches compact_ratio is rewritten and deleted"""
+        store = open_store(store_dir, pack_max_bytes=250, compact_ratio=0.5)
+        store.put("a", blob("a"))
+        store.put("b", blob("b"))
+        store.put("c", blob("c"))  # Seals pack 0
+        assert store.stats()["compactions"] == 0
+
+        store.put("a", blob("a2"))  # Half of pack 0 is now dead
+        assert store.stats()["compactions"] == 1
+        assert "000000.pack" not in pack_files(store_dir)
+        for tag, data in (("a", blob("a2")), ("b", blob("b")), ("c", blob("c"))):
+            assert store.get(tag) == data
+        assert open_store(store_dir).get("b") == blob("b")
+
+    def test_compact_all(self, store_dir):
+        """Test compact() rewrites every sealed pack with dead bytes, below the ratio too"""
+        store = open_store(store_dir, pack_max_bytes=350, compact_ratio=0.9)
+        for tag in "abcd":
+            store.put(tag, blob(tag))
+        store.put("a", blob("a2"))  # A third of pack 0 is dead, under the ratio
+        assert store.stats()["compactions"] == 0
+
+        assert store.compact() == 1
+        assert store.stats()["disk_bytes"] == store.stats()["live_bytes"]
+        assert store.get("b") == blob("b")
+
+    def test_load_drops_truncated_rows(self, store_dir):
+        """Test rows whose bytes did not all reach the pack are dropped on the next start"""
+        store = open_store(store_dir)
+        store.put("a", blob("a"))
+        store.put("b", blob("b"))
+        del store
+        os.truncate(store_dir / "000000.pack", 150)  # b's bytes only half written
+
+        reopened = open_store(store_dir)
+        assert reopened.get("a") == blob("a")
+        assert reopened.get("b") is None
+        assert reopened.stats()["entries"] == 1
+        rows = reopened._conn.execute("SELECT key FROM thumbnails").fetchall()
+        assert rows == [("a",)]
+
+    def test_load_deletes_unindexed_packs(self, store_dir):
+        """Test pack files without a single indexed thumbnail are removed"""
+        store = open_store(store_dir)
+        store.put("a", blob("a"))
+        del store
+        (store_dir / "000007.pack").write_bytes(b"orphan")
+
+        open_store(store_dir)
+        assert pack_files(store_dir) == ["000000.pack"]
+
+    def test_clear(self, store_dir):
+        """Test clear removes every thumbnail and pack"""
+        store = open_store(store_dir)
+        store.put("a", blob("a"))
+        assert store.clear() == 1
+        assert store.get("a") is None
+        assert pack_files(store_dir) == []
+        store.put("b", blob("b"))
+        assert store.get("b") == blob("b")
+
+
+class TestLegacyCache:
+    """Tests for removing the per-file cache the packed store replaced"""
+
+    def test_thumbnails_and_directory_removed(self, tmp_path):
+        legacy = tmp_path / ".thumbnail_cache"
+        legacy.mkdir()
+        for i in range(3):
+            (legacy / f"{i:032x}.jpg").write_bytes(b"jpeg")
+        assert remove_legacy_cache(legacy) == 3
+        assert not legacy.exists()
+
+    def test_other_files_kept(self, tmp_path):
+        legacy = tmp_path / ".thumbnail_cache"
+        legacy.mkdir()
+        (legacy / "a.jpg").write_bytes(b"jpeg")
+        (legacy / "notes.txt").write_text("mine")
+        assert remove_legacy_cache(legacy) == 1
+        assert [p.name for p in legacy.iterdir()] == ["notes.txt"]
+
+    def test_missing_directory(self, tmp_path):
+        assert remove_legacy_cache(tmp_path / ".thumbnail_cache") == 0
@@ -0,0 +1,146 @@
+"""
+Tests for thumbnail framing and thumbnails taken from captioning frames
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import thumbnailer
+from backend.thumbnailer import _center_crop, thumbnail_from_frames
+
+
+def frame_used(result) -> int:
+    """Index of the frame a thumbnail came from (frame i is filled with i * 20)"""
+    with Image.open(io.BytesIO(result.data)) as img:
+        return round(float(np.asarray(img).mean()) / 20)
+
+
+@pytest.fixture
+def frames():
+    """Ten 64x64 frames, each a flat grey identifying its index"""
+    return np.stack([np.full((64, 64, 3), i * 20, dtype=np.uint8) for i in range(10)])
+
+
+class TestThumbnailFromFrames:
+    """Tests for choosing the sampled frame"""
+
+    @pytest.mark.parametrize("duration, expected", [
+        (60.0, 1),  # Seek target falls before frame 1 (t=6.7s): never frame 0
+        (600.0, 1),
+        (4.0, 3),  # Target 1s, capped at half the duration: frame 3 is at t=1.33s
+        (1.0, 5),  # Target capped to 0.5s: frame 5 is at t=0.56s
+    ])
+    def test_first_frame_at_or_after_seek_target(self, frames, monkeypatch, duration, expected):
+        """Test the first sampled frame at or after THUMBNAIL_SEEK_SECONDS is used"""
+        monkeypatch.setattr(config, "THUMBNAIL_SEEK_SECONDS", 1.0)
+        result = thumbnail_from_frames(frames, duration, 48)
+        assert result.ok
+        assert frame_used(result) == expected
+
+    def test_unknown_duration_uses_first_frame(self, frames):
+        """Test frame 0 is used when the duration is unknown"""
+        assert frame_used(thumbnail_from_frames(frames, None, 48)) == 0
+
+    def test_frames_too_small(self, frames):
+        """Test frames well below the thumbnail size are not upscaled"""
+        assert thumbnail_from_frames(frames, 60.0, 200) is None
+
+
+def write_clip(path: Path, width: int, height: int, count: int = 5):
+    """Encode count frames of a horizontal gradient with PyAV"""
+    import av
+    row = np.linspace(0, 255, width, dtype=np.uint8)
+    image = np.repeat(np.broadcast_to(row, (height, width))[:, :, None], 3, axis=2).copy()
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("libx264", rate=25)
+        stream.width, stream.height = width, height
+        stream.pix_fmt = "yuv420p"
+        for _ in range(count):
+            for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="rgb24")):
+                container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+class TestThumbnailSize:
+    """Tests that thumbnails fill the requested square whatever the source size"""
+
+    @pytest.mark.parametrize("height, width", [(20, 30), (30, 20), (64, 64), (360, 640), (640, 360), (96, 97)])
+    def test_center_crop_is_exact(self, height, width):
+        rgb = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+        assert _center_crop(rgb, 64).shape == (64, 64, 3)
+
+    def test_center_crop_keeps_the_middle(self):
+        """Test the crop is centered: the left and right bands of a wide frame are cut"""
+        rgb = np.zeros((32, 96, 3), dtype=np.uint8)
+        rgb[:, 24:72] = 255
+        assert _center_crop(rgb, 64).min() == 255
+
+    @pytest.mark.parametrize("width, height", [(32, 24), (320, 180)])
+    def test_pyav_thumbnail_is_exact(self, tmp_path, monkeypatch, width, height):
+        """Test PyAV thumbnails of sources smaller and larger than the bucket are size x size"""
+        pytest.importorskip("av")
+        monkeypatch.setattr(config, "THUMBNAIL_BACKEND_ORDER", ["pyav"])
+        clip = tmp_path / "clip.mp4"
+        write_clip(clip, width, height)
+
+        grabbed = thumbnailer._grab_pyav(clip, 96)
+        assert min(grabbed.shape[:2]) == 96
+        rgb, backend = thumbnailer.render_video_frame(clip, 96)
+        assert backend == "pyav"
+        assert rgb.shape == (96, 96, 3)
+
+
+class TestNegotiateFormat:
+    """Tests for picking the thumbnail format from the Accept header"""
+
+    @pytest.fixture(autouse=True)
+    def formats(self, monkeypatch):
+        monkeypatch.setattr(thumbnailer, "_formats", ["avif", "webp", "jpeg"])
+
+    @pytest.mark.parametrize("accept, expected", [
+        ("image/avif,image/webp,image/apng,*/*;q=0.8", "avif"),  # Chrome
+        ("image/webp,*/*", "webp"),
+        ("image/avif;q=0,image/webp;q=0.5", "webp"),
+        ("image/avif;q=0, image/webp;q=0", "jpeg"),
+        ("IMAGE/AVIF", "avif"),
+        ("image/avif;q=high", "jpeg"),  # Unparseable q counts as 0
+        ("image/png,image/jpeg", "jpeg"),
+    ])
+    def test_accept_header(self, accept, expected):
+        assert thumbnailer.negotiate_format(accept) == expected
+
+    @pytest.mark.parametrize("accept", ["*/*", "image/*", "", None])
+    def test_wildcards_and_missing_header_fall_back_to_jpeg(self, accept):
+        assert thumbnailer.negotiate_format(accept) == "jpeg"
+
+    def test_server_preference_wins(self, monkeypatch):
+        """Test the configured order decides between formats the client accepts"""
+        monkeypatch.setattr(thumbnailer, "_formats", ["webp", "avif", "jpeg"])
+        assert thumbnailer.negotiate_format("image/avif,image/webp") == "webp"
+
+    def test_unavailable_format_skipped(self, monkeypatch):
+        """Test a format this build cannot encode is never chosen"""
+        monkeypatch.setattr(thumbnailer, "_formats", ["webp", "jpeg"])
+        assert thumbnailer.negotiate_format("image/avif") == "jpeg"
+        assert thumbnailer.negotiate_format("image/avif,image/webp") == "webp"
+
+
+class TestSnapSize:
+    """Tests for snapping requested sizes to cache buckets"""
+
+    @pytest.mark.parametrize("size, expected", [
+        (0, 96), (1, 96), (96, 96), (97, 160), (160, 160), (161, 200),
+        (256, 256), (257, 320), (320, 320), (321, 320), (10_000, 320),
+    ])
+    def test_buckets(self, monkeypatch, size, expected):
+        monkeypatch.setattr(config, "THUMBNAIL_SIZE_BUCKETS", [320, 96, 200, 160, 256])  # Any order
+        assert thumbnailer.snap_size(size) == expected
@@ -0,0 +1,191 @@
+"""
+Tests for multipart and resumable uploads
+"""
+
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import media_index
+from backend import uploads
+from backend.uploads import UploadSessions
+
+# Mock the imports that require GPU/model (as in test_api)
+with patch.dict('sys.modules', {
+    'torch': MagicMock(),
+    'backend.model_loader': MagicMock(),
+    'backend.video_processor': MagicMock(),
+}):
+    from backend.api import app
+
+
+CONTENT = bytes(range(256)) * 40  # 10 KB
+
+
+@pytest.fixture
+def working_dir(tmp_path, monkeypatch):
+    """Empty working directory with upload sessions kept beside it"""
+    library = tmp_path / "library"
+    library.mkdir()
+    monkeypatch.setattr(config, "_current_working_dir", library)
+    monkeypatch.setattr(config, "UPLOAD_SESSION_DIR", tmp_path / "sessions")
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_BYTES", 1024)
+    monkeypatch.setattr(config, "MEDIA_INDEX_PATH", tmp_path / "index.db")
+    monkeypatch.setattr(media_index, "_conn", None)
+    monkeypatch.setattr(media_index, "_indexes", OrderedDict())
+    monkeypatch.setattr(uploads, "_upload_sessions", None)
+    return library
+
+
+@pytest.fixture
+def client(working_dir):
+    """Client without the app lifespan (no model or GPU setup)"""
+    return TestClient(app)
+
+
+def create_session(client, filename="clip.mp4", size=len(CONTENT)):
+    response = client.post("/api/uploads", json={"filename": filename, "size_bytes": size})
+    assert response.status_code == 200
+    return response.json()
+
+
+def patch_bytes(client, upload_id, offset, body):
+    return client.patch(f"/api/uploads/{upload_id}", content=body, headers={"Upload-Offset": str(offset)})
+
+
+class TestMultipartUpload:
+    """Tests for POST /api/videos/upload"""
+
+    def test_multiple_files(self, client, working_dir):
+        """Test several files, videos and images, land in the working directory"""
+        response = client.post("/api/videos/upload", files=[
+            ("files", ("a.mp4", CONTENT, "video/mp4")),
+            ("files", ("b.png", b"png", "image/png")),
+        ])
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert [f["filename"] for f in data["uploaded"]] == ["a.mp4", "b.png"]
+        assert (working_dir / "a.mp4").read_bytes() == CONTENT
+        assert sorted(p.name for p in working_dir.iterdir()) == ["a.mp4", "b.png"]
+
+    @pytest.mark.parametrize("filename", ["notes.txt", "../escape.mp4"])
+    def test_rejected_names(self, client, working_dir, filename):
+        """Test other file types and traversal are rejected before anything is written"""
+        response = client.post("/api/videos/upload", files={"file": (filename, b"x", "video/mp4")})
+        assert response.status_code == 400
+        assert list(working_dir.iterdir()) == []
+
+    def test_symlinked_folder_rejected(self, client, working_dir, tmp_path):
+        """Test a subfolder symlinked outside the working directory cannot be written through"""
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (working_dir / "link").symlink_to(outside, target_is_directory=True)
+        response = client.post("/api/uploads", json={"filename": "link/clip.mp4", "size_bytes": 1})
+        assert response.status_code == 400
+        assert list(outside.iterdir()) == []
+
+
+class TestResumableUpload:
+    """Tests for the /api/uploads session protocol"""
+
+    def test_chunks_complete_and_rename(self, client, working_dir):
+        """Test chunks at the right offsets complete the upload and move it into place"""
+        session = create_session(client, "sub/clip.mp4")
+        assert session["offset"] == 0
+        assert session["complete"] is False
+
+        response = patch_bytes(client, session["upload_id"], 0, CONTENT[:4000])
+        assert response.status_code == 200
+        assert response.json()["offset"] == 4000
+        # Partial bytes stay in a hidden part file
+        assert not (working_dir / "sub" / "clip.mp4").exists()
+        assert [p.suffix for p in (working_dir / "sub").iterdir()] == [".part"]
+
+        response = patch_bytes(client, session["upload_id"], 4000, CONTENT[4000:])
+        data = response.json()
+        assert data["complete"] is True
+        assert data["offset"] == len(CONTENT)
+        assert (working_dir / "sub" / "clip.mp4").read_bytes() == CONTENT
+        assert [p.name for p in (working_dir / "sub").iterdir()] == ["clip.mp4"]
+        assert client.get(f"/api/uploads/{session['upload_id']}").status_code == 404
+
+    def test_offset_mismatch_is_409(self, client):
+        """Test a chunk at the wrong offset is refused and the server's offset reported"""
+        session = create_session(client)
+        patch_bytes(client, session["upload_id"], 0, CONTENT[:100])
+
+        response = patch_bytes(client, session["upload_id"], 0, CONTENT[:100])
+        assert response.status_code == 409
+        assert response.headers["Upload-Offset"] == "100"
+
+    def test_overflow_is_413_and_keeps_offset(self, client):
+        """Test a body past the declared size is refused without moving the offset"""
+        session = create_session(client)
+        patch_bytes(client, session["upload_id"], 0, CONTENT[:100])
+
+        response = patch_bytes(client, session["upload_id"], 100, CONTENT[100:] + b"extra")
+        assert response.status_code == 413
+        assert response.headers["Upload-Offset"] == "100"
+        assert client.get(f"/api/uploads/{session['upload_id']}").json()["offset"] == 100
+
+    def test_resume_after_restart(self, client, working_dir):
+        """Test a session is found again from disk and continues at the received offset"""
+        session = create_session(client)
+        patch_bytes(client, session["upload_id"], 0, CONTENT[:3000])
+
+        uploads._upload_sessions = None  # Fresh registry, as after a server restart
+        state = client.get(f"/api/uploads/{session['upload_id']}").json()
+        assert state["offset"] == 3000
+
+        response = patch_bytes(client, session["upload_id"], state["offset"], CONTENT[3000:])
+        assert response.json()["complete"] is True
+        assert (working_dir / "clip.mp4").read_bytes() == CONTENT
+
+    def test_abort_deletes_part(self, client, working_dir):
+        """Test aborting removes the received bytes and the session"""
+        session = create_session(client)
+        patch_bytes(client, session["upload_id"], 0, CONTENT[:100])
+
+        response = client.delete(f"/api/uploads/{session['upload_id']}")
+        assert response.status_code == 200
+        assert list(working_dir.iterdir()) == []
+        assert client.get(f"/api/uploads/{session['upload_id']}").status_code == 404
+
+    def test_empty_file_completes_immediately(self, client, working_dir):
+        """Test a zero-byte upload needs no PATCH"""
+        session = create_session(client, "empty.jpg", 0)
+        assert session["complete"] is True
+        assert (working_dir / "empty.jpg").read_bytes() == b""
+
+
+class TestUploadSessionExpiry:
+    """Tests for UploadSessions.expire"""
+
+    def test_expire_skips_active_sessions(self, tmp_path):
+        """Test idle sessions are deleted with their part files, except one being written"""
+        sessions = UploadSessions(tmp_path / "sessions", ttl=60)
+        idle = sessions.create("idle.mp4", tmp_path / "idle.mp4", 10)
+        active = sessions.create("active.mp4", tmp_path / "active.mp4", 10)
+        for session in (idle, active):
+            session.updated = time.time() - 120
+            sessions._save(session)
+        assert sessions.acquire(active.upload_id)
+
+        assert sessions.expire() == 1
+        assert sessions.get(idle.upload_id) is None
+        assert not idle.part_path.exists()
+        assert sessions.get(active.upload_id) is not None
+        assert active.part_path.exists()
+
+        sessions.release(active.upload_id)
+        assert sessions.expire() == 1
+        assert not active.part_path.exists()
@@ -0,0 +1,290 @@
+"""
+Tests for frame sampling and decoding
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend import config
+from backend import video_processor
+from backend.video_processor import (
+    FrameDecoder, _resolve_sample_strategy, _select_frame_indices, dedup_frames, extract_frame_array, frame_hashes,
+    get_decoder_chain, select_scene_frames,
+)
+
+
+class TestSelectFrameIndices:
+    """Tests for which frames are sampled"""
+
+    @pytest.mark.parametrize("total, max_frames, method, expected", [
+        (100, 5, "uniform", [0, 24, 49, 74, 99]),
+        (100, 5, "first_last", [0, 1, 49, 98, 99]),
+        (100, 2, "first_last", [0, 99]),
+        (100, 1, "first_last", [0]),
+        (4, 8, "uniform", [0, 1, 2, 3]),  # Fewer frames than requested: all of them
+        (4, 8, "first_last", [0, 1, 2, 3]),
+        (0, 8, "uniform", []),
+    ])
+    def test_indices(self, total, max_frames, method, expected):
+        """Test sampled indices are ascending, in range and include the endpoints"""
+        assert _select_frame_indices(total, max_frames, method) == expected
+
+    def test_unknown_method(self):
+        """Test an unknown sample method is rejected"""
+        with pytest.raises(ValueError):
+            _select_frame_indices(100, 5, "random")
+
+
+class TestResolveSampleStrategy:
+    """Tests for choosing between a sequential pass and seeking"""
+
+    def test_auto_uses_average_gap(self, monkeypatch):
+        """Test auto reads sequentially while samples are dense and seeks once they are sparse"""
+        monkeypatch.setattr(config, "SEQUENTIAL_MAX_GAP", 120)
+        assert _resolve_sample_strategy("auto", 10, 1200) == "sequential"  # Gap 120
+        assert _resolve_sample_strategy("auto", 10, 1210) == "seek"
+        assert _resolve_sample_strategy("auto", 0, 50) == "sequential"
+
+    @pytest.mark.parametrize("strategy", ["sequential", "seek"])
+    def test_explicit_strategy_kept(self, strategy):
+        """Test an explicit strategy is used whatever the gap"""
+        assert _resolve_sample_strategy(strategy, 2, 100_000) == strategy
+
+    def test_unknown_strategy(self):
+        """Test an unknown strategy is rejected"""
+        with pytest.raises(ValueError):
+            _resolve_sample_strategy("random", 10, 100)
+
+
+def fake_decoder(name: str, fails: bool = False, available: bool = True, calls: list = None):
+    """FrameDecoder called name that returns blank frames, or raises"""
+    class Decoder(FrameDecoder):
+        @classmethod
+        def available(cls):
+            return available
+
+        def decode(self, video_path, max_frames, frame_size, sample_method, sample_strategy):
+            if calls is not None:
+                calls.append(name)
+            if fails:
+                raise ValueError(f"{name} cannot read this")
+            return np.zeros((max_frames, 8, 8, 3), dtype=np.uint8), {
+                "sample_strategy": "sequential", "frames_decoded": max_frames, "seeks": 0,
+            }
+
+    Decoder.name = name
+    return Decoder
+
+
+@pytest.fixture
+def decoders(monkeypatch):
+    """Replace the backend registry; returns the list decode() calls are recorded in"""
+    calls = []
+    monkeypatch.setattr(video_processor, "DECODE_BACKENDS", {
+        "pyav": fake_decoder("pyav", fails=True, calls=calls),
+        "ffmpeg": fake_decoder("ffmpeg", available=False, calls=calls),
+        "opencv": fake_decoder("opencv", calls=calls),
+    })
+    monkeypatch.setattr(config, "DECODE_BACKEND_ORDER", ["pyav", "ffmpeg", "opencv"])
+    return calls
+
+
+class TestDecoderChain:
+    """Tests for backend order and fallback"""
+
+    def test_auto_order_skips_unavailable(self, decoders):
+        """Test auto follows DECODE_BACKEND_ORDER without backends that are not installed"""
+        assert [d.name for d in get_decoder_chain("auto")] == ["pyav", "opencv"]
+
+    def test_named_backend_goes_first(self, decoders):
+        """Test a named backend is tried first and the rest of the order follows"""
+        assert [d.name for d in get_decoder_chain("opencv")] == ["opencv", "pyav"]
+
+    def test_unknown_backend(self, decoders):
+        with pytest.raises(ValueError):
+            get_decoder_chain("gstreamer")
+
+    def test_falls_back_after_failure(self, decoders, tmp_path):
+        """Test the next backend decodes the file when the first raises, and the failure is recorded"""
+        frames, stats = extract_frame_array(tmp_path / "clip.mp4", max_frames=4, frame_size=224, decode_backend="auto")
+        assert decoders == ["pyav", "opencv"]
+        assert len(frames) == 4
+        assert stats["decode_backend"] == "opencv"
+        assert stats["decode_fallbacks"] == ["pyav: pyav cannot read this"]
+
+    def test_explicit_backend_used_directly(self, decoders, tmp_path):
+        """Test an explicit working backend is the only one run"""
+        _frames, stats = extract_frame_array(tmp_path / "clip.mp4", max_frames=4, frame_size=224, decode_backend="opencv")
+        assert decoders == ["opencv"]
+        assert stats["decode_backend"] == "opencv"
+        assert "decode_fallbacks" not in stats
+
+    def test_single_failure_reraised(self, decoders, tmp_path, monkeypatch):
+        """Test the original error surfaces when the only available backend fails"""
+        monkeypatch.setattr(config, "DECODE_BACKEND_ORDER", ["pyav"])
+        with pytest.raises(ValueError, match="pyav cannot read this"):
+            extract_frame_array(tmp_path / "clip.mp4", max_frames=4, frame_size=224, decode_backend="pyav")
+
+
+def solid_frames(*scenes):
+    """(N, 8, 8, 3) frames from (count, rgb) runs, one run per scene"""
+    return np.concatenate([
+        np.broadcast_to(np.array(rgb, dtype=np.uint8), (count, 8, 8, 3)) for count, rgb in scenes
+    ])
+
+
+def write_clip(path: Path, scenes, fps: int = 30):
+    """Encode (count, rgb) runs of solid 64x64 frames with PyAV"""
+    import av
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("libx264", rate=fps)
+        stream.width = stream.height = 64
+        stream.pix_fmt = "yuv420p"
+        for count, rgb in scenes:
+            image = np.broadcast_to(np.array(rgb, dtype=np.uint8), (64, 64, 3)).copy()
+            for _ in range(count):
+                for packet in stream.encode(av.VideoFrame.from_ndarray(image, format="rgb24")):
+                    container.mux(packet)
+        for packet in stream.encode():
+            container.mux(packet)
+
+
+class TestSelectSceneFrames:
+    """Tests for picking candidates at scene changes"""
+
+    @pytest.fixture(autouse=True)
+    def no_floor(self, monkeypatch):
+        monkeypatch.setattr(config, "ADAPTIVE_MIN_FRAMES", 1)
+
+    def test_keeps_first_frame_of_each_scene(self):
+        frames = solid_frames((4, (0, 0, 0)), (4, (255, 255, 255)), (4, (128, 128, 128)))
+        assert select_scene_frames(frames, 8).tolist() == [0, 4, 8]
+
+    def test_biggest_changes_win_over_cap(self):
+        frames = solid_frames((4, (0, 0, 0)), (4, (255, 255, 255)), (4, (255, 255, 255)))
+        frames[8:, :, :4] = 0  # Half the frame changes back: a smaller cut than black to white
+        assert select_scene_frames(frames, 8).tolist() == [0, 4, 8]
+        assert select_scene_frames(frames, 2).tolist() == [0, 4]
+
+    def test_static_video_filled_to_floor(self, monkeypatch):
+        monkeypatch.setattr(config, "ADAPTIVE_MIN_FRAMES", 4)
+        frames = solid_frames((12, (40, 40, 40)))
+        assert select_scene_frames(frames, 8).tolist() == [0, 3, 7, 11]
+
+    @pytest.mark.parametrize("count", [0, 1])
+    def test_tiny_inputs(self, count):
+        assert select_scene_frames(solid_frames((count, (0, 0, 0))), 4).tolist() == list(range(count))
+
+
+class TestAdaptiveSampling:
+    """Tests for adaptive sampling through extract_frame_array"""
+
+    SCENES = [(30, (255, 0, 0)), (30, (0, 255, 0)), (30, (0, 0, 255))]
+
+    @pytest.fixture(autouse=True)
+    def no_floor(self, monkeypatch):
+        monkeypatch.setattr(config, "ADAPTIVE_MIN_FRAMES", 1)
+
+    def test_keeps_one_frame_per_scene_in_one_pass(self, tmp_path):
+        """Test each cut yields one frame and the clip is decoded only once"""
+        pytest.importorskip("av")
+        clip = tmp_path / "cuts.mp4"
+        write_clip(clip, self.SCENES)
+
+        frames, stats = extract_frame_array(
+            clip, max_frames=6, frame_size=64, sample_method="adaptive",
+            sample_strategy="sequential", decode_backend="pyav",
+        )
+
+        assert [int(frame.reshape(-1, 3).mean(axis=0).argmax()) for frame in frames] == [0, 1, 2]
+        assert stats["candidate_frames"] == 6 * config.ADAPTIVE_CANDIDATE_FACTOR
+        assert stats["frames_decoded"] <= sum(count for count, _ in self.SCENES)
+
+    def test_selects_from_frames_actually_decoded(self, monkeypatch, tmp_path):
+        """Test a candidate the backend skipped does not shift which frames are kept"""
+        decoded = solid_frames((3, (0, 0, 0)), (2, (255, 255, 255)), (3, (0, 0, 0)))
+
+        class ShortDecoder(FrameDecoder):
+            name = "opencv"
+
+            @classmethod
+            def available(cls):
+                return True
+
+            def decode(self, video_path, max_frames, frame_size, sample_method, sample_strategy):
+                # One fewer frame than the candidates asked for
+                assert len(decoded) == max_frames - 1
+                return decoded, {"sample_strategy": "seek", "frames_decoded": len(decoded), "seeks": 1}
+
+        monkeypatch.setattr(video_processor, "DECODE_BACKENDS", {"opencv": ShortDecoder})
+        monkeypatch.setattr(config, "DECODE_BACKEND_ORDER", ["opencv"])
+        monkeypatch.setattr(config, "ADAPTIVE_CANDIDATE_FACTOR", 3)
+
+        frames, stats = extract_frame_array(
+            tmp_path / "clip.mp4", max_frames=3, frame_size=64, sample_method="adaptive", decode_backend="opencv",
+        )
+
+        assert [int(frame[0, 0, 0]) for frame in frames] == [0, 255, 0]
+        assert stats["candidate_frames"] == 8
+
+
+def textured_frame(seed: int) -> np.ndarray:
+    """64x64 RGB frame of smooth random blobs"""
+    blocks = np.random.default_rng(seed).integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    return cv2.resize(blocks, (64, 64), interpolation=cv2.INTER_CUBIC)
+
+
+def hamming(a, b) -> int:
+    return bin(int(a) ^ int(b)).count("1")
+
+
+@pytest.fixture
+def near_duplicates():
+    """Frames A, A with noise, B, A brightened: shots 0, 1 and 3 are the same"""
+    a = textured_frame(1)
+    noise = np.random.default_rng(0).integers(-3, 4, a.shape)
+    noisy = np.clip(a.astype(int) + noise, 0, 255).astype(np.uint8)
+    brighter = np.clip(a.astype(int) + 20, 0, 255).astype(np.uint8)
+    return np.stack([a, noisy, textured_frame(2), brighter])
+
+
+class TestFrameHashes:
+    """Tests for perceptual frame hashes"""
+
+    @pytest.mark.parametrize("method", ["dhash", "phash"])
+    def test_near_duplicates_hash_close(self, near_duplicates, method):
+        hashes = frame_hashes(near_duplicates, method)
+        assert hashes.dtype == np.uint64 and hashes.shape == (4,)
+        assert hamming(hashes[0], hashes[1]) <= 4
+        assert hamming(hashes[0], hashes[3]) <= 4
+        assert hamming(hashes[0], hashes[2]) > 16
+
+    def test_unknown_method(self, near_duplicates):
+        with pytest.raises(ValueError):
+            frame_hashes(near_duplicates, "ahash")
+
+
+class TestDedupFrames:
+    """Tests for dropping near-duplicate frames"""
+
+    @pytest.mark.parametrize("method", ["dhash", "phash"])
+    def test_near_duplicates_collapse(self, near_duplicates, method):
+        """Test a shot that cuts away and back is kept once"""
+        assert dedup_frames(near_duplicates, 8, method).tolist() == [0, 2]
+
+    @pytest.mark.parametrize("method", ["dhash", "phash"])
+    def test_zero_threshold_keeps_distinct_hashes(self, near_duplicates, method):
+        """Test threshold 0 only drops frames whose hashes are identical"""
+        frames = np.stack([near_duplicates[0], near_duplicates[0], near_duplicates[2]])
+        assert dedup_frames(frames, 0, method).tolist() == [0, 2]
+        assert dedup_frames(near_duplicates[[0, 2]], 0, method).tolist() == [0, 1]
+
+    @pytest.mark.parametrize("count", [0, 1])
+    def test_tiny_inputs(self, count):
+        assert dedup_frames(np.zeros((count, 8, 8, 3), dtype=np.uint8), 8).tolist() == list(range(count))
@@ -0,0 +1,216 @@
+"""
+Thumbnail generation scheduler
+Runs thumbnail jobs on a small fixed pool: on-demand requests (tiles in view)
+go ahead of background pre-generation, concurrent requests for one thumbnail
+share a single job, and queued background work can be cancelled
+"""
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Job priorities, lowest runs first
+FOREGROUND = 0
+BACKGROUND = 1
+
+
+@dataclass
+class _Job:
+    key: str
+    media_path: Path
+    size: int
+    fmt: str
+    priority: int
+    future: Future = field(default_factory=Future)
+    running: bool = False
+
+
+class ThumbnailScheduler:
+    """
+    Priority queue of thumbnail jobs, keyed by thumbnail store key.
+
+    Foreground jobs run newest first: the browser lazy-loads tiles, so the
+    latest requests are the ones on screen after a scroll. Background jobs run
+    oldest first and only while background_allowed() is true, which keeps the
+    workers off the CPU while captioning is decoding. A background job that is
+    requested on demand is promoted instead of queued twice.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Path, str, int, str], Any],
+        workers: int,
+        background_allowed: Optional[Callable[[], bool]] = None,
+    ):
+        self._run = run
+        self._workers = workers
+        self._background_allowed = background_allowed or (lambda: True)
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[int, int, str]] = []  # (priority, order, key)
+        self._jobs: Dict[str, _Job] = {}  # Queued or running
+        self._order = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._epoch = 0  # Workers from an earlier epoch exit
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.promoted = 0
+        self.cancelled = 0
+        # Background jobs finished since the background queue was last empty
+        self._background_done = 0
+        self._background_failed = 0
+
+    def submit(
+        self, key: str, media_path: Path, size: int, fmt: str = "jpeg", priority: int = FOREGROUND
+    ) -> Future:
+        """Queue a job, or return the future of the queued or running job for key"""
+        with self._cond:
+            self._start_workers()
+            job = self._jobs.get(key)
+            if job is not None:
+                self.coalesced += 1
+                if priority < job.priority and not job.running:
+                    job.priority = priority
+                    self.promoted += 1
+                    self._push(job)
+                    self._cond.notify()
+                return job.future
+            job = self._jobs[key] = _Job(key, media_path, size, fmt, priority)
+            self._push(job)
+            self._cond.notify()
+            return job.future
+
+    def cancel_background(self) -> int:
+        """Drop queued background jobs (running ones finish). Returns number cancelled."""
+        with self._cond:
+            stale = [
+                key for key, job in self._jobs.items()
+                if job.priority == BACKGROUND and not job.running
+            ]
+            for key in stale:
+                self._jobs.pop(key).future.cancel()
+            self._heap = [entry for entry in self._heap if entry[2] in self._jobs]
+            heapq.heapify(self._heap)
+            self.cancelled += len(stale)
+            self._finish_background_pass()
+            return len(stale)
+
+    def stop(self) -> None:
+        """Cancel every queued job and stop the workers after their current job"""
+        with self._cond:
+            for key in [key for key, job in self._jobs.items() if not job.running]:
+                self._jobs.pop(key).future.cancel()
+            self._heap.clear()
+            self._threads = []
+            self._epoch += 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = [job for job in self._jobs.values() if not job.running]
+            return {
+                "workers": self._workers,
+                "running": len(self._jobs) - len(queued),
+                "queued_foreground": sum(1 for job in queued if job.priority == FOREGROUND),
+                "queued_background": sum(1 for job in queued if job.priority == BACKGROUND),
+                "completed": self.completed,
+                "failed": self.failed,
+                "coalesced": self.coalesced,
+                "promoted": self.promoted,
+                "cancelled": self.cancelled,
+            }
+
+    def _push(self, job: _Job) -> None:
+        """Add a heap entry for job (called under lock); superseded entries are skipped on pop"""
+        order = next(self._order)
+        heapq.heappush(self._heap, (job.priority, -order if job.priority == FOREGROUND else order, job.key))
+
+    def _start_workers(self) -> None:
+        """Start the worker threads on first use (called under lock)"""
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(
+                target=self._worker, args=(self._epoch,), name=f"thumb-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _pop_runnable(self) -> Tuple[Optional[_Job], bool]:
+        """
+        Next job to run, and whether a background job is waiting for
+        background_allowed() (called under lock)
+        """
+        while self._heap:
+            priority, _order, key = self._heap[0]
+            job = self._jobs.get(key)
+            if job is None or job.running or job.priority != priority:
+                heapq.heappop(self._heap)
+                continue
+            if priority == BACKGROUND and not self._background_allowed():
+                return None, True
+            heapq.heappop(self._heap)
+            job.running = True
+            return job, False
+        return None, False
+
+    def _worker(self, epoch: int) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._epoch != epoch:
+                        return
+                    job, held = self._pop_runnable()
+                    if job is not None:
+                        break
+                    # Nothing signals when captioning stops, so held work is re-checked
+                    self._cond.wait(timeout=1.0 if held else None)
+
+            if not job.future.set_running_or_notify_cancel():
+                with self._cond:
+                    self._forget(job)
+                continue
+
+            try:
+                result = self._run(job.media_path, job.key, job.size, job.fmt)
+                ok = bool(getattr(result, "ok", True))
+                error = None
+            except Exception as e:
+                ok, error = False, e
+                print(f"[ThumbnailScheduler] Job for {job.media_path.name} failed: {e}")
+
+            with self._cond:
+                self._forget(job)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                if job.priority == BACKGROUND:
+                    self._background_done += 1
+                    self._background_failed += 0 if ok else 1
+                    self._finish_background_pass()
+
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+    def _forget(self, job: _Job) -> None:
+        """Remove a finished job (called under lock)"""
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+
+    def _finish_background_pass(self) -> None:
+        """Log once the background queue empties (called under lock)"""
+        if not self._background_done:
+            return
+        if any(job.priority == BACKGROUND for job in self._jobs.values()):
+            return
+        print(
+            f"[ThumbnailScheduler] Background pass finished: "
+            f"{self._background_done - self._background_failed} generated, {self._background_failed} failed"
+        )
+        self._background_done = 0
+        self._background_failed = 0
@@ -0,0 +1,114 @@
+"""
+Thumbnail sprite sheets
+Packs the thumbnails of one grid page into a single image so the page costs
+one request instead of one per tile
+"""
+
+import hashlib
+import io
+import json
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend import config
+from backend.thumbnailer import encode_thumbnail
+
+
+@dataclass
+class SpriteSheet:
+    """One composed sheet, its layout and its encodings by format"""
+    size: int
+    columns: int
+    width: int
+    height: int
+    tiles: Dict[str, Tuple[int, int]]  # name -> (x, y) of the tile's top-left corner
+    missing: List[str]
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+def make_sprite_id(names: List[str], keys: List[Optional[str]], size: int, columns: int) -> str:
+    """
+    Id from the requested names, their thumbnail store keys (which cover file
+    identity; None for names that did not resolve) and the layout
+    """
+    raw = json.dumps([names, keys, size, columns])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def compose_sheet(tiles: List[bytes], size: int, columns: int) -> np.ndarray:
+    """Paste encoded square thumbnails into a grid, left to right, top to bottom"""
+    from PIL import Image as PILImage
+
+    rows = max(1, math.ceil(len(tiles) / columns))
+    sheet = np.zeros((rows * size, columns * size, 3), dtype=np.uint8)
+    for index, data in enumerate(tiles):
+        with PILImage.open(io.BytesIO(data)) as img:
+            tile = img.convert("RGB")
+            if tile.size != (size, size):
+                # Sources smaller than the bucket give smaller thumbnails
+                tile = tile.resize((size, size), PILImage.Resampling.BILINEAR)
+            row, column = divmod(index, columns)
+            sheet[row * size:(row + 1) * size, column * size:(column + 1) * size] = np.asarray(tile)
+    return sheet
+
+
+class SpriteSheets:
+    """
+    Recently built sheets, least recently used evicted past max_entries.
+    A sheet is encoded in the format it was built with and transcoded on the
+    first request for another one.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._sheets: "OrderedDict[str, SpriteSheet]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sprite_id: str) -> Optional[SpriteSheet]:
+        with self._lock:
+            sheet = self._sheets.get(sprite_id)
+            if sheet is not None:
+                self._sheets.move_to_end(sprite_id)
+            return sheet
+
+    def put(self, sprite_id: str, sheet: SpriteSheet) -> None:
+        with self._lock:
+            self._sheets[sprite_id] = sheet
+            self._sheets.move_to_end(sprite_id)
+            while len(self._sheets) > self.max_entries:
+                self._sheets.popitem(last=False)
+
+    def encoded(self, sprite_id: str, fmt: str) -> Optional[bytes]:
+        """Sheet bytes in fmt, transcoding from a stored encoding if needed"""
+        from PIL import Image as PILImage
+
+        sheet = self.get(sprite_id)
+        if sheet is None:
+            return None
+        data = sheet.encoded.get(fmt)
+        if data is None:
+            source = next(iter(sheet.encoded.values()))
+            with PILImage.open(io.BytesIO(source)) as img:
+                data = encode_thumbnail(np.asarray(img.convert("RGB")), fmt)
+            if data is not None:
+                sheet.encoded[fmt] = data
+        return data
+
+
+_sprite_sheets: Optional[SpriteSheets] = None
+_sprite_sheets_lock = threading.Lock()
+
+
+def get_sprite_sheets() -> SpriteSheets:
+    """Return the shared sprite sheet cache"""
+    global _sprite_sheets
+
+    with _sprite_sheets_lock:
+        if _sprite_sheets is None:
+            _sprite_sheets = SpriteSheets(config.THUMBNAIL_SPRITE_CACHE_SIZE)
+        return _sprite_sheets
@@ -0,0 +1,362 @@
+"""
+Packed thumbnail store
+Keeps generated thumbnails in a few large append-only pack files instead of
+one file per thumbnail, with a SQLite index, a byte budget and LRU eviction
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from backend import config
+
+
+class ThumbnailStore:
+    """
+    Thumbnails packed into append-only files with an index of
+    key -> (pack, offset, length, last access).
+
+    New thumbnails are appended to the active pack, which is sealed once it
+    reaches pack_max_bytes. When live thumbnails exceed max_bytes the least
+    recently used are dropped from the index; their bytes stay in the pack
+    until compaction rewrites a sealed pack that is mostly dead. Lookups use
+    the in-memory index only, so a hit costs one read of the pack file.
+
+    A single process owns the store (the API server); bytes are appended
+    before their index row is committed, so a crash only leaves dead bytes.
+    """
+
+    def __init__(self, store_dir: Path, max_bytes: int, pack_max_bytes: int, compact_ratio: float):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.pack_max_bytes = pack_max_bytes
+        self.compact_ratio = compact_ratio
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compactions = 0
+        self._lock = threading.Lock()
+        # key -> (pack, offset, length), least recently used first
+        self._entries: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self._pack_sizes: Dict[int, int] = {}
+        self._pack_live: Dict[int, int] = {}
+        self._live_bytes = 0
+        self._readers: Dict[int, BinaryIO] = {}
+        self._writer: Optional[BinaryIO] = None
+        self._active_pack = 0
+        # Access times not yet written to the index
+        self._touched: Dict[str, float] = {}
+
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(store_dir / "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            " key TEXT PRIMARY KEY,"
+            " pack INTEGER NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._load()
+
+    @staticmethod
+    def make_key(media_path: Path, stat: os.stat_result, size: int, fmt: str = "jpeg") -> str:
+        """Key from the file identity, thumbnail size and format"""
+        raw = f"{media_path}|{stat.st_mtime_ns}|{stat.st_size}|{size}|{fmt}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _pack_path(self, pack: int) -> Path:
+        return self.store_dir / f"{pack:06d}.pack"
+
+    def _load(self) -> None:
+        """Rebuild the in-memory index, dropping rows whose bytes never reached disk"""
+        with os.scandir(self.store_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".pack") and entry.name[:-5].isdigit():
+                    self._pack_sizes[int(entry.name[:-5])] = entry.stat().st_size
+
+        lost = []
+        for key, pack, offset, length in self._conn.execute(
+            "SELECT key, pack, offset, length FROM thumbnails ORDER BY last_access"
+        ):
+            if offset + length > self._pack_sizes.get(pack, -1):
+                lost.append((key,))
+                continue
+            self._entries[key] = (pack, offset, length)
+            self._pack_live[pack] = self._pack_live.get(pack, 0) + length
+            self._live_bytes += length
+        if lost:
+            self._conn.executemany("DELETE FROM thumbnails WHERE key = ?", lost)
+            self._conn.commit()
+
+        # Packs without a single indexed thumbnail are garbage
+        for pack in [p for p in self._pack_sizes if p not in self._pack_live]:
+            self._delete_pack(pack)
+
+        self._active_pack = max(self._pack_sizes, default=0)
+        if self._pack_sizes.get(self._active_pack, 0) >= self.pack_max_bytes:
+            self._active_pack += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Thumbnail bytes for key, or None on a miss"""
+        with self._lock:
+            location = self._entries.get(key)
+            if location is None:
+                self.misses += 1
+                return None
+            pack, offset, length = location
+            try:
+                reader = self._reader(pack)
+                reader.seek(offset)
+                data = reader.read(length)
+            except OSError:
+                data = b""
+            if len(data) != length:
+                self._remove(key)
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._touched[key] = time.time()
+            if len(self._touched) >= 256:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += 1
+            return data
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: str, data: bytes) -> None:
+        """Append a thumbnail, then evict and compact as needed"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            try:
+                self._append(key, data)
+            except OSError as e:
+                print(f"[ThumbnailStore] Failed to store thumbnail: {e}")
+                return
+            self._evict()
+            self._flush_touched()
+            self._conn.commit()
+            self._compact_sealed()
+
+    def _reader(self, pack: int) -> BinaryIO:
+        """Open read handle for pack (called under lock)"""
+        reader = self._readers.get(pack)
+        if reader is None:
+            if pack == self._active_pack and self._writer is not None:
+                self._writer.flush()
+            reader = self._readers[pack] = open(self._pack_path(pack), "rb")
+        return reader
+
+    def _write(self, data: bytes) -> Tuple[int, int]:
+        """Append data to the active pack, returning (pack, offset) (called under lock)"""
+        size = self._pack_sizes.get(self._active_pack, 0)
+        if size > 0 and size + len(data) > self.pack_max_bytes:
+            self._seal()
+            size = 0
+        try:
+            if self._writer is None:
+                self._writer = open(self._pack_path(self._active_pack), "ab")
+            self._writer.write(data)
+            self._writer.flush()  # Visible to the read handle before it is indexed
+        except OSError:
+            self._seal()  # A partial write would shift every later offset
+            raise
+        self._pack_sizes[self._active_pack] = size + len(data)
+        self._pack_live[self._active_pack] = self._pack_live.get(self._active_pack, 0) + len(data)
+        return self._active_pack, size
+
+    def _append(self, key: str, data: bytes) -> None:
+        """Store data as a new most recently used entry (called under lock, caller commits)"""
+        pack, offset = self._write(data)
+        self._live_bytes += len(data)
+        self._entries[key] = (pack, offset, len(data))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO thumbnails (key, pack, offset, length, last_access)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (key, pack, offset, len(data), time.time()),
+        )
+
+    def _seal(self) -> None:
+        """Close the active pack and start a new one (called under lock)"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._active_pack += 1
+
+    def _remove(self, key: str) -> None:
+        """Drop key from the index; its bytes become dead (called under lock, caller commits)"""
+        pack, _offset, length = self._entries.pop(key)
+        self._pack_live[pack] -= length
+        self._live_bytes -= length
+        self._touched.pop(key, None)
+        self._conn.execute("DELETE FROM thumbnails WHERE key = ?", (key,))
+
+    def _evict(self) -> None:
+        """Evict least recently used thumbnails until under budget (called under lock)"""
+        while self._live_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _flush_touched(self) -> None:
+        """Write pending access times to the index (called under lock, caller commits)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE thumbnails SET last_access = ? WHERE key = ?",
+                [(stamp, key) for key, stamp in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _delete_pack(self, pack: int) -> None:
+        """Remove a pack file with no live thumbnails (called under lock)"""
+        reader = self._readers.pop(pack, None)
+        if reader is not None:
+            reader.close()
+        if pack == self._active_pack and self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        try:
+            self._pack_path(pack).unlink(missing_ok=True)
+        except OSError:
+            return  # Retried on next start
+        self._pack_sizes.pop(pack, None)
+        self._pack_live.pop(pack, None)
+
+    def _compact_sealed(self) -> None:
+        """Rewrite sealed packs whose dead share exceeds compact_ratio (called under lock)"""
+        for pack in sorted(self._pack_sizes):
+            if pack == self._active_pack:
+                continue
+            size = self._pack_sizes[pack]
+            live = self._pack_live.get(pack, 0)
+            if size == 0 or (size - live) / size < self.compact_ratio:
+                continue
+            self._compact_pack(pack)
+
+    def _compact_pack(self, pack: int) -> None:
+        """Move a pack's live thumbnails to the active pack and delete it (called under lock)"""
+        moved = [(key, location) for key, location in self._entries.items() if location[0] == pack]
+        try:
+            reader = self._reader(pack)
+            for key, (_pack, offset, length) in moved:
+                reader.seek(offset)
+                data = reader.read(length)
+                if len(data) != length:
+                    raise OSError("short read")
+                new_pack, new_offset = self._write(data)
+                # Assigning an existing key keeps its place in the LRU order
+                self._entries[key] = (new_pack, new_offset, length)
+                self._pack_live[pack] -= length
+                self._conn.execute(
+                    "UPDATE thumbnails SET pack = ?, offset = ? WHERE key = ?",
+                    (new_pack, new_offset, key),
+                )
+        except OSError as e:
+            print(f"[ThumbnailStore] Compaction of pack {pack} failed: {e}")
+            self._conn.commit()
+            return
+        self._conn.commit()
+        self._delete_pack(pack)
+        self.compactions += 1
+
+    def compact(self) -> int:
+        """Compact every sealed pack with dead bytes. Returns number of packs compacted."""
+        with self._lock:
+            before = self.compactions
+            for pack in sorted(self._pack_sizes):
+                if pack != self._active_pack and self._pack_live.get(pack, 0) < self._pack_sizes[pack]:
+                    self._compact_pack(pack)
+            return self.compactions - before
+
+    def clear(self) -> int:
+        """Remove every stored thumbnail. Returns number removed."""
+        with self._lock:
+            count = len(self._entries)
+            self._conn.execute("DELETE FROM thumbnails")
+            self._conn.commit()
+            self._entries.clear()
+            self._touched.clear()
+            self._live_bytes = 0
+            for pack in list(self._pack_sizes):
+                self._pack_live[pack] = 0
+                self._delete_pack(pack)
+            self._active_pack = max(self._pack_sizes, default=-1) + 1
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and sizes for reporting"""
+        with self._lock:
+            disk_bytes = sum(self._pack_sizes.values())
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "compactions": self.compactions,
+                "entries": len(self._entries),
+                "packs": len(self._pack_sizes),
+                "live_bytes": self._live_bytes,
+                "disk_bytes": disk_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Per-file JPEG cache used before the packed store
+_LEGACY_CACHE_DIR = config.PROJECT_ROOT / ".thumbnail_cache"
+
+
+def remove_legacy_cache(cache_dir: Path) -> int:
+    """
+    Delete the thumbnails of the old per-file cache. Their names hash the
+    file name and a float mtime, so they cannot be mapped to store keys and
+    would only be regenerated. Files other than thumbnails are left alone.
+    Returns the number of thumbnails deleted.
+    """
+    if not cache_dir.is_dir():
+        return 0
+
+    removed = 0
+    for path in cache_dir.glob("*.jpg"):
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    try:
+        cache_dir.rmdir()
+    except OSError:
+        pass  # Not empty
+    if removed:
+        print(f"[ThumbnailStore] Removed {removed} thumbnails from the old cache at {cache_dir}")
+    return removed
+
+
+_thumbnail_store: Optional[ThumbnailStore] = None
+_thumbnail_store_lock = threading.Lock()
+
+
+def get_thumbnail_store() -> ThumbnailStore:
+    """Return the shared thumbnail store (opening it removes the old per-file cache)"""
+    global _thumbnail_store
+
+    with _thumbnail_store_lock:
+        if _thumbnail_store is None:
+            remove_legacy_cache(_LEGACY_CACHE_DIR)
+            _thumbnail_store = ThumbnailStore(
+                config.THUMBNAIL_STORE_DIR,
+                config.THUMBNAIL_STORE_MAX_BYTES,
+                config.THUMBNAIL_PACK_MAX_BYTES,
+                config.THUMBNAIL_COMPACT_RATIO,
+            )
+        return _thumbnail_store
@@ -0,0 +1,369 @@
+"""
+Thumbnail generation
+Video thumbnails are grabbed in-process (PyAV, then OpenCV): one seek to the
+keyframe nearest THUMBNAIL_SEEK_SECONDS, one decoded frame, a fast area
+downscale and a center crop. An ffmpeg subprocess is only used for files
+neither can read. Images go through PIL. Thumbnails are encoded as JPEG,
+WebP or AVIF, whichever the client accepts and this build can write.
+"""
+
+import io
+import math
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from backend import config
+from backend.video_processor import _has_ffmpeg
+
+try:
+    import av
+    _HAS_AV = True
+except ImportError:
+    _HAS_AV = False
+
+
+@dataclass
+class ThumbnailResult:
+    """Outcome of one thumbnail generation"""
+    ok: bool
+    backend: Optional[str] = None  # pyav, opencv, ffmpeg or pil
+    elapsed_ms: float = 0.0
+    data: Optional[bytes] = None  # Encoded image in fmt
+
+
+def _cover_dims(width: int, height: int, size: int) -> tuple:
+    """Dimensions that cover a size x size square while keeping the aspect ratio"""
+    scale = size / min(width, height)
+    return max(size, round(width * scale)), max(size, round(height * scale))
+
+
+def _center_crop(rgb: np.ndarray, size: int) -> np.ndarray:
+    """
+    Scale so the short side is size, then crop the center square. Sources
+    smaller than size are scaled up, as the ffmpeg fallback's scale+crop does,
+    so every thumbnail is exactly size x size.
+    """
+    height, width = rgb.shape[:2]
+    if min(width, height) != size:
+        out_width, out_height = _cover_dims(width, height, size)
+        interpolation = cv2.INTER_AREA if min(width, height) > size else cv2.INTER_CUBIC
+        rgb = cv2.resize(rgb, (out_width, out_height), interpolation=interpolation)
+        height, width = out_height, out_width
+    top = (height - size) // 2
+    left = (width - size) // 2
+    return rgb[top:top + size, left:left + size]
+
+
+def _grab_pyav(video_path: Path, size: int) -> Optional[np.ndarray]:
+    """Decode only the keyframe at or before the seek target, scaled to cover size while converting"""
+    with av.open(str(video_path)) as container:
+        if not container.streams.video:
+            return None
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"  # Only keyframes are decoded
+
+        seek_seconds = config.THUMBNAIL_SEEK_SECONDS
+        if container.duration:
+            seek_seconds = min(seek_seconds, container.duration / av.time_base / 2)
+        if seek_seconds > 0:
+            start_pts = stream.start_time or 0
+            container.seek(start_pts + int(seek_seconds / stream.time_base), stream=stream)
+
+        for frame in container.decode(stream):
+            out_width, out_height = _cover_dims(frame.width, frame.height, size)
+            interpolation = "AREA" if out_width < frame.width else "BICUBIC"
+            return frame.reformat(
+                width=out_width, height=out_height, format="rgb24", interpolation=interpolation
+            ).to_ndarray()
+    return None
+
+
+def _grab_opencv(video_path: Path, size: int) -> Optional[np.ndarray]:
+    """Read one frame near the seek target with cv2.VideoCapture"""
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        target = int(config.THUMBNAIL_SEEK_SECONDS * fps)
+        if total_frames:
+            target = min(target, total_frames // 2)
+        if target > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        ok, frame = cap.read()
+        if not ok and target > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = cap.read()
+        if not ok:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    finally:
+        cap.release()
+
+
+_GRABBERS: Dict[str, Callable[[Path, int], Optional[np.ndarray]]] = {
+    "pyav": _grab_pyav,
+    "opencv": _grab_opencv,
+}
+
+
+def _available(backend: str) -> bool:
+    if backend == "pyav":
+        return _HAS_AV
+    if backend == "ffmpeg":
+        return _has_ffmpeg()
+    return backend in _GRABBERS
+
+
+# Thumbnail formats: media type and PIL encoder name
+FORMAT_MEDIA_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "avif": "image/avif"}
+_PIL_FORMATS = {"jpeg": "JPEG", "webp": "WEBP", "avif": "AVIF"}
+
+_formats: Optional[List[str]] = None
+
+
+def available_formats() -> List[str]:
+    """Configured thumbnail formats this Pillow build can encode, in preference order"""
+    global _formats
+    if _formats is None:
+        from PIL import features
+
+        supported = {"jpeg"}
+        for fmt in ("webp", "avif"):
+            try:
+                if features.check(fmt):
+                    supported.add(fmt)
+            except ValueError:
+                pass  # Pillow too old to know the format
+        _formats = [fmt for fmt in config.THUMBNAIL_FORMATS if fmt in supported]
+        if "jpeg" not in _formats:
+            _formats.append("jpeg")
+    return _formats
+
+
+def preferred_format() -> str:
+    """Format generated ahead of time, before any client has asked"""
+    return available_formats()[0]
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """
+    First available format the Accept header names explicitly with q > 0.
+    Wildcards do not count (every browser sends image/*), so JPEG is the fallback.
+    """
+    accepted = set()
+    for part in (accept or "").lower().split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(media_type.strip())
+    for fmt in available_formats():
+        if fmt == "jpeg" or FORMAT_MEDIA_TYPES[fmt] in accepted:
+            return fmt
+    return "jpeg"
+
+
+def snap_size(size: int) -> int:
+    """Smallest size bucket at least as large as size (the largest bucket caps it)"""
+    buckets = sorted(config.THUMBNAIL_SIZE_BUCKETS)
+    for bucket in buckets:
+        if bucket >= size:
+            return bucket
+    return buckets[-1]
+
+
+def _encode_pil(img, fmt: str) -> bytes:
+    options = {
+        "jpeg": {"quality": config.THUMBNAIL_JPEG_QUALITY},
+        "webp": {"quality": config.THUMBNAIL_WEBP_QUALITY, "method": 4},
+        "avif": {"quality": config.THUMBNAIL_AVIF_QUALITY, "speed": 8},
+    }[fmt]
+    buffer = io.BytesIO()
+    img.save(buffer, _PIL_FORMATS[fmt], **options)
+    return buffer.getvalue()
+
+
+def encode_thumbnail(rgb: np.ndarray, fmt: str = "jpeg") -> Optional[bytes]:
+    """Encode an RGB (or grayscale) array in fmt"""
+    if fmt == "jpeg":
+        ok, encoded = cv2.imencode(
+            ".jpg", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR) if rgb.ndim == 3 else rgb,
+            [cv2.IMWRITE_JPEG_QUALITY, config.THUMBNAIL_JPEG_QUALITY],
+        )
+        return encoded.tobytes() if ok else None
+
+    from PIL import Image as PILImage
+
+    return _encode_pil(PILImage.fromarray(np.ascontiguousarray(rgb)), fmt)
+
+
+def generate_ffmpeg_thumbnail(video_path: Path, size: int = 160) -> Optional[bytes]:
+    """Generate thumbnail for a video file with an ffmpeg subprocess (fallback)"""
+    try:
+        cmd = [
+            "ffmpeg", "-v", "error",
+            "-ss", str(config.THUMBNAIL_SEEK_SECONDS),  # Input seek: jumps to the nearest keyframe
+            "-i", str(video_path),
+            "-an", "-sn",
+            "-vframes", "1",    # Extract 1 frame
+            "-vf", f"scale={size}:{size}:force_original_aspect_ratio=increase,crop={size}:{size}",
+            "-q:v", "3",        # Quality (2-5 is good)
+            "-f", "mjpeg", "pipe:1",
+        ]
+        result = subprocess.run(cmd, capture_output=True, timeout=10)
+        return result.stdout or None
+    except Exception as e:
+        print(f"[Thumbnailer] ffmpeg thumbnail failed for {video_path}: {e}")
+        return None
+
+
+def render_video_frame(video_path: Path, size: int) -> tuple:
+    """
+    Square RGB thumbnail frame from the first in-process backend that can read
+    the file. Returns (array, backend) or (None, None).
+    """
+    for backend in config.THUMBNAIL_BACKEND_ORDER:
+        grab = _GRABBERS.get(backend)
+        if grab is None or not _available(backend):
+            continue
+        try:
+            rgb = grab(video_path, size)
+        except Exception as e:
+            print(f"[Thumbnailer] {backend} could not read {video_path.name}: {e}")
+            continue
+        if rgb is not None:
+            return _center_crop(rgb, size), backend
+    return None, None
+
+
+def generate_video_thumbnail(video_path: Path, size: int = 160, fmt: str = "jpeg") -> ThumbnailResult:
+    """Generate a video thumbnail in-process, falling back to ffmpeg"""
+    start = time.perf_counter()
+    rgb, backend = render_video_frame(video_path, size)
+    data = encode_thumbnail(rgb, fmt) if rgb is not None else None
+
+    if data is None and "ffmpeg" in config.THUMBNAIL_BACKEND_ORDER and _available("ffmpeg"):
+        backend = "ffmpeg"
+        data = generate_ffmpeg_thumbnail(video_path, size)
+        if data is not None and fmt != "jpeg":
+            decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            data = encode_thumbnail(cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB), fmt) if decoded is not None else None
+
+    ok = data is not None
+    return _record(ThumbnailResult(ok, backend if ok else None, (time.perf_counter() - start) * 1000, data))
+
+
+# Captioning frames are reused only if they need at most this much upscaling
+_MIN_FRAME_SCALE = 0.75
+
+
+def thumbnail_from_frames(
+    frames: np.ndarray, duration: Optional[float], size: int, fmt: str = "jpeg"
+) -> Optional[ThumbnailResult]:
+    """
+    Video thumbnail from frames already decoded for captioning, using the
+    first sampled frame at or after the seek target. None if the frames are
+    too small.
+    """
+    count, height, width = frames.shape[:3]
+    if count == 0 or min(width, height) < size * _MIN_FRAME_SCALE:
+        return None
+
+    start = time.perf_counter()
+    index = 0
+    if duration and count > 1:
+        # Frames are spread evenly from the first to the last, so frame i is at
+        # about i / (count - 1) * duration. Rounding to the nearest frame picked
+        # frame 0 (often black) for any video longer than a few seek targets
+        seek_seconds = min(config.THUMBNAIL_SEEK_SECONDS, duration / 2)
+        position = seek_seconds / duration * (count - 1)
+        index = min(count - 1, max(1, math.ceil(position - 1e-9)))
+    rgb = _center_crop(np.asarray(frames[index]), size)
+    data = encode_thumbnail(rgb, fmt)
+    ok = data is not None
+    return _record(ThumbnailResult(ok, "frames" if ok else None, (time.perf_counter() - start) * 1000, data))
+
+
+def generate_image_thumbnail(image_path: Path, size: int = 160, fmt: str = "jpeg") -> ThumbnailResult:
+    """Generate thumbnail for an image file using PIL"""
+    from PIL import Image as PILImage
+
+    start = time.perf_counter()
+    data = None
+    try:
+        with PILImage.open(image_path) as img:
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            # Resize maintaining aspect ratio then center-crop to square
+            img.thumbnail((size * 2, size * 2), PILImage.Resampling.LANCZOS)
+            width, height = img.size
+            left = (width - min(width, size)) // 2
+            top = (height - min(height, size)) // 2
+            right = left + min(width, size)
+            bottom = top + min(height, size)
+            img = img.crop((left, top, right, bottom))
+            data = _encode_pil(img, fmt)
+    except Exception as e:
+        print(f"[Thumbnailer] Image thumbnail failed for {image_path}: {e}")
+    ok = data is not None
+    return _record(ThumbnailResult(ok, "pil" if ok else None, (time.perf_counter() - start) * 1000, data))
+
+
+def generate_any_thumbnail(media_path: Path, size: int, fmt: str = "jpeg") -> ThumbnailResult:
+    """Route to the correct thumbnail generator based on file extension"""
+    if media_path.suffix.lower() in config.IMAGE_EXTENSIONS:
+        return generate_image_thumbnail(media_path, size, fmt)
+    return generate_video_thumbnail(media_path, size, fmt)
+
+
+# Latency per backend since startup
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}
+_failures = 0
+
+
+def _record(result: ThumbnailResult) -> ThumbnailResult:
+    global _failures
+    with _stats_lock:
+        if not result.ok:
+            _failures += 1
+        else:
+            entry = _stats.setdefault(result.backend, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += result.elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], result.elapsed_ms)
+    return result
+
+
+def thumbnail_stats() -> Dict[str, Any]:
+    """Generation counts and latency per backend"""
+    with _stats_lock:
+        backends = {
+            name: {
+                "count": int(entry["count"]),
+                "avg_ms": round(entry["total_ms"] / entry["count"], 2),
+                "max_ms": round(entry["max_ms"], 2),
+            }
+            for name, entry in _stats.items()
+        }
+        return {"backends": backends, "failures": _failures}
+
+
+def available_backends() -> List[str]:
+    """Configured video thumbnail backends usable here, in order"""
+    return [backend for backend in config.THUMBNAIL_BACKEND_ORDER if _available(backend)]
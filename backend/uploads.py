@@ -0,0 +1,184 @@
+"""
+Media uploads
+Uploads are streamed to a hidden part file next to their destination and
+renamed into place once complete, so partial files never show up in the
+library. Resumable sessions let a client declare a file and its size, then
+send the bytes in any number of requests, each starting at the offset the
+server already has.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Set
+
+from backend import config
+
+
+def part_path_for(target: Path, token: str) -> Path:
+    """Hidden part file beside target, so the final rename is atomic"""
+    return target.with_name(f".{target.name}.{token}.part")
+
+
+def save_upload(source: BinaryIO, target: Path) -> int:
+    """Copy source to target in chunks through a part file. Returns bytes written."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    part_path = part_path_for(target, uuid.uuid4().hex)
+    try:
+        with open(part_path, "wb") as f:
+            # Buffered copy; the file is never held in memory as a whole
+            while chunk := source.read(config.UPLOAD_CHUNK_BYTES):
+                f.write(chunk)
+            size = f.tell()
+        os.replace(part_path, target)
+    finally:
+        part_path.unlink(missing_ok=True)
+    return size
+
+
+@dataclass
+class UploadSession:
+    """One declared upload and where its bytes go"""
+    upload_id: str
+    filename: str  # Relative to the working directory it was created in
+    target: str  # Absolute destination path
+    size_bytes: int
+    created: float
+    updated: float
+
+    @property
+    def target_path(self) -> Path:
+        return Path(self.target)
+
+    @property
+    def part_path(self) -> Path:
+        return part_path_for(self.target_path, self.upload_id)
+
+    def offset(self) -> int:
+        """Bytes received so far (the part file size)"""
+        try:
+            return self.part_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+
+class UploadSessions:
+    """
+    Upload sessions persisted as one small JSON file each, so uploads can be
+    resumed after a server restart. The part file is the source of truth for
+    the offset. Sessions idle for longer than ttl are deleted with their part
+    files; one request at a time may write to a session.
+    """
+
+    def __init__(self, session_dir: Path, ttl: float):
+        self.session_dir = session_dir
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, UploadSession] = {}
+        self._active: Set[str] = set()
+
+    def _session_path(self, upload_id: str) -> Path:
+        return self.session_dir / f"{upload_id}.json"
+
+    def _save(self, session: UploadSession) -> None:
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._session_path(session.upload_id).with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(asdict(session)), encoding="utf-8")
+        os.replace(tmp_path, self._session_path(session.upload_id))
+
+    def create(self, filename: str, target: Path, size_bytes: int) -> UploadSession:
+        """Start a session with an empty part file"""
+        self.expire()
+        now = time.time()
+        session = UploadSession(uuid.uuid4().hex, filename, str(target), size_bytes, now, now)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        session.part_path.touch()
+        self._save(session)
+        with self._lock:
+            self._sessions[session.upload_id] = session
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        """Session by id, loading it from disk after a restart"""
+        if not upload_id.isalnum():
+            return None
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None:
+                return session
+            try:
+                data = json.loads(self._session_path(upload_id).read_text(encoding="utf-8"))
+                session = UploadSession(**data)
+            except (OSError, ValueError, TypeError):
+                return None
+            self._sessions[upload_id] = session
+            return session
+
+    def acquire(self, upload_id: str) -> bool:
+        """Claim the session for one writing request; False if another holds it"""
+        with self._lock:
+            if upload_id in self._active:
+                return False
+            self._active.add(upload_id)
+            return True
+
+    def release(self, upload_id: str) -> None:
+        with self._lock:
+            self._active.discard(upload_id)
+
+    def touch(self, session: UploadSession) -> None:
+        """Record activity so an upload in progress is not expired"""
+        session.updated = time.time()
+        self._save(session)
+
+    def complete(self, session: UploadSession) -> None:
+        """Move the finished part file into place and forget the session"""
+        os.replace(session.part_path, session.target_path)
+        self._forget(session.upload_id)
+
+    def abort(self, session: UploadSession) -> None:
+        """Delete the part file and forget the session"""
+        session.part_path.unlink(missing_ok=True)
+        self._forget(session.upload_id)
+
+    def _forget(self, upload_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+        self._session_path(upload_id).unlink(missing_ok=True)
+
+    def expire(self) -> int:
+        """Delete sessions idle for longer than ttl. Returns number deleted."""
+        if not self.session_dir.exists():
+            return 0
+        cutoff = time.time() - self.ttl
+        expired = 0
+        for path in self.session_dir.glob("*.json"):
+            session = self.get(path.stem)
+            if session is None or session.updated >= cutoff:
+                continue
+            with self._lock:
+                if session.upload_id in self._active:
+                    continue
+            self.abort(session)
+            expired += 1
+        if expired:
+            print(f"[Uploads] Expired {expired} abandoned upload(s)")
+        return expired
+
+
+_upload_sessions: Optional[UploadSessions] = None
+_upload_sessions_lock = threading.Lock()
+
+
+def get_upload_sessions() -> UploadSessions:
+    """Return the shared upload session registry"""
+    global _upload_sessions
+
+    with _upload_sessions_lock:
+        if _upload_sessions is None:
+            _upload_sessions = UploadSessions(config.UPLOAD_SESSION_DIR, config.UPLOAD_SESSION_TTL)
+        return _upload_sessions
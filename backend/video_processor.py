@@ -3,16 +3,27 @@ Video Processing Utilities
 Extract and process frames from video files
 """
 
+import abc
 import os
+import json
+import shutil
+import subprocess
 import cv2
 import numpy as np
 from PIL import Image
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple, Type
 import time
 
 from backend import config
 
+try:
+    import av
+    _HAS_AV = True
+except ImportError:
+    _HAS_AV = False
+
 # Pre-compute extension sets for fast lookup
 _VIDEO_EXT_SET = {ext.lower() for ext in config.VIDEO_EXTENSIONS}
 _IMAGE_EXT_SET = {ext.lower() for ext in config.IMAGE_EXTENSIONS}
@@ -32,6 +43,10 @@ def get_video_info(video_path: Path) -> dict:
     cap = cv2.VideoCapture(str(video_path))
 
     if not cap.isOpened():
+        cap.release()
+        if _has_ffmpeg():
+            # Codec or container missing from the OpenCV build; ask ffprobe
+            return _probe_video(video_path)
         raise ValueError(f"Cannot open video: {video_path}")
 
     info = {
@@ -51,11 +66,554 @@ def get_video_info(video_path: Path) -> dict:
     return info
 
 
+@lru_cache(maxsize=1)
+def _has_ffmpeg() -> bool:
+    """Whether ffmpeg and ffprobe are on PATH"""
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def _parse_rate(rate: Optional[str]) -> float:
+    """Parse an ffprobe rational like "30000/1001" (0.0 if unknown)"""
+    if not rate:
+        return 0.0
+    num, _, den = rate.partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _probe_video(video_path: Path) -> dict:
+    """get_video_info() using ffprobe instead of OpenCV"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height,avg_frame_rate,r_frame_rate,nb_frames:format=duration",
+        "-of", "json",
+        str(video_path),
+    ]
+    result = subprocess.run(cmd, capture_output=True, timeout=30)
+    if result.returncode != 0:
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    data = json.loads(result.stdout or b"{}")
+    streams = data.get("streams") or []
+    if not streams:
+        raise ValueError(f"No video stream in: {video_path}")
+    stream = streams[0]
+
+    fps = _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(stream.get("r_frame_rate"))
+    duration = float(data.get("format", {}).get("duration") or 0) or None
+    frame_count = int(stream.get("nb_frames") or 0)
+    if not frame_count and duration and fps:
+        # Matroska/WebM do not store a frame count
+        frame_count = int(duration * fps)
+
+    info = {
+        "path": str(video_path),
+        "name": video_path.name,
+        "width": int(stream.get("width") or 0),
+        "height": int(stream.get("height") or 0),
+        "fps": fps,
+        "frame_count": frame_count,
+        "duration": duration,
+    }
+
+    if info["duration"] is None and fps > 0:
+        info["duration"] = frame_count / fps
+
+    return info
+
+
+def _select_frame_indices(total_frames: int, max_frames: int, sample_method: str) -> List[int]:
+    """Pick which frame indices to sample from a video (ascending order)"""
+    if total_frames <= max_frames:
+        # Use all frames
+        return list(range(total_frames))
+    if sample_method == "uniform":
+        # Uniform sampling
+        return np.linspace(0, total_frames - 1, max_frames, dtype=int).tolist()
+    if sample_method == "first_last":
+        # Keep first and last, uniform sample the rest
+        if max_frames <= 2:
+            return [0, total_frames - 1][:max_frames]
+        middle_count = max_frames - 2
+        middle_indices = np.linspace(1, total_frames - 2, middle_count, dtype=int).tolist()
+        return [0] + middle_indices + [total_frames - 1]
+    raise ValueError(f"Unknown sample method: {sample_method}")
+
+
+def _resolve_sample_strategy(sample_strategy: str, num_samples: int, total_frames: int) -> str:
+    """
+    Resolve "auto" to a concrete strategy for one file.
+
+    Dense sampling reads the whole file once; sparse sampling seeks, because a
+    forward pass would decode mostly frames that are thrown away.
+    """
+    if sample_strategy == "auto":
+        average_gap = total_frames / max(num_samples, 1)
+        return "sequential" if average_gap <= config.SEQUENTIAL_MAX_GAP else "seek"
+    if sample_strategy not in ("sequential", "seek"):
+        raise ValueError(f"Unknown sample strategy: {sample_strategy}")
+    return sample_strategy
+
+
+def _iter_sampled_frames(
+    cap: "cv2.VideoCapture",
+    frame_indices: List[int],
+    seek_gap: Optional[int],
+    counters: dict,
+):
+    """
+    Yield (index, BGR frame) for each ascending index in frame_indices.
+
+    Frames between samples are skipped with grab(), which demuxes and decodes
+    but skips the colour conversion and copy that retrieve() does. When
+    seek_gap is set, targets further ahead than seek_gap frames are reached by
+    seeking instead; targets closer than that reuse the decoder position, so
+    several samples inside one GOP cost a single seek.
+    """
+    pos = -1  # Index of the last grabbed frame
+    for idx in frame_indices:
+        if seek_gap is not None and idx - pos > seek_gap:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            counters["seeks"] += 1
+            pos = idx - 1
+
+        while pos < idx:
+            if not cap.grab():
+                return  # Container over-reported its frame count
+            counters["frames_decoded"] += 1
+            pos += 1
+
+        ret, frame = cap.retrieve()
+        if not ret:
+            continue
+        yield idx, frame
+
+
+class FrameDecoder(abc.ABC):
+    """
+    Decode backend: turns a video file into sampled, resized RGB frames.
+
+    Every backend selects frames with _select_frame_indices and sizes them with
+    get_resize_dims, and returns the (N, H, W, 3) uint8 array and stats dict
+    that extract_frame_array does, so backends are interchangeable.
+    """
+
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether this backend can run in this environment"""
+        return True
+
+    @abc.abstractmethod
+    def decode(
+        self,
+        video_path: Path,
+        max_frames: int,
+        frame_size: int,
+        sample_method: str,
+        sample_strategy: str,
+    ) -> Tuple[np.ndarray, dict]:
+        """Return (frames, stats) for video_path"""
+
+
+class OpenCVDecoder(FrameDecoder):
+    """
+    cv2.VideoCapture with grab()/retrieve() sampling.
+
+    Frames are resized while still BGR (so colour conversion touches the
+    smaller image) straight into a preallocated buffer, then the whole batch
+    is converted to RGB in a single cvtColor call.
+    """
+
+    name = "opencv"
+
+    def decode(self, video_path, max_frames, frame_size, sample_method, sample_strategy):
+        cap = cv2.VideoCapture(str(video_path))
+
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {video_path}")
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        if total_frames == 0:
+            cap.release()
+            raise ValueError(f"Video has no frames: {video_path}")
+
+        # Determine which frames to extract and how to reach them
+        frame_indices = _select_frame_indices(total_frames, max_frames, sample_method)
+        strategy = _resolve_sample_strategy(sample_strategy, len(frame_indices), total_frames)
+        seek_gap = config.SEQUENTIAL_MAX_GAP if strategy == "seek" else None
+        counters = {"seeks": 0, "frames_decoded": 0}
+
+        # Extract frames
+        frames = None
+        count = 0
+        try:
+            for _idx, frame in _iter_sampled_frames(cap, frame_indices, seek_gap, counters):
+                if frames is None:
+                    height, width = frame.shape[:2]
+                    out_width, out_height = get_resize_dims(width, height, max_size=frame_size)
+                    frames = np.empty((len(frame_indices), out_height, out_width, 3), dtype=np.uint8)
+                _resize_into(frame, frames[count])
+                count += 1
+        finally:
+            cap.release()
+
+        if not count:
+            raise ValueError(f"Could not extract any frames from: {video_path}")
+
+        frames = frames[:count]
+        # Convert BGR to RGB for the whole batch at once (frames are contiguous rows)
+        batch = frames.reshape(count * frames.shape[1], frames.shape[2], 3)
+        cv2.cvtColor(batch, cv2.COLOR_BGR2RGB, dst=batch)
+
+        return frames, {
+            "sample_strategy": strategy,
+            "frames_decoded": counters["frames_decoded"],
+            "seeks": counters["seeks"],
+        }
+
+
+def _read_exact(stream: BinaryIO, buf: memoryview) -> bool:
+    """Fill buf from stream; False if the stream ended first"""
+    filled = 0
+    while filled < len(buf):
+        n = stream.readinto(buf[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+class FFmpegDecoder(FrameDecoder):
+    """
+    ffmpeg subprocess that selects and scales frames in its filter graph.
+
+    Only the sampled frames are scaled (with the area filter when shrinking)
+    and converted to RGB, and they arrive already at the target size, so a
+    4K source never crosses the pipe at full resolution. The select filter
+    still decodes every frame, so this is a sequential pass.
+    """
+
+    name = "ffmpeg"
+
+    @classmethod
+    def available(cls) -> bool:
+        return _has_ffmpeg()
+
+    def decode(self, video_path, max_frames, frame_size, sample_method, sample_strategy):
+        info = _probe_video(video_path)
+        total_frames = info["frame_count"]
+        if total_frames == 0:
+            raise ValueError(f"Video has no frames: {video_path}")
+
+        frame_indices = _select_frame_indices(total_frames, max_frames, sample_method)
+        out_width, out_height = get_resize_dims(info["width"], info["height"], max_size=frame_size)
+        scale_flags = "area" if out_width < info["width"] else "bicubic"
+
+        filters = []
+        if len(frame_indices) < total_frames:
+            select = "+".join(f"eq(n\\,{idx})" for idx in frame_indices)
+            filters.append(f"select={select}")
+        filters.append(f"scale={out_width}:{out_height}:flags={scale_flags}")
+
+        cmd = [
+            "ffmpeg", "-v", "error", "-nostdin",
+            "-noautorotate",  # Same orientation as the probed width/height
+            "-i", str(video_path),
+            "-an", "-sn",
+            "-vf", ",".join(filters),
+            "-vsync", "0",
+            "-frames:v", str(len(frame_indices)),
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "pipe:1",
+        ]
+
+        frames = np.empty((len(frame_indices), out_height, out_width, 3), dtype=np.uint8)
+        frame_bytes = out_width * out_height * 3
+        buf = memoryview(frames.reshape(-1))
+        count = 0
+
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            while count < len(frame_indices):
+                if not _read_exact(proc.stdout, buf[count * frame_bytes:(count + 1) * frame_bytes]):
+                    break
+                count += 1
+            _, stderr = proc.communicate(timeout=30)
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        finally:
+            buf.release()
+
+        if not count:
+            message = stderr.decode("utf-8", errors="replace").strip().splitlines()
+            detail = f" ({message[-1]})" if message else ""
+            raise ValueError(f"Could not extract any frames from: {video_path}{detail}")
+
+        return frames[:count], {
+            "sample_strategy": "sequential",
+            "frames_decoded": frame_indices[count - 1] + 1,
+            "seeks": 0,
+        }
+
+
+class PyAVDecoder(FrameDecoder):
+    """
+    PyAV (libav bindings) with threaded decoding.
+
+    Sampled frames are scaled and converted to RGB in one libswscale pass, so
+    full-resolution frames are never copied into numpy. Follows the same
+    sequential/seek strategy as the OpenCV backend.
+    """
+
+    name = "pyav"
+
+    @classmethod
+    def available(cls) -> bool:
+        return _HAS_AV
+
+    def decode(self, video_path, max_frames, frame_size, sample_method, sample_strategy):
+        with av.open(str(video_path)) as container:
+            if not container.streams.video:
+                raise ValueError(f"No video stream in: {video_path}")
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"  # Frame and slice threads
+
+            fps = float(stream.average_rate or stream.guessed_rate or 0)
+            total_frames = stream.frames
+            if not total_frames and container.duration and fps:
+                total_frames = int(container.duration / av.time_base * fps)
+            if not total_frames or fps <= 0:
+                raise ValueError(f"Video has no frames: {video_path}")
+
+            frame_indices = _select_frame_indices(total_frames, max_frames, sample_method)
+            strategy = _resolve_sample_strategy(sample_strategy, len(frame_indices), total_frames)
+            seek_gap = config.SEQUENTIAL_MAX_GAP if strategy == "seek" else None
+
+            width = stream.codec_context.width
+            height = stream.codec_context.height
+            out_width, out_height = get_resize_dims(width, height, max_size=frame_size)
+            interpolation = "AREA" if out_width < width else "BICUBIC"
+
+            time_base = stream.time_base
+            start_pts = stream.start_time or 0
+            frames = np.empty((len(frame_indices), out_height, out_width, 3), dtype=np.uint8)
+            count = 0
+            seeks = 0
+            frames_decoded = 0
+            pos = -1  # Index of the last decoded frame
+            decoder = container.decode(stream)
+
+            for idx in frame_indices:
+                if seek_gap is not None and idx - pos > seek_gap:
+                    # Seeks to the keyframe at or before the target
+                    container.seek(start_pts + int(idx / fps / time_base), stream=stream)
+                    decoder = container.decode(stream)
+                    seeks += 1
+                    pos = idx - 1
+
+                target = None
+                for frame in decoder:
+                    frames_decoded += 1
+                    if frame.pts is not None:
+                        pos = round(float((frame.pts - start_pts) * time_base) * fps)
+                    else:
+                        pos += 1
+                    if pos >= idx:
+                        target = frame
+                        break
+
+                if target is None:
+                    break  # Container over-reported its frame count
+
+                frames[count] = target.reformat(
+                    width=out_width,
+                    height=out_height,
+                    format="rgb24",
+                    interpolation=interpolation,
+                ).to_ndarray()
+                count += 1
+
+        if not count:
+            raise ValueError(f"Could not extract any frames from: {video_path}")
+
+        return frames[:count], {
+            "sample_strategy": strategy,
+            "frames_decoded": frames_decoded,
+            "seeks": seeks,
+        }
+
+
+DECODE_BACKENDS: Dict[str, Type[FrameDecoder]] = {
+    OpenCVDecoder.name: OpenCVDecoder,
+    FFmpegDecoder.name: FFmpegDecoder,
+    PyAVDecoder.name: PyAVDecoder,
+}
+
+
+def get_decoder_chain(decode_backend: str = None) -> List[FrameDecoder]:
+    """
+    Backends to try, in order, for the given setting.
+
+    "auto" uses config.DECODE_BACKEND_ORDER; a named backend goes first and the
+    rest of that order follows as fallbacks. Unavailable backends are skipped.
+    """
+    decode_backend = decode_backend or config.DECODE_BACKEND
+    order = list(config.DECODE_BACKEND_ORDER)
+    if decode_backend != "auto":
+        if decode_backend not in DECODE_BACKENDS:
+            raise ValueError(f"Unknown decode backend: {decode_backend}")
+        order = [decode_backend] + [name for name in order if name != decode_backend]
+
+    return [DECODE_BACKENDS[name]() for name in order if DECODE_BACKENDS[name].available()]
+
+
+def _frame_signatures(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Tiny grayscale thumbnails and normalised luma histograms used to compare frames"""
+    size = config.ADAPTIVE_SIGNATURE_SIZE
+    thumbs = np.empty((len(frames), size, size), dtype=np.float32)
+    hists = np.empty((len(frames), 32), dtype=np.float32)
+    for i, frame in enumerate(frames):
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+        thumbs[i] = small
+        hists[i] = cv2.calcHist([small], [0], None, [32], [0, 256]).ravel()
+    thumbs /= 255.0
+    hists /= size * size
+    return thumbs, hists
+
+
+def select_scene_frames(frames: np.ndarray, max_frames: int) -> np.ndarray:
+    """
+    Pick the frames of a dense uniform sample where the content changes.
+
+    Each frame is compared with the last frame kept (not just its neighbour,
+    so slow pans still add frames) using the larger of the mean pixel
+    difference and the luma histogram distance on tiny grayscale thumbnails.
+    A frame is kept when that change passes config.ADAPTIVE_CHANGE_THRESHOLD.
+    If more than max_frames pass, the biggest changes win; if fewer than
+    config.ADAPTIVE_MIN_FRAMES pass, evenly spaced frames fill in.
+
+    Args:
+        frames: (N, H, W, 3) uint8 RGB candidate frames in temporal order
+        max_frames: Upper bound on frames to keep
+
+    Returns:
+        Ascending indices into frames
+    """
+    count = len(frames)
+    if count <= 1:
+        return np.arange(count)
+
+    thumbs, hists = _frame_signatures(frames)
+    threshold = config.ADAPTIVE_CHANGE_THRESHOLD
+
+    kept = [0]
+    scores = [np.inf]  # Always keep the first frame
+    for i in range(1, count):
+        last = kept[-1]
+        pixel_change = float(np.abs(thumbs[i] - thumbs[last]).mean())
+        hist_change = float(np.abs(hists[i] - hists[last]).sum()) / 2
+        change = max(pixel_change, hist_change)
+        if change >= threshold:
+            kept.append(i)
+            scores.append(change)
+
+    if len(kept) > max_frames:
+        top = np.argsort(scores)[::-1][:max_frames]
+        kept = [kept[j] for j in top]
+
+    min_frames = min(config.ADAPTIVE_MIN_FRAMES, max_frames, count)
+    if len(kept) < min_frames:
+        spread = np.linspace(0, count - 1, min_frames, dtype=int).tolist()
+        kept = list(set(kept) | set(spread))
+        kept = kept if len(kept) <= max_frames else spread
+
+    return np.array(sorted(kept), dtype=np.intp)
+
+
+def extract_frame_array(
+    video_path: Path,
+    max_frames: int = None,
+    frame_size: int = None,
+    sample_method: str = "uniform",
+    sample_strategy: str = None,
+    decode_backend: str = None,
+) -> Tuple[np.ndarray, dict]:
+    """
+    Extract frames from a video file into one contiguous RGB array.
+
+    Tries each backend from get_decoder_chain() until one decodes the file.
+
+    Args:
+        video_path: Path to video file
+        max_frames: Maximum number of frames to extract (default: from config)
+        frame_size: Target frame size in pixels (default: from config)
+        sample_method: "uniform" for even sampling, "first_last" to preserve endpoints,
+            "adaptive" for frames at scene changes (may return far fewer than max_frames)
+        sample_strategy: "auto", "sequential" or "seek" (default: from config)
+        decode_backend: "auto", "opencv", "ffmpeg" or "pyav" (default: from config)
+
+    Returns:
+        Tuple of ((N, H, W, 3) uint8 RGB array, decode stats dict)
+    """
+    max_frames = max_frames or config.MAX_FRAMES_PER_VIDEO
+    frame_size = frame_size or config.FRAME_SIZE
+    sample_strategy = sample_strategy or config.FRAME_SAMPLE_STRATEGY
+
+    # Adaptive sampling decodes a denser uniform candidate set in one pass,
+    # scores tiny grayscale copies of it and keeps only the candidates where
+    # the content changes
+    decode_frames, decode_method = max_frames, sample_method
+    if sample_method == "adaptive":
+        decode_frames = max_frames * config.ADAPTIVE_CANDIDATE_FACTOR
+        decode_method = "uniform"
+
+    errors = []
+    last_error = None
+    for decoder in get_decoder_chain(decode_backend):
+        decode_start = time.time()
+        try:
+            frames, stats = decoder.decode(
+                video_path, decode_frames, frame_size, decode_method, sample_strategy
+            )
+        except Exception as e:
+            print(f"[VideoProcessor] {decoder.name} failed on {video_path.name}: {e}")
+            errors.append(f"{decoder.name}: {e}")
+            last_error = e
+            continue
+
+        stats["decode_backend"] = decoder.name
+        stats["decode_time"] = time.time() - decode_start
+        if errors:
+            stats["decode_fallbacks"] = errors
+        if sample_method == "adaptive":
+            # Indices into the decoded array itself, so a candidate the
+            # backend could not read never shifts the selection
+            keep = select_scene_frames(frames, max_frames)
+            stats["candidate_frames"] = len(frames)
+            frames = frames[keep]
+        return frames, stats
+
+    if len(errors) == 1:
+        raise last_error
+    raise ValueError(f"No decode backend could read {video_path}: " + "; ".join(errors))
+
+
 def extract_frames(
     video_path: Path,
     max_frames: int = None,
     frame_size: int = None,
     sample_method: str = "uniform",
+    sample_strategy: str = None,
+    decode_backend: str = None,
 ) -> List[Image.Image]:
     """
     Extract frames from a video file.
@@ -65,68 +623,96 @@ def extract_frames(
         max_frames: Maximum number of frames to extract (default: from config)
         frame_size: Target frame size in pixels (default: from config)
         sample_method: "uniform" for even sampling, "first_last" to preserve endpoints
+        sample_strategy: "auto", "sequential" or "seek" (default: from config)
+        decode_backend: "auto", "opencv", "ffmpeg" or "pyav" (default: from config)
 
     Returns:
         List of PIL Images
     """
-    max_frames = max_frames or config.MAX_FRAMES_PER_VIDEO
-    frame_size = frame_size or config.FRAME_SIZE
+    frames, _stats = extract_frame_array(
+        video_path,
+        max_frames=max_frames,
+        frame_size=frame_size,
+        sample_method=sample_method,
+        sample_strategy=sample_strategy,
+        decode_backend=decode_backend,
+    )
+    return [Image.fromarray(frame) for frame in frames]
 
-    cap = cv2.VideoCapture(str(video_path))
 
-    if not cap.isOpened():
-        raise ValueError(f"Cannot open video: {video_path}")
+def get_resize_dims(
+    width: int,
+    height: int,
+    max_size: int = 448,
+    min_size: int = 224,
+) -> Tuple[int, int]:
+    """
+    Target (width, height) that preserves aspect ratio within max_size/min_size.
 
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    Args:
+        width: Source width
+        height: Source height
+        max_size: Maximum dimension
+        min_size: Minimum dimension
 
-    if total_frames == 0:
-        cap.release()
-        raise ValueError(f"Video has no frames: {video_path}")
+    Returns:
+        (width, height), unchanged if no resize is needed
+    """
+    # Calculate scale factor
+    max_dim = max(width, height)
+    min_dim = min(width, height)
 
-    # Determine which frames to extract
-    if total_frames <= max_frames:
-        # Use all frames
-        frame_indices = list(range(total_frames))
-    elif sample_method == "uniform":
-        # Uniform sampling
-        frame_indices = np.linspace(0, total_frames - 1, max_frames, dtype=int).tolist()
-    elif sample_method == "first_last":
-        # Keep first and last, uniform sample the rest
-        if max_frames <= 2:
-            frame_indices = [0, total_frames - 1][:max_frames]
-        else:
-            middle_count = max_frames - 2
-            middle_indices = np.linspace(1, total_frames - 2, middle_count, dtype=int).tolist()
-            frame_indices = [0] + middle_indices + [total_frames - 1]
+    if max_dim > max_size:
+        scale = max_size / max_dim
+    elif min_dim < min_size:
+        scale = min_size / min_dim
     else:
-        raise ValueError(f"Unknown sample method: {sample_method}")
+        return width, height  # No resize needed
 
-    # Extract frames
-    frames = []
-    for idx in frame_indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-        ret, frame = cap.read()
+    return int(width * scale), int(height * scale)
 
-        if not ret:
-            continue
 
-        # Convert BGR to RGB
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+def _resize_into(src: np.ndarray, dst: np.ndarray) -> None:
+    """Resize src into the preallocated dst (INTER_AREA down, INTER_CUBIC up)"""
+    out_height, out_width = dst.shape[:2]
+    if src.shape[:2] == (out_height, out_width):
+        dst[:] = src
+        return
+    interpolation = cv2.INTER_AREA if out_width < src.shape[1] else cv2.INTER_CUBIC
+    cv2.resize(src, (out_width, out_height), dst=dst, interpolation=interpolation)
 
-        # Convert to PIL
-        pil_frame = Image.fromarray(frame)
 
-        # Resize if needed
-        pil_frame = resize_image(pil_frame, max_size=frame_size)
+def resize_array(
+    frames: np.ndarray,
+    max_size: int = 448,
+    min_size: int = 224,
+) -> np.ndarray:
+    """
+    Resize a frame (H, W, C) or a batch of frames (N, H, W, C) preserving aspect ratio.
 
-        frames.append(pil_frame)
+    Args:
+        frames: uint8 array
+        max_size: Maximum dimension
+        min_size: Minimum dimension
 
-    cap.release()
+    Returns:
+        Resized array (the input itself if no resize is needed)
+    """
+    batched = frames.ndim == 4
+    height, width = frames.shape[1:3] if batched else frames.shape[:2]
+    out_width, out_height = get_resize_dims(width, height, max_size, min_size)
+    if (out_width, out_height) == (width, height):
+        return frames
 
-    if not frames:
-        raise ValueError(f"Could not extract any frames from: {video_path}")
+    if not batched:
+        out = np.empty((out_height, out_width) + frames.shape[2:], dtype=frames.dtype)
+        _resize_into(frames, out)
+        return out
 
-    return frames
+    out = np.empty((len(frames), out_height, out_width) + frames.shape[3:], dtype=frames.dtype)
+    for src, dst in zip(frames, out):
+        _resize_into(src, dst)
+    return out
 
 
 def resize_image(
@@ -146,24 +732,75 @@ def resize_image(
         Resized PIL Image
     """
     width, height = image.size
+    new_width, new_height = get_resize_dims(width, height, max_size, min_size)
 
-    # Calculate scale factor
-    max_dim = max(width, height)
-    min_dim = min(width, height)
-
-    if max_dim > max_size:
-        scale = max_size / max_dim
-    elif min_dim < min_size:
-        scale = min_size / min_dim
-    else:
+    if (new_width, new_height) == (width, height):
         return image  # No resize needed
 
-    new_width = int(width * scale)
-    new_height = int(height * scale)
-
     return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
 
 
+def frame_hashes(frames: np.ndarray, method: str = "dhash") -> np.ndarray:
+    """
+    64-bit perceptual hashes of RGB frames.
+
+    dHash compares neighbouring pixels of a 9x8 grayscale thumbnail; pHash
+    compares the low-frequency 8x8 DCT coefficients of a 32x32 thumbnail with
+    their median (slower, but more tolerant of brightness and scale changes).
+
+    Args:
+        frames: (N, H, W, 3) uint8 RGB array
+        method: "dhash" or "phash"
+
+    Returns:
+        (N,) uint64 array of hashes
+    """
+    if method not in ("dhash", "phash"):
+        raise ValueError(f"Unknown hash method: {method}")
+
+    bits = np.empty((len(frames), 64), dtype=bool)
+    for i, frame in enumerate(frames):
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        if method == "dhash":
+            small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+            bits[i] = (small[:, 1:] > small[:, :-1]).ravel()
+        else:
+            small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+            low = cv2.dct(small)[:8, :8].ravel()
+            bits[i] = low > np.median(low[1:])  # DC term would skew the median
+
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def dedup_frames(frames: np.ndarray, threshold: int, method: str = "dhash") -> np.ndarray:
+    """
+    Indices of frames to keep after dropping near-duplicates.
+
+    Frames are visited in order and dropped when their hash is within
+    threshold bits (Hamming distance) of any frame already kept, so a shot
+    that cuts away and back is not captioned twice.
+
+    Args:
+        frames: (N, H, W, 3) uint8 RGB array
+        threshold: Maximum Hamming distance (0-64) that counts as a duplicate
+        method: "dhash" or "phash"
+
+    Returns:
+        Ascending indices into frames
+    """
+    if len(frames) <= 1:
+        return np.arange(len(frames))
+
+    hashes = frame_hashes(frames, method)
+    kept = [0]
+    for i in range(1, len(hashes)):
+        diff = np.bitwise_xor(hashes[kept], hashes[i])
+        distances = np.unpackbits(diff.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        if distances.min() > threshold:
+            kept.append(i)
+    return np.array(kept, dtype=np.intp)
+
+
 def find_all_media(
     directory: Path = None,
     traverse_subfolders: bool = False,
@@ -248,7 +885,7 @@ def find_images(directory: Path = None, traverse_subfolders: bool = False) -> Li
 def process_image(
     image_path: Path,
     frame_size: int = None,
-) -> Tuple[List[Image.Image], dict]:
+) -> Tuple[np.ndarray, dict]:
     """
     Load and process an image file for captioning.
 
@@ -257,23 +894,27 @@ def process_image(
         frame_size: Target size for resize
 
     Returns:
-        Tuple of ([image], metadata_dict)
+        Tuple of ((1, H, W, 3) uint8 RGB array, metadata_dict)
     """
     frame_size = frame_size or config.FRAME_SIZE
     start_time = time.time()
 
     # Load image with PIL
-    img = Image.open(image_path)
+    with Image.open(image_path) as img:
+        # Get original dimensions before conversion
+        width, height = img.size
 
-    # Get original dimensions before conversion
-    width, height = img.size
+        # Let JPEG decode at a reduced scale (never below the target size)
+        img.draft("RGB", (frame_size, frame_size))
 
-    # Convert to RGB if needed (handles RGBA, P mode, grayscale, etc.)
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
+        # Convert to RGB if needed (handles RGBA, P mode, grayscale, etc.)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        frame = np.asarray(img)
 
     # Resize
-    img = resize_image(img, max_size=frame_size)
+    frame = resize_array(frame, max_size=frame_size)
 
     process_time = time.time() - start_time
 
@@ -288,45 +929,88 @@ def process_image(
         "media_type": "image",
     }
 
-    return [img], metadata
+    return np.ascontiguousarray(frame)[np.newaxis], metadata
 
 
 def process_video(
     video_path: Path,
     max_frames: int = None,
     frame_size: int = None,
-) -> Tuple[List[Image.Image], dict]:
+    sample_method: str = "uniform",
+    sample_strategy: str = None,
+    decode_backend: str = None,
+    use_cache: bool = True,
+) -> Tuple[np.ndarray, dict]:
     """
     Process a video file: extract frames and return with metadata.
+    Decoded frames are served from / stored in the frame cache when enabled.
 
     Args:
         video_path: Path to video file
         max_frames: Maximum frames to extract
         frame_size: Target frame size
+        sample_method: Frame selection method passed to extract_frame_array
+        sample_strategy: Decode strategy passed to extract_frame_array
+        decode_backend: Decode backend passed to extract_frame_array
+        use_cache: Read and write the persistent frame cache
 
     Returns:
-        Tuple of (frames_list, metadata_dict)
+        Tuple of ((N, H, W, 3) uint8 RGB array, metadata_dict)
     """
+    from backend.frame_cache import get_frame_cache
+
     start_time = time.time()
+    max_frames = max_frames or config.MAX_FRAMES_PER_VIDEO
+    frame_size = frame_size or config.FRAME_SIZE
+
+    cache = get_frame_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(video_path, max_frames, frame_size, sample_method)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            frame_array, info = cached
+            # Read-only view of the memory map, not a copy; evicting an entry
+            # that is still mapped is retried later (see FrameCache._forget)
+            frames = np.asarray(frame_array)
+            metadata = {
+                **info,  # Video info and the decode stats of the run that stored the entry
+                "frames_extracted": len(frames),
+                "frame_size": frame_size,
+                "process_time": time.time() - start_time,
+                "frame_cache_hit": True,
+                "frame_cache": cache.stats(),
+            }
+            return frames, metadata
 
     # Get video info
     info = get_video_info(video_path)
 
     # Extract frames
-    frames = extract_frames(
+    frames, decode_stats = extract_frame_array(
         video_path,
         max_frames=max_frames,
         frame_size=frame_size,
+        sample_method=sample_method,
+        sample_strategy=sample_strategy,
+        decode_backend=decode_backend,
     )
 
+    if cache is not None:
+        cache.put(cache_key, frames, {**info, **decode_stats})
+
     process_time = time.time() - start_time
 
     metadata = {
         **info,
+        **decode_stats,
         "frames_extracted": len(frames),
-        "frame_size": frame_size or config.FRAME_SIZE,
+        "frame_size": frame_size,
         "process_time": process_time,
     }
+    if cache is not None:
+        metadata["frame_cache_hit"] = False
+        metadata["frame_cache"] = cache.stats()
 
     return frames, metadata
 
@@ -351,4 +1035,8 @@ if __name__ == "__main__":
         print(f"  Duration: {meta['duration']:.1f}s" if meta['duration'] else "  Duration: Unknown")
         print(f"  Total frames: {meta['frame_count']}")
         print(f"  Extracted: {meta['frames_extracted']} frames")
+        if meta.get("frame_cache_hit"):
+            print("  Frames served from the frame cache")
+        if "decode_time" in meta:  # Missing from cache entries stored before decode stats were
+            print(f"  Decode: {meta['decode_time']:.2f}s ({meta['decode_backend']}, {meta['sample_strategy']}, {meta['frames_decoded']} decoded, {meta['seeks']} seeks)")
         print(f"  Process time: {meta['process_time']:.2f}s")
@@ -1,5 +1,6 @@
 export { useWebSocket } from './useWebSocket'
 export { useResourceWebSocket } from './useResourceWebSocket'
+export { useLibraryWebSocket } from './useLibraryWebSocket'
 export { useApi } from './useApi'
 export { useResizable } from './useResizable'
 export type { ResizableOptions } from './useResizable'
@@ -7,7 +7,11 @@ import type {
   CreatePromptRequest,
   UpdatePromptRequest,
   DirectoryResponse,
-  DirectoryBrowseResponse
+  DirectoryBrowseResponse,
+  VideoPageParams,
+  VideoPageResponse,
+  ThumbnailSpriteRequest,
+  ThumbnailSpriteResponse
 } from '@/types'
 
 export function useApi() {
@@ -150,6 +154,26 @@ export function useApi() {
     return request<DirectoryBrowseResponse>(url)
   }
 
+  // Media listing
+  async function getVideoPage(params: VideoPageParams = {}): Promise<VideoPageResponse | null> {
+    const query = new URLSearchParams()
+    for (const [key, value] of Object.entries(params)) {
+      if (value !== undefined && value !== null && value !== '') {
+        query.set(key, String(value))
+      }
+    }
+    const qs = query.toString()
+    return request<VideoPageResponse>(qs ? `/api/videos/page?${qs}` : '/api/videos/page')
+  }
+
+  // One sheet for a page of grid tiles instead of a request per thumbnail
+  async function getThumbnailSprite(data: ThumbnailSpriteRequest): Promise<ThumbnailSpriteResponse | null> {
+    return request<ThumbnailSpriteResponse>('/api/thumbnails/sprite', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    })
+  }
+
   return {
     loading,
     error,
@@ -167,5 +191,7 @@ export function useApi() {
     getDirectory,
     setDirectory,
     browseDirectory,
+    getVideoPage,
+    getThumbnailSprite,
   }
 }
@@ -0,0 +1,86 @@
+import { ref, onUnmounted } from 'vue'
+import type { LibraryMessage } from '@/types'
+import { useVideoStore } from '@/stores/videoStore'
+
+export function useLibraryWebSocket() {
+  const videoStore = useVideoStore()
+  const ws = ref<WebSocket | null>(null)
+  const reconnectAttempts = ref(0)
+  const maxReconnectAttempts = 10
+  const reconnectDelay = 3000
+
+  let reconnectTimeout: ReturnType<typeof setTimeout> | null = null
+
+  function connect() {
+    if (ws.value?.readyState === WebSocket.OPEN) return
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:'
+    const host = window.location.host
+    const wsUrl = `${protocol}//${host}/ws/library`
+
+    try {
+      ws.value = new WebSocket(wsUrl)
+
+      ws.value.onopen = () => {
+        reconnectAttempts.value = 0
+      }
+
+      ws.value.onmessage = (event) => {
+        if (event.data === 'pong') return
+        try {
+          const data: LibraryMessage = JSON.parse(event.data)
+          if (data.type === 'enriched') {
+            videoStore.applyEnriched(data.videos)
+          } else if (data.type === 'delta') {
+            videoStore.applyDelta(data.added, data.removed, data.caption_changed)
+          }
+        } catch (e) {
+          console.error('[LibraryWS] Failed to parse message:', e)
+        }
+      }
+
+      ws.value.onclose = () => {
+        cleanup()
+        attemptReconnect()
+      }
+
+      ws.value.onerror = () => {
+        // onclose will fire after onerror
+      }
+    } catch (e) {
+      console.error('[LibraryWS] Failed to connect:', e)
+      attemptReconnect()
+    }
+  }
+
+  function disconnect() {
+    cleanup()
+    if (ws.value) {
+      ws.value.onclose = null
+      ws.value.close()
+      ws.value = null
+    }
+  }
+
+  function cleanup() {
+    if (reconnectTimeout) {
+      clearTimeout(reconnectTimeout)
+      reconnectTimeout = null
+    }
+  }
+
+  function attemptReconnect() {
+    if (reconnectAttempts.value >= maxReconnectAttempts) return
+
+    reconnectAttempts.value++
+    reconnectTimeout = setTimeout(() => {
+      connect()
+    }, reconnectDelay * Math.min(reconnectAttempts.value, 3))
+  }
+
+  onUnmounted(() => {
+    disconnect()
+  })
+
+  return { connect, disconnect }
+}
@@ -1,6 +1,7 @@
 import { defineStore } from 'pinia'
 import { ref, computed } from 'vue'
-import type { VideoInfo, CaptionInfo, VideoWithStatus, VideoStatus } from '@/types'
+import type { VideoInfo, CaptionInfo, VideoWithStatus, VideoStatus, UploadSessionResponse } from '@/types'
+import { decodeVideoColumns } from '@/utils'
 
 export const useVideoStore = defineStore('video', () => {
   const videos = ref<VideoInfo[]>([])
@@ -39,68 +40,101 @@ export const useVideoStore = defineStore('video', () => {
     loadingLoaded.value = 0
     videos.value = []
 
+    // Throttled flush: accumulate in plain array, apply to reactive state at most every 150ms
+    // This reduces Vue reactivity cascades from ~50 to ~10 for large libraries
+    let pendingItems: VideoInfo[] = []
+    let flushTimer: ReturnType<typeof setTimeout> | null = null
+
+    const flushPending = () => {
+      if (pendingItems.length > 0) {
+        videos.value = [...videos.value, ...pendingItems]
+        pendingItems = []
+      }
+      flushTimer = null
+    }
+
+    const scheduleFlush = () => {
+      if (!flushTimer) {
+        flushTimer = setTimeout(flushPending, 150)
+      }
+    }
+
+    // Id of the last batch received; a dropped stream resumes after it
+    let lastEventId: string | null = null
+    let finished = false
+    const maxAttempts = 4
+
     try {
-      const response = await fetch('/api/videos/stream')
-      if (!response.ok) throw new Error('Failed to fetch videos')
+      for (let attempt = 0; !finished; attempt++) {
+        try {
+          // Progressive: batches arrive while the server is still walking the tree
+          // Compact: batches are columns, roughly a tenth of the JSON size
+          const response = await fetch('/api/videos/stream?progressive=true&encoding=compact', {
+            headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+          })
+          if (!response.ok) throw new Error('Failed to fetch videos')
 
-      const reader = response.body?.getReader()
-      if (!reader) throw new Error('No response body')
+          const reader = response.body?.getReader()
+          if (!reader) throw new Error('No response body')
 
-      const decoder = new TextDecoder()
-      let buffer = ''
+          const decoder = new TextDecoder()
+          let buffer = ''
 
-      // Throttled flush: accumulate in plain array, apply to reactive state at most every 150ms
-      // This reduces Vue reactivity cascades from ~50 to ~10 for large libraries
-      let pendingItems: VideoInfo[] = []
-      let flushTimer: ReturnType<typeof setTimeout> | null = null
+          while (true) {
+            const { done, value } = await reader.read()
+            if (done) break
 
-      const flushPending = () => {
-        if (pendingItems.length > 0) {
-          videos.value = [...videos.value, ...pendingItems]
-          pendingItems = []
-        }
-        flushTimer = null
-      }
+            buffer += decoder.decode(value, { stream: true })
 
-      const scheduleFlush = () => {
-        if (!flushTimer) {
-          flushTimer = setTimeout(flushPending, 150)
-        }
-      }
+            // Process complete SSE messages
+            const messages = buffer.split('\n\n')
+            buffer = messages.pop() || ''
+
+            for (const message of messages) {
+              let eventId: string | null = null
+              let payload: string | null = null
+              for (const field of message.split('\n')) {
+                if (field.startsWith('id: ')) eventId = field.slice(4)
+                else if (field.startsWith('data: ')) payload = field.slice(6)
+              }
+              if (payload === null) continue
+
+              try {
+                const data = JSON.parse(payload)
 
-      while (true) {
-        const { done, value } = await reader.read()
-        if (done) break
-
-        buffer += decoder.decode(value, { stream: true })
-
-        // Process complete SSE messages
-        const lines = buffer.split('\n\n')
-        buffer = lines.pop() || ''
-
-        for (const line of lines) {
-          if (line.startsWith('data: ')) {
-            try {
-              const data = JSON.parse(line.slice(6))
-
-              if (data.type === 'total') {
-                loadingTotal.value = data.count
-              } else if (data.type === 'batch') {
-                pendingItems.push(...data.videos)
-                loadingLoaded.value = data.loaded
-                scheduleFlush()
-              } else if (data.type === 'done') {
-                // Final flush - apply everything at once
-                if (flushTimer) {
-                  clearTimeout(flushTimer)
-                  flushTimer = null
+                if (data.type === 'total') {
+                  // Estimated until the walk finishes, then exact
+                  loadingTotal.value = data.count
+                } else if (data.type === 'batch') {
+                  pendingItems.push(...(data.columns ? decodeVideoColumns(data.columns) : data.videos))
+                  loadingLoaded.value = data.loaded
+                  scheduleFlush()
+                } else if (data.type === 'done') {
+                  finished = true
+                  // Final flush - apply everything at once
+                  if (flushTimer) {
+                    clearTimeout(flushTimer)
+                    flushTimer = null
+                  }
+                  flushPending()
+                  // Batches come in directory walk order; put the final list in path order
+                  videos.value = [...videos.value].sort((a, b) =>
+                    a.path.toLowerCase().localeCompare(b.path.toLowerCase())
+                  )
                 }
-                flushPending()
+                if (eventId) lastEventId = eventId
+              } catch (e) {
+                console.error('Failed to parse SSE message:', e)
               }
-            } catch (e) {
-              console.error('Failed to parse SSE message:', e)
             }
           }
+
+          if (!finished) throw new Error('Video stream ended early')
+        } catch (e) {
+          // Without a batch id there is nothing to resume from
+          if (!lastEventId || attempt + 1 >= maxAttempts) throw e
+          console.warn(`[videoStore] Stream interrupted, resuming after ${lastEventId}`)
+          await new Promise(resolve => setTimeout(resolve, 1000 * (attempt + 1)))
         }
       }
 
@@ -137,25 +171,60 @@ export const useVideoStore = defineStore('video', () => {
     }
   }
 
-  async function uploadVideo(file: File): Promise<boolean> {
-    const formData = new FormData()
-    formData.append('file', file)
+  // Resumable uploads: bytes per PATCH, files sent at once, retries per chunk
+  const UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+  const UPLOAD_CONCURRENCY = 3
+  const UPLOAD_RETRIES = 3
 
-    try {
-      const response = await fetch('/api/videos/upload', {
-        method: 'POST',
-        body: formData,
-      })
-      if (!response.ok) {
-        const data = await response.json()
-        throw new Error(data.detail || 'Upload failed')
+  async function uploadSessionRequest(url: string, init: RequestInit): Promise<UploadSessionResponse> {
+    const response = await fetch(url, init)
+    const data = await response.json()
+    if (!response.ok) throw new Error(data.detail || 'Upload failed')
+    return data
+  }
+
+  async function uploadFile(file: File): Promise<void> {
+    let session = await uploadSessionRequest('/api/uploads', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size_bytes: file.size }),
+    })
+
+    let failures = 0
+    while (!session.complete) {
+      try {
+        session = await uploadSessionRequest(`/api/uploads/${session.upload_id}`, {
+          method: 'PATCH',
+          headers: { 'Upload-Offset': String(session.offset) },
+          body: file.slice(session.offset, session.offset + UPLOAD_CHUNK_BYTES),
+        })
+        failures = 0
+      } catch (e) {
+        if (++failures > UPLOAD_RETRIES) throw e
+        // Resume from whatever the server kept of the failed chunk
+        session = await uploadSessionRequest(`/api/uploads/${session.upload_id}`, { method: 'GET' })
+      }
+    }
+  }
+
+  async function uploadMedia(files: File[]): Promise<boolean> {
+    const queue = [...files]
+    const failed: string[] = []
+
+    const worker = async () => {
+      for (let file = queue.shift(); file; file = queue.shift()) {
+        try {
+          await uploadFile(file)
+        } catch (e) {
+          failed.push(`${file.name}: ${e instanceof Error ? e.message : 'Unknown error'}`)
+        }
       }
-      await fetchVideos()
-      return true
-    } catch (e) {
-      error.value = e instanceof Error ? e.message : 'Unknown error'
-      return false
     }
+
+    await Promise.all(Array.from({ length: Math.min(UPLOAD_CONCURRENCY, files.length) }, worker))
+    if (failed.length > 0) error.value = failed.join('; ')
+    await fetchVideos()
+    return failed.length === 0
   }
 
   async function deleteVideo(name: string): Promise<boolean> {
@@ -224,6 +293,34 @@ export const useVideoStore = defineStore('video', () => {
     }
   }
 
+  // Merge records whose probed metadata (resolution, fps, duration) arrived later
+  function applyEnriched(updates: VideoInfo[]) {
+    const byName = new Map(updates.map(v => [v.name, v]))
+    let changed = false
+    const merged = videos.value.map(video => {
+      const update = byName.get(video.name)
+      if (!update) return video
+      changed = true
+      return { ...video, ...update }
+    })
+    if (changed) {
+      videos.value = merged
+    }
+  }
+
+  // Apply a watcher delta without reloading the whole library
+  function applyDelta(added: VideoInfo[], removed: string[], captionChanged: VideoInfo[]) {
+    const removedNames = new Set(removed)
+    const addedNames = new Set(added.map(v => v.name))
+    let next = videos.value.filter(v => !removedNames.has(v.name) && !addedNames.has(v.name))
+    if (added.length > 0) {
+      next = [...next, ...added].sort((a, b) => a.path.toLowerCase().localeCompare(b.path.toLowerCase()))
+    }
+    videos.value = next
+    removed.forEach(name => selectedVideos.value.delete(name))
+    applyEnriched(captionChanged)
+  }
+
   return {
     videos,
     captions,
@@ -240,7 +337,7 @@ export const useVideoStore = defineStore('video', () => {
     selectedVideosList,
     fetchVideos,
     fetchCaptions,
-    uploadVideo,
+    uploadMedia,
     deleteVideo,
     deleteCaption,
     toggleVideoSelection,
@@ -249,5 +346,7 @@ export const useVideoStore = defineStore('video', () => {
     selectPending,
     getCaptionForVideo,
     markVideoAsCaptioned,
+    applyEnriched,
+    applyDelta,
   }
 })
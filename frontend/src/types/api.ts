@@ -12,6 +12,58 @@ export interface VideoListResponse {
   total_count: number
 }
 
+export type MediaSortField = 'name' | 'size' | 'mtime' | 'caption'
+export type SortOrder = 'asc' | 'desc'
+
+export interface VideoPageParams {
+  cursor?: string
+  limit?: number
+  sort?: MediaSortField
+  order?: SortOrder
+  media_type?: 'video' | 'image'
+  has_caption?: boolean
+  subfolder?: string
+  q?: string
+  encoding?: 'json' | 'compact' | 'msgpack'
+}
+
+export interface VideoPageResponse {
+  videos: VideoInfo[]
+  total_count: number
+  next_cursor: string | null
+}
+
+export interface ThumbnailSpriteRequest {
+  names: string[]
+  size?: number
+  columns?: number
+}
+
+export interface ThumbnailSpriteResponse {
+  sheet: string // URL of the sheet image
+  size: number // Tile side, after snapping to a size bucket
+  columns: number
+  width: number
+  height: number
+  tiles: Record<string, [number, number]> // name -> [x, y] of the tile's top-left corner
+  missing: string[]
+}
+
+export interface UploadResponse {
+  success: boolean // False if any file failed
+  uploaded: { filename: string; path: string; size_bytes: number }[]
+  failed: { filename: string; error: string }[]
+}
+
+export interface UploadSessionResponse {
+  upload_id: string
+  filename: string
+  size_bytes: number
+  offset: number // Bytes received; the next chunk starts here
+  complete: boolean
+  path: string | null // Set once complete
+}
+
 export interface CaptionListResponse {
   captions: CaptionInfo[]
   total_count: number
@@ -7,6 +7,15 @@ export interface WorkerProgress {
   current_video: string | null
   substage: ProcessingSubstage
   substage_progress: number
+  idle_time: number
+}
+
+export interface PipelineStageProgress {
+  name: string
+  queue_depth: number
+  active: number
+  processed: number
+  idle_time: number
 }
 
 export interface ProgressState {
@@ -26,6 +35,8 @@ export interface ProgressState {
   batch_size: number
   workers: WorkerProgress[]
   completed_videos: number
+  // Pipeline stage stats
+  stages: PipelineStageProgress[]
   // Transient completion event fields
   just_completed_video: string | null
   just_completed_caption_preview: string | null
@@ -48,6 +59,7 @@ export const initialProgressState: ProgressState = {
   batch_size: 1,
   workers: [],
   completed_videos: 0,
+  stages: [],
   just_completed_video: null,
   just_completed_caption_preview: null,
 }
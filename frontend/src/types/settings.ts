@@ -1,5 +1,9 @@
 export type DeviceType = 'cuda' | 'cpu'
 export type DtypeType = 'float16' | 'bfloat16' | 'float32'
+export type SampleMethod = 'uniform' | 'first_last' | 'adaptive'
+export type SampleStrategy = 'auto' | 'sequential' | 'seek'
+export type DecodeBackend = 'auto' | 'opencv' | 'ffmpeg' | 'pyav'
+export type DedupMethod = 'dhash' | 'phash'
 
 export interface Settings {
   model_id: string
@@ -13,6 +17,13 @@ export interface Settings {
   use_torch_compile: boolean
   include_metadata: boolean
   batch_size: number
+  sample_method: SampleMethod
+  sample_strategy: SampleStrategy
+  decode_backend: DecodeBackend
+  dedup_threshold: number
+  dedup_method: DedupMethod
+  decode_workers: number
+  prefetch_depth: number
   prompt: string
 }
 
@@ -28,6 +39,13 @@ export interface SettingsUpdate {
   use_torch_compile?: boolean
   include_metadata?: boolean
   batch_size?: number
+  sample_method?: SampleMethod
+  sample_strategy?: SampleStrategy
+  decode_backend?: DecodeBackend
+  dedup_threshold?: number
+  dedup_method?: DedupMethod
+  decode_workers?: number
+  prefetch_depth?: number
   prompt?: string
 }
 
@@ -43,6 +61,13 @@ export const defaultSettings: Settings = {
   use_torch_compile: true,
   include_metadata: false,
   batch_size: 1,
+  sample_method: 'uniform',
+  sample_strategy: 'auto',
+  decode_backend: 'auto',
+  dedup_threshold: 0,
+  dedup_method: 'dhash',
+  decode_workers: 0,
+  prefetch_depth: 2,
   prompt: `Describe this video in detail. Include:
 - The main subject and their actions
 - The setting and environment
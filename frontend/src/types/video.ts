@@ -14,6 +14,45 @@ export interface VideoInfo {
   caption_preview: string | null
 }
 
+// Messages on /ws/library
+export interface LibraryEnrichedMessage {
+  type: 'enriched'
+  videos: VideoInfo[]
+}
+
+export interface LibraryDeltaMessage {
+  type: 'delta'
+  added: VideoInfo[]
+  removed: string[]
+  caption_changed: VideoInfo[]
+}
+
+export type LibraryMessage = LibraryEnrichedMessage | LibraryDeltaMessage
+
+// Nullable column: a plain array when every row has a value, otherwise row indices and their values
+export type SparseColumn<T> = T[] | { i: number[]; v: T[] }
+
+// VideoInfo list in the compact listing encoding (?encoding=compact)
+export interface VideoColumns {
+  format: 'columns'
+  count: number
+  root: string
+  sep: string
+  dirs: string[]
+  dir: number[]
+  file: string[]
+  media_type: number[] // Index into ['video', 'image']
+  has_caption: number[]
+  size_mb: number[]
+  duration_sec?: SparseColumn<number>
+  width?: SparseColumn<number>
+  height?: SparseColumn<number>
+  frame_count?: SparseColumn<number>
+  fps?: SparseColumn<number>
+  caption_preview?: SparseColumn<string>
+  paths?: Record<string, string> // Rows whose path is not root + sep + name
+}
+
 export interface CaptionInfo {
   video_name: string
   caption_path: string
@@ -1 +1,2 @@
 export * from './formatters'
+export * from './listing'
@@ -0,0 +1,47 @@
+import type { MediaType, SparseColumn, VideoColumns, VideoInfo } from '@/types'
+
+const MEDIA_TYPES: MediaType[] = ['video', 'image']
+
+function fillColumn<K extends keyof VideoInfo>(
+  videos: VideoInfo[],
+  key: K,
+  column: SparseColumn<VideoInfo[K]> | undefined
+) {
+  if (!column) return
+  if (Array.isArray(column)) {
+    column.forEach((value, row) => { videos[row][key] = value })
+  } else {
+    column.i.forEach((row, n) => { videos[row][key] = column.v[n] })
+  }
+}
+
+/**
+ * Expand a compact (columnar) listing back into VideoInfo records
+ */
+export function decodeVideoColumns(columns: VideoColumns): VideoInfo[] {
+  const videos: VideoInfo[] = []
+  for (let row = 0; row < columns.count; row++) {
+    const dir = columns.dirs[columns.dir[row]]
+    const name = dir ? `${dir}/${columns.file[row]}` : columns.file[row]
+    videos.push({
+      name,
+      path: columns.paths?.[row] ?? columns.root + columns.sep + name.split('/').join(columns.sep),
+      size_mb: columns.size_mb[row],
+      media_type: MEDIA_TYPES[columns.media_type[row]],
+      duration_sec: null,
+      width: null,
+      height: null,
+      frame_count: null,
+      fps: null,
+      has_caption: columns.has_caption[row] === 1,
+      caption_preview: null,
+    })
+  }
+  fillColumn(videos, 'duration_sec', columns.duration_sec)
+  fillColumn(videos, 'width', columns.width)
+  fillColumn(videos, 'height', columns.height)
+  fillColumn(videos, 'frame_count', columns.frame_count)
+  fillColumn(videos, 'fps', columns.fps)
+  fillColumn(videos, 'caption_preview', columns.caption_preview)
+  return videos
+}